@@ -0,0 +1,260 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from modules.ingestion import get_ingestion_engine
+from modules.inference import get_accident_detector, default_model_path
+from modules.batch_scheduler import MicroBatchScheduler
+from modules.motion_gate import MotionGateBank
+from modules.event_buffer import EventClipBank, write_clip
+from modules.resources import get_s3_client
+from modules.utils import upload_file_to_s3, bucket_name, cache_directory, bucket_metadata_directory
+from modules.metadata_sink import MetadataSink
+from modules.incident_store import get_incident_store, severity_from_score, local_time
+from modules.event_bus import get_event_bus, detection_topic
+from modules.notifications import get_notification_pipeline
+from modules.workspace import JobWorkspace
+from modules.stream_health import start_metrics_server
+
+# Frames per second sent to the detector for each monitored camera
+default_detection_fps = 2
+default_accident_threshold = 0.5
+# End-to-end latency target for one frame (queueing + inference)
+default_latency_slo_ms = 500
+recent_detections_kept = 50
+incident_clip_directory = f"{cache_directory}incidents/"
+
+
+class AccidentMonitor:
+    def __init__(self, ingestion_engine, detector=None, detection_fps=default_detection_fps,
+                 accident_threshold=default_accident_threshold, latency_slo_ms=default_latency_slo_ms,
+                 metadata_sink=None, incident_store=None, event_bus=None):
+        """
+        Samples the newest frame of every monitored camera and runs detection on them in shared micro-batches.
+
+        Without a detector the cameras are still ingested, but no detection runs.
+        With a metadata_sink, every detection result is recorded there with its motion score;
+        with an incident_store, detections above the threshold are recorded there (one row per
+        incident, see IncidentStore.record_detection), and with an
+        event_bus they are published to the detections topic.
+        """
+        self.ingestion_engine = ingestion_engine
+        self.detection_fps = detection_fps
+        self.accident_threshold = accident_threshold
+        # Unchanged frames are not sent to the detector
+        self.motion_gates = MotionGateBank()
+        # Compressed pre/post-roll history per camera, flushed to S3 when an accident is detected
+        self.clip_buffers = EventClipBank(self._on_clip)
+        self._clip_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="incident-clip")
+        self.incident_clips = deque(maxlen=recent_detections_kept)
+        self.metadata_sink = metadata_sink
+        self.incident_store = incident_store
+        self.event_bus = event_bus
+        self.scheduler = None
+        if detector is not None:
+            self.scheduler = MicroBatchScheduler(detector, latency_slo_ms=latency_slo_ms)
+
+        self._cameras = {}
+        self._last_sequences = {}
+        self.latest_results = {}
+        self.detections = deque(maxlen=recent_detections_kept)
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start_camera(self, camera):
+        """
+        Starts ingesting a camera and, if a detector is loaded, checking it for accidents.
+        """
+        camera_id = camera.__dict__["id"]
+        with self._lock:
+            # The monitor holds one ingestion reference per camera, however often it is started
+            if camera_id in self._cameras:
+                return
+            self._cameras[camera_id] = camera
+        reader = self.ingestion_engine.start_camera(camera)
+        if self.scheduler is not None:
+            reader.add_listener(self.clip_buffers.add_frame)
+            self._start_thread()
+
+    def stop_camera(self, camera_id):
+        """
+        Stops checking a camera and releases the monitor's reference to its stream;
+        the stream keeps running while previews or other users still hold it.
+        """
+        with self._lock:
+            if self._cameras.pop(camera_id, None) is None:
+                return False
+            self._last_sequences.pop(camera_id, None)
+            self.latest_results.pop(camera_id, None)
+        reader = self.ingestion_engine.get_reader(camera_id)
+        if reader is not None:
+            reader.remove_listener(self.clip_buffers.add_frame)
+        self.motion_gates.remove(camera_id)
+        self.clip_buffers.remove(camera_id)
+        return self.ingestion_engine.stop_camera(camera_id)
+
+    def is_monitoring(self, camera_id):
+        with self._lock:
+            return camera_id in self._cameras
+
+    def _start_thread(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="accident-monitor", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        if self.scheduler is not None:
+            self.scheduler.stop()
+        if self.metadata_sink is not None:
+            self.metadata_sink.close()
+
+    def _run(self):
+        interval = 1.0 / self.detection_fps
+        next_tick = time.monotonic()
+        while not self._stop_event.is_set():
+            with self._lock:
+                cameras = list(self._cameras.items())
+            for camera_id, camera in cameras:
+                self._sample_camera(camera_id, camera)
+
+            next_tick += interval
+            delay = next_tick - time.monotonic()
+            if delay < 0:
+                # Fell behind; skip missed ticks instead of bursting
+                next_tick = time.monotonic()
+                delay = 0
+            self._stop_event.wait(delay)
+
+    def _sample_camera(self, camera_id, camera):
+        with self.ingestion_engine.lease_ring(camera_id) as ring:
+            entry = None if ring is None else ring.latest()
+            if entry is not None:
+                self._sample_frame(camera_id, camera, *entry)
+
+    def _sample_frame(self, camera_id, camera, sequence, timestamp, frame):
+        if self._last_sequences.get(camera_id) == sequence:
+            return
+        self._last_sequences[camera_id] = sequence
+        motion_gate = self.motion_gates.gate_for(camera_id)
+        if not motion_gate.should_forward(frame, timestamp):
+            return
+        motion_score = motion_gate.last_score
+
+        # The ring slot may be reused before the batch runs, so the detector gets its own copy
+        future = self.scheduler.submit(camera_id, frame.copy())
+        future.add_done_callback(
+            lambda done: self._on_result(camera, timestamp, done, motion_score)
+        )
+
+    def _on_result(self, camera, timestamp, future, motion_score=None):
+        if future.cancelled() or future.exception() is not None:
+            return
+        result = future.result()
+        camera_id = camera.__dict__["id"]
+        with self._lock:
+            if camera_id not in self._cameras:
+                return
+            self.latest_results[camera_id] = (timestamp, result)
+        if self.metadata_sink is not None:
+            detected_at = local_time(timestamp)
+            self.metadata_sink.add(
+                {
+                    "frame_name": None,
+                    "camera_id": camera_id,
+                    "camera_name": camera.__dict__.get("name"),
+                    "latitude": camera.__dict__.get("latitude"),
+                    "longitude": camera.__dict__.get("longitude"),
+                    "timestamp": detected_at.strftime("%Y-%m-%d_%H-%M-%S"),
+                    "frame_time": detected_at.isoformat(),
+                    "motion_score": None if motion_score is None else round(motion_score, 2),
+                    "accident_score": result["accident_score"],
+                },
+                detected_at,
+            )
+        if result["accident_score"] >= self.accident_threshold:
+            self.detections.append((camera, timestamp, result))
+            self.clip_buffers.trigger(camera_id, timestamp)
+            incident = {
+                "camera_id": camera_id,
+                "camera_area": camera.__dict__.get("name"),
+                "latitude": camera.__dict__.get("latitude"),
+                "longitude": camera.__dict__.get("longitude"),
+                "detected_at": timestamp,
+                "accident_score": result["accident_score"],
+                "severity": severity_from_score(result["accident_score"]),
+                "source": "accident_monitor",
+            }
+            if self.incident_store is not None:
+                # Consecutive detections of the same crash update one incident row; the
+                # published event carries that row's incident_id and status
+                incident = self.incident_store.record_detection(**incident)
+            if self.event_bus is not None:
+                self.event_bus.publish(detection_topic, incident)
+
+    def _on_clip(self, camera_id, event_timestamp, frames):
+        # Called on the camera's reader thread; encoding and upload happen elsewhere
+        self._clip_writer.submit(self._save_clip, camera_id, event_timestamp, frames)
+
+    def _save_clip(self, camera_id, event_timestamp, frames):
+        event_time = local_time(event_timestamp).strftime("%Y-%m-%d_%H-%M-%S")
+        clip_filename = f"{camera_id}_{event_time}_incident.mp4"
+        with JobWorkspace(f"{camera_id}_incident") as workspace:
+            clip_path = workspace.file_path(clip_filename)
+            if not write_clip(frames, clip_path):
+                return
+            message = upload_file_to_s3(get_s3_client(), clip_path, bucket_name, f"{incident_clip_directory}{clip_filename}")
+            print(message)
+            if message.startswith("Error"):
+                workspace.retain()
+                return
+            self.incident_clips.append((camera_id, event_timestamp, f"{incident_clip_directory}{clip_filename}"))
+
+    def status(self):
+        """
+        Returns per-camera ingestion status with the latest accident score added.
+        """
+        statuses = []
+        for status in self.ingestion_engine.status():
+            latest = self.latest_results.get(status["camera_id"])
+            status["accident_score"] = None if latest is None else latest[1]["accident_score"]
+            # Cameras ingested for another consumer have no gate, and status must not create one
+            motion_gate = self.motion_gates.get(status["camera_id"])
+            status["motion_skip_ratio"] = None if motion_gate is None else motion_gate.skip_ratio
+            statuses.append(status)
+        return statuses
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_accident_monitor():
+    """
+    Returns the process-wide accident monitor, loading the detector if its model file exists.
+    """
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            detector = None
+            metadata_sink = None
+            if os.path.exists(default_model_path):
+                detector = get_accident_detector()
+                metadata_sink = MetadataSink(get_s3_client(), bucket_name, bucket_metadata_directory)
+            else:
+                print(f"Accident detection model not found at {default_model_path}; monitoring without detection.")
+            _monitor = AccidentMonitor(
+                get_ingestion_engine(), detector, metadata_sink=metadata_sink,
+                incident_store=get_incident_store(), event_bus=get_event_bus(),
+            )
+            # Turns the published detections into responder notifications
+            get_notification_pipeline()
+            start_metrics_server()
+        return _monitor
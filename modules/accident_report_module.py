@@ -1,59 +1,87 @@
 import streamlit as st
 from PIL import Image
-import time
-import pandas as pd
-from datetime import datetime
+from modules.incident_store import IncidentStore, get_incident_store, local_time
+from modules.event_bus import get_event_bus, incident_topic
+from modules.notifications import render_notification, get_notification_pipeline
+from modules.geocoder import describe_location
 
-# Function to convert lat/long into location (optional, with external API)
+# Seconds between checks for newly published incidents, and how many stay listed
+feed_poll_seconds = 1
+feed_items_shown = 5
+
+# Function to convert lat/long into a street or intersection name using the offline gazetteer
 def get_location_from_lat_long(latitude, longitude):
-    # Placeholder for actual geolocation conversion
-    return f"{latitude}, {longitude} (Approximate Location)"
+    # Falls back to the coordinates when no gazetteer is installed or no road is near
+    return describe_location(latitude, longitude)
+
+# Function to generate the brief notification for one incident from the incident store
+def format_notification(incident):
+    location = get_location_from_lat_long(incident['latitude'], incident['longitude'])
+    return render_notification(incident, location)
 
 # Function to generate brief notification from CSV
 def generate_notification_from_csv(csv_path):
-    # Load CSV data
-    df = pd.read_csv(csv_path)
-
-    # Extract relevant data from the first row
-    frame_name = df.loc[0, 'Frame Name']
-    camera_area = df.loc[0, 'Camera Area']
-    latitude = df.loc[0, 'Latitude']
-    longitude = df.loc[0, 'Longitude']
-    timestamp = df.loc[0, 'Timestamp']
-
-    # Extract the camera ID from the Frame Name (before the first underscore)
-    camera_id = frame_name.split('_')[0]
-
-    # Convert the timestamp to date and time
-    date_part, time_part = timestamp.split('_')
-    formatted_date = datetime.strptime(date_part, "%Y-%m-%d").strftime("%Y-%m-%d")
-    formatted_time = time_part
-
-    # Get location based on lat/long (can be replaced with a real geolocation API)
-    location = get_location_from_lat_long(latitude, longitude)
-
-    # Generate the message
-    message = f"""
-    A severe accident has been detected at {camera_area}, {location}, on {formatted_date} at {formatted_time} from Camera ID: {camera_id}. 
-    Emergency services are urgently needed. Please divert traffic to ensure safety.
-    """
-    return message
+    # Demo data is read into a throwaway in-memory store so it never reaches the real incident database
+    store = IncidentStore(":memory:")
+    try:
+        store.ingest_csv(csv_path)
+        incidents = store.latest(1, source=csv_path)
+    finally:
+        store.close()
+    if not incidents:
+        return "No incidents reported."
+    return format_notification(incidents[0])
+
+def display_recent_incidents(limit=10):
+    incidents = get_incident_store().latest(limit)
+    if not incidents:
+        return
+    with st.expander(f"Recent incidents ({len(incidents)})"):
+        st.dataframe(
+            [
+                {
+                    "Detected": local_time(incident['detected_at']).strftime("%Y-%m-%d %H:%M:%S"),
+                    "Camera": incident['camera_id'],
+                    "Area": incident['camera_area'],
+                    "Severity": incident['severity'],
+                    "Score": incident['accident_score'],
+                }
+                for incident in incidents
+            ],
+            use_container_width=True,
+        )
+
+def get_incident_subscription():
+    # One subscription per session; renewed if the bus dropped it while the page was not shown
+    subscription = st.session_state.get('incident_subscription')
+    if subscription is None or subscription.closed:
+        get_notification_pipeline()
+        subscription = get_event_bus().subscribe(incident_topic)
+        st.session_state['incident_subscription'] = subscription
+    return subscription
+
+@st.fragment(run_every=feed_poll_seconds)
+def display_notification_feed():
+    new_incidents = get_incident_subscription().poll()
+    feed = st.session_state.setdefault('incident_feed', [])
+    for incident in new_incidents:
+        if incident['status'] == "escalated":
+            st.toast(f"Accident report updated: {incident['camera_area']} is now {incident['severity']}", icon="⚠️")
+        else:
+            st.toast(f"New accident report incoming: {incident['camera_area']} ({incident['severity']})", icon="🚨")
+        # An update replaces the earlier notification of the same incident
+        feed[:] = [shown for shown in feed if shown['incident_id'] != incident['incident_id']]
+        feed.insert(0, incident)
+    del feed[feed_items_shown:]
+
+    for incident in feed:
+        st.info(f"{incident['message']} ({incident['detections']} detections, score {incident['accident_score']:.2f})")
 
 def display_accident_report():
     st.subheader("RESPONDER UI")
 
-    # Check if the notification_ready flag is True
-    if 'notification_ready' in st.session_state and st.session_state['notification_ready']:
-        # Simulate a push notification animation
-        notification_placeholder = st.empty()
-        for i in range(5):
-            notification_placeholder.info("New accident report incoming...")
-            time.sleep(0.5)
-            notification_placeholder.empty()
-            time.sleep(0.5)
-
-        # Reset the notification flag after the animation
-        st.session_state['notification_ready'] = False
+    # New incidents arrive through the event bus while the rest of the page stays idle
+    display_notification_feed()
 
     # Check if the brief notification has been fetched
     if 'brief_fetched' not in st.session_state:
@@ -77,6 +105,8 @@ def display_accident_report():
         # Set session state to indicate the brief notification has been fetched
         st.session_state['brief_fetched'] = True
 
+    display_recent_incidents()
+
     # Show the "Fetch Detailed Report" button only after fetching the brief notification
     if st.session_state['brief_fetched']:
         if st.button("Fetch Detailed Report (under development...)"):
@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+
+default_max_wait_ms = 20
+default_max_pending_per_camera = 4
+# Weight of the newest batch in the running inference-time estimate
+latency_smoothing = 0.2
+
+
+class MicroBatchScheduler:
+    def __init__(self, detector, max_batch_size=None, max_wait_ms=default_max_wait_ms,
+                 latency_slo_ms=None, max_pending_per_camera=default_max_pending_per_camera):
+        """
+        Collects frames from many cameras into micro-batches for one detector.
+
+        A batch is dispatched when it reaches max_batch_size or when its oldest frame has
+        waited max_wait_ms. Frames are taken round-robin across cameras, so a busy camera
+        cannot starve the others, and each camera keeps at most max_pending_per_camera
+        frames queued (older ones are dropped in favour of fresher frames).
+
+        latency_slo_ms bounds queueing + inference time per frame: the wait budget shrinks
+        by the measured inference time, so batches are sent early when the model is slow.
+        """
+        self.detector = detector
+        self.max_batch_size = max_batch_size or detector.batch_size
+        self.max_wait_ms = max_wait_ms
+        self.latency_slo_ms = latency_slo_ms
+        self.max_pending_per_camera = max_pending_per_camera
+
+        self._queues = OrderedDict()
+        self._condition = threading.Condition()
+        self._stopped = False
+        self._inference_ms = 0.0
+
+        self.batches = 0
+        self.frames = 0
+        self.dropped = 0
+        self.slo_misses = 0
+
+        self._thread = threading.Thread(target=self._run, name="micro-batch-scheduler", daemon=True)
+        self._thread.start()
+
+    def submit(self, camera_id, frame):
+        """
+        Queues a frame for detection; returns a Future resolving to its detection result.
+
+        The Future is cancelled if the frame is dropped for a fresher one from the same camera.
+        """
+        future = Future()
+        with self._condition:
+            if self._stopped:
+                raise RuntimeError("Scheduler is stopped.")
+            queue = self._queues.get(camera_id)
+            if queue is None:
+                queue = self._queues[camera_id] = deque()
+            queue.append((time.monotonic(), frame, future))
+            while len(queue) > self.max_pending_per_camera:
+                _, _, stale = queue.popleft()
+                stale.cancel()
+                self.dropped += 1
+            self._condition.notify()
+        return future
+
+    def stop(self):
+        """
+        Stops the scheduler; queued frames are cancelled.
+        """
+        with self._condition:
+            self._stopped = True
+            for queue in self._queues.values():
+                for _, _, future in queue:
+                    future.cancel()
+            self._queues.clear()
+            self._condition.notify()
+        self._thread.join(timeout=5)
+
+    def _wait_budget(self):
+        wait_ms = self.max_wait_ms
+        if self.latency_slo_ms is not None:
+            wait_ms = min(wait_ms, max(0.0, self.latency_slo_ms - self._inference_ms))
+        return wait_ms / 1000.0
+
+    def _pending(self):
+        return sum(len(queue) for queue in self._queues.values())
+
+    def _oldest_enqueue_time(self):
+        return min(queue[0][0] for queue in self._queues.values() if queue)
+
+    def _take_batch(self):
+        # One frame per camera per pass; the camera served first moves to the back
+        batch = []
+        while len(batch) < self.max_batch_size and self._pending():
+            for camera_id in list(self._queues):
+                queue = self._queues[camera_id]
+                if queue:
+                    enqueued_at, frame, future = queue.popleft()
+                    batch.append((camera_id, enqueued_at, frame, future))
+                    self._queues.move_to_end(camera_id)
+                    if len(batch) >= self.max_batch_size:
+                        break
+                if not queue:
+                    del self._queues[camera_id]
+        return batch
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._pending():
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                # Hold the batch open until it fills up or the oldest frame runs out of wait budget
+                while not self._stopped and self._pending() < self.max_batch_size:
+                    remaining = self._oldest_enqueue_time() + self._wait_budget() - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                if self._stopped:
+                    return
+                batch = self._take_batch()
+
+            batch = [entry for entry in batch if entry[3].set_running_or_notify_cancel()]
+            if batch:
+                self._dispatch(batch)
+
+    def _dispatch(self, batch):
+        started = time.monotonic()
+        try:
+            results = self.detector.detect_batch([frame for _, _, frame, _ in batch])
+        except Exception as e:
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            return
+        finished = time.monotonic()
+
+        elapsed_ms = 1000 * (finished - started)
+        self._inference_ms += latency_smoothing * (elapsed_ms - self._inference_ms)
+        self.batches += 1
+        self.frames += len(batch)
+        for (_, enqueued_at, _, future), result in zip(batch, results):
+            if self.latency_slo_ms is not None and 1000 * (finished - enqueued_at) > self.latency_slo_ms:
+                self.slo_misses += 1
+            future.set_result(result)
+
+    def stats(self):
+        with self._condition:
+            pending = self._pending()
+            cameras = len(self._queues)
+        return {
+            "batches": self.batches,
+            "frames": self.frames,
+            "mean_batch_size": self.frames / self.batches if self.batches else 0.0,
+            "inference_ms": self._inference_ms,
+            "pending": pending,
+            "waiting_cameras": cameras,
+            "dropped": self.dropped,
+            "slo_misses": self.slo_misses,
+        }
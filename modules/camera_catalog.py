@@ -0,0 +1,273 @@
+import re
+import threading
+import time
+from modules.spatial_index import GridIndex
+
+# How long a downloaded camera list is considered fresh (seconds)
+default_refresh_interval = 300
+# Longest prefix stored in the search index; longer query tokens are verified against the full tokens
+max_prefix_length = 16
+# nearest_cameras ignores cameras farther than this unless told otherwise
+default_nearest_radius_m = 50000
+# Camera fields that are searchable
+indexed_fields = ("name", "roadway", "direction", "id")
+
+_token_pattern = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    """
+    Splits a string into lowercase alphanumeric tokens.
+    """
+    return _token_pattern.findall(str(text).lower())
+
+
+class CameraCatalog:
+    def __init__(self, api, refresh_interval=default_refresh_interval, background_refresh=True):
+        """
+        Wraps a traffic API client with a TTL-cached, indexed list of cameras.
+        """
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self.background_refresh = background_refresh
+        self.fetch_count = 0
+        self.last_refresh_error = None
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.RLock()
+        self._stop_event = threading.Event()
+        self._refresh_thread = None
+
+        self._cameras = []
+        self._by_id = {}
+        self._search_text = []
+        self._tokens = []
+        self._prefix_index = {}
+        self._spatial_index = GridIndex()
+        self._loaded_at = None
+
+    def refresh(self):
+        """
+        Downloads the camera list from the API and rebuilds the search index.
+        """
+        with self._refresh_lock:
+            cameras = list(self.api.get_cameras())
+            self.fetch_count += 1
+            index = self._build_index(cameras)
+            spatial_index = self._build_spatial_index(cameras)
+            with self._lock:
+                self._cameras = cameras
+                self._by_id, self._search_text, self._tokens, self._prefix_index = index
+                self._spatial_index = spatial_index
+                self._loaded_at = time.monotonic()
+        return len(cameras)
+
+    def _build_index(self, cameras):
+        by_id = {}
+        search_text = []
+        tokens = []
+        prefix_index = {}
+        for position, cam in enumerate(cameras):
+            fields = cam.__dict__
+            by_id[str(fields.get("id", ""))] = cam
+            values = [str(fields.get(field, "") or "") for field in indexed_fields]
+            search_text.append(" ".join(values).lower())
+
+            cam_tokens = set()
+            for value in values:
+                cam_tokens.update(tokenize(value))
+            tokens.append(cam_tokens)
+
+            for token in cam_tokens:
+                for length in range(1, min(len(token), max_prefix_length) + 1):
+                    prefix_index.setdefault(token[:length], set()).add(position)
+        return by_id, search_text, tokens, prefix_index
+
+    def _build_spatial_index(self, cameras):
+        spatial_index = GridIndex()
+        for cam in cameras:
+            spatial_index.insert(cam.__dict__.get("latitude"), cam.__dict__.get("longitude"), cam)
+        return spatial_index
+
+    def _is_stale(self):
+        return (
+            self._loaded_at is None
+            or time.monotonic() - self._loaded_at >= self.refresh_interval
+        )
+
+    def _ensure_fresh(self):
+        if self._loaded_at is not None:
+            if not self._is_stale():
+                return
+            # A live refresher will replace the stale list shortly; serve what we have meanwhile
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._is_stale():
+                self.refresh()
+            if self.background_refresh:
+                self.start_background_refresh()
+
+    def start_background_refresh(self):
+        """
+        Starts a daemon thread that refreshes the catalog every refresh interval.
+        """
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, name="camera-catalog-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+
+    def stop_background_refresh(self):
+        """
+        Stops the background refresh thread.
+        """
+        self._stop_event.set()
+        if self._refresh_thread is not None:
+            self._refresh_thread.join(timeout=5)
+        self._refresh_thread = None
+
+    def _refresh_loop(self):
+        while not self._stop_event.wait(self.refresh_interval):
+            try:
+                self.refresh()
+                self.last_refresh_error = None
+            except Exception as e:
+                # Keep serving the previous list until the API recovers
+                self.last_refresh_error = str(e)
+                print(f"Camera catalog refresh failed: {e}")
+
+    def get_cameras(self):
+        """
+        Returns all cameras, downloading them only if the cache is stale.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._cameras)
+
+    def get_camera(self, camera_id):
+        """
+        Returns the camera with the given ID, or None.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            return self._by_id.get(str(camera_id))
+
+    def search(self, query, limit=None):
+        """
+        Finds cameras whose name, roadway, direction or ID match every word of the query.
+
+        Each query word matches the start of a word in those fields, case-insensitively.
+        If no camera matches that way, a case-insensitive substring match is used instead.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            cameras = self._cameras
+            query_tokens = tokenize(query)
+            if not query_tokens:
+                positions = range(len(cameras))
+            else:
+                positions = self._match_prefixes(query_tokens)
+                if not positions:
+                    needle = str(query).strip().lower()
+                    positions = [
+                        pos for pos, text in enumerate(self._search_text) if needle in text
+                    ]
+
+            results = [cameras[pos] for pos in positions]
+        if limit is not None:
+            results = results[:limit]
+        return results
+
+    def _match_prefixes(self, query_tokens):
+        # Intersect the smallest candidate sets first
+        candidate_sets = []
+        for token in query_tokens:
+            candidates = self._prefix_index.get(token[:max_prefix_length])
+            if not candidates:
+                return []
+            candidate_sets.append(candidates)
+        candidate_sets.sort(key=len)
+        matches = set(candidate_sets[0])
+        for candidates in candidate_sets[1:]:
+            matches &= candidates
+            if not matches:
+                return []
+
+        long_tokens = [token for token in query_tokens if len(token) > max_prefix_length]
+        if long_tokens:
+            matches = {
+                pos for pos in matches
+                if all(
+                    any(cam_token.startswith(token) for cam_token in self._tokens[pos])
+                    for token in long_tokens
+                )
+            }
+        return sorted(matches)
+
+    def cameras_within_radius(self, latitude, longitude, radius_m):
+        """
+        Returns (distance_m, camera) pairs within radius_m metres of a point, nearest first.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            spatial_index = self._spatial_index
+        return spatial_index.within_radius(float(latitude), float(longitude), radius_m)
+
+    def nearest_cameras(self, latitude, longitude, k=5, max_distance_m=default_nearest_radius_m):
+        """
+        Returns the k (distance_m, camera) pairs nearest to a point within max_distance_m, nearest first.
+
+        Pass max_distance_m=None to search without a distance limit.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            spatial_index = self._spatial_index
+        return spatial_index.nearest(float(latitude), float(longitude), k, max_distance_m)
+
+    def cameras_in_bbox(self, min_latitude, min_longitude, max_latitude, max_longitude):
+        """
+        Returns cameras inside a lat/long bounding box.
+        """
+        self._ensure_fresh()
+        with self._lock:
+            spatial_index = self._spatial_index
+        return spatial_index.in_bbox(
+            float(min_latitude), float(min_longitude), float(max_latitude), float(max_longitude)
+        )
+
+    def stats(self):
+        """
+        Returns cache statistics for the catalog.
+        """
+        with self._lock:
+            age = None if self._loaded_at is None else time.monotonic() - self._loaded_at
+            return {
+                "cameras": len(self._cameras),
+                "fetch_count": self.fetch_count,
+                "age_seconds": age,
+                "indexed_prefixes": len(self._prefix_index),
+                "located_cameras": len(self._spatial_index),
+                "last_refresh_error": self.last_refresh_error,
+            }
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_camera_catalog(api_key, api):
+    """
+    Returns the process-wide camera catalog for an API key, creating it with the given client.
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.get(api_key)
+        if catalog is None:
+            catalog = CameraCatalog(api)
+            _catalogs[api_key] = catalog
+        return catalog
@@ -0,0 +1,161 @@
+import os
+import threading
+import cv2
+
+_backends = {
+    "any": cv2.CAP_ANY,
+    "ffmpeg": cv2.CAP_FFMPEG,
+    "gstreamer": cv2.CAP_GSTREAMER,
+}
+# OpenCV reads FFmpeg options from this environment variable when a capture is opened
+_ffmpeg_options_variable = "OPENCV_FFMPEG_CAPTURE_OPTIONS"
+# OpenCV's own default, which is lost as soon as the variable is set, so every option string repeats it
+base_ffmpeg_options = {"rtsp_transport": "tcp"}
+_open_lock = threading.Lock()
+
+
+class DecodeConfig:
+    def __init__(self, backend="ffmpeg", ffmpeg_options=None, hardware_acceleration=False, frame_step=1,
+                 target_width=None, open_timeout_seconds=None, read_timeout_seconds=None):
+        """
+        How a consumer wants a stream decoded.
+
+        backend: "ffmpeg", "gstreamer" or "any".
+        ffmpeg_options: extra FFmpeg options (e.g. {"stimeout": "5000000"}), passed via
+        OPENCV_FFMPEG_CAPTURE_OPTIONS on top of base_ffmpeg_options.
+        hardware_acceleration: let OpenCV use any available hardware decoder.
+        frame_step: return every frame_step-th frame; the frames in between are grabbed
+        but never converted or copied out.
+        target_width: downscale returned frames to this width.
+        """
+        if backend not in _backends:
+            raise ValueError(f"Unknown decode backend: {backend}")
+        self.backend = backend
+        self.ffmpeg_options = dict(ffmpeg_options or {})
+        self.hardware_acceleration = hardware_acceleration
+        self.frame_step = max(1, int(frame_step))
+        self.target_width = target_width
+        self.open_timeout_seconds = open_timeout_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+
+    def with_options(self, **overrides):
+        """
+        Returns a copy of this config with some settings replaced.
+        """
+        settings = {
+            "backend": self.backend,
+            "ffmpeg_options": self.ffmpeg_options,
+            "hardware_acceleration": self.hardware_acceleration,
+            "frame_step": self.frame_step,
+            "target_width": self.target_width,
+            "open_timeout_seconds": self.open_timeout_seconds,
+            "read_timeout_seconds": self.read_timeout_seconds,
+        }
+        settings.update(overrides)
+        return DecodeConfig(**settings)
+
+    def capture_params(self):
+        params = []
+        if self.open_timeout_seconds is not None:
+            params += [cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, int(self.open_timeout_seconds * 1000)]
+        if self.read_timeout_seconds is not None:
+            params += [cv2.CAP_PROP_READ_TIMEOUT_MSEC, int(self.read_timeout_seconds * 1000)]
+        # Hardware decoding needs OpenCV 4.5.2+
+        if self.hardware_acceleration and hasattr(cv2, "CAP_PROP_HW_ACCELERATION"):
+            params += [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY]
+        return params
+
+
+# Presets for the different consumers
+full_decode = DecodeConfig()
+# Shared by detection (2 fps, 640 px input), preview (640 px) and incident clips (10 fps);
+# a camera that never answers gives up after the open timeout and is retried with backoff
+monitoring_decode = DecodeConfig(hardware_acceleration=True, frame_step=2, target_width=960, open_timeout_seconds=10)
+
+
+class DecodedCapture:
+    def __init__(self, capture, config):
+        """
+        cv2.VideoCapture wrapper that applies a DecodeConfig's frame step and target width.
+
+        Exposes the VideoCapture methods the app uses; CAP_PROP_FPS and the frame size report
+        what the consumer receives, not what the stream carries.
+        """
+        self.capture = capture
+        self.config = config
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def release(self):
+        self.capture.release()
+
+    def grab(self):
+        for _ in range(self.config.frame_step):
+            if not self.capture.grab():
+                return False
+        return True
+
+    def _scaled_size(self, frame):
+        height, width = frame.shape[:2]
+        target_width = self.config.target_width
+        if not target_width or width <= target_width:
+            return None
+        return target_width, max(1, int(height * target_width / width))
+
+    def retrieve(self, image=None):
+        if self.config.target_width is None:
+            return self.capture.retrieve(image)
+        ret, frame = self.capture.retrieve()
+        if not ret:
+            return ret, frame
+        size = self._scaled_size(frame)
+        if size is None:
+            return ret, frame
+        if image is not None and image.shape[:2] == (size[1], size[0]):
+            # Scale straight into the caller's buffer (e.g. a shared ring slot)
+            return ret, cv2.resize(frame, size, dst=image, interpolation=cv2.INTER_AREA)
+        return ret, cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+
+    def read(self, image=None):
+        if not self.grab():
+            return False, None
+        return self.retrieve(image)
+
+    def get(self, prop):
+        value = self.capture.get(prop)
+        if prop == cv2.CAP_PROP_FPS and value and value > 0:
+            return value / self.config.frame_step
+        width = self.capture.get(cv2.CAP_PROP_FRAME_WIDTH)
+        target_width = self.config.target_width
+        if target_width and width > target_width:
+            if prop == cv2.CAP_PROP_FRAME_WIDTH:
+                return target_width
+            if prop == cv2.CAP_PROP_FRAME_HEIGHT:
+                return int(value * target_width / width)
+        return value
+
+    def set(self, prop, value):
+        return self.capture.set(prop, value)
+
+
+def open_capture(source, config=full_decode):
+    """
+    Opens a video file or stream URL with a DecodeConfig; returns a DecodedCapture (check isOpened()).
+    """
+    config = config or full_decode
+    options = dict(base_ffmpeg_options, **config.ffmpeg_options)
+    options = "|".join(f"{key};{value}" for key, value in options.items())
+    # The variable is process-wide and read while the capture opens, so every open is serialised;
+    # open timeouts keep one unresponsive camera from holding the lock for long
+    with _open_lock:
+        previous = os.environ.get(_ffmpeg_options_variable)
+        os.environ[_ffmpeg_options_variable] = options
+        try:
+            capture = cv2.VideoCapture(source, _backends[config.backend], config.capture_params())
+        finally:
+            if previous is None:
+                os.environ.pop(_ffmpeg_options_variable, None)
+            else:
+                os.environ[_ffmpeg_options_variable] = previous
+    return DecodedCapture(capture, config)
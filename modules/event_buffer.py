@@ -0,0 +1,175 @@
+import os
+import threading
+from collections import deque
+import cv2
+import numpy as np
+
+default_pre_roll_seconds = 10
+default_post_roll_seconds = 10
+# Frames per second kept in the rolling buffer
+default_clip_fps = 10
+default_clip_jpeg_quality = 80
+# Memory budget per camera for buffered JPEG frames
+default_max_bytes_per_camera = 16 * 1024 * 1024
+
+
+class EventClipBuffer:
+    def __init__(self, camera_id, pre_roll_seconds=default_pre_roll_seconds, post_roll_seconds=default_post_roll_seconds,
+                 clip_fps=default_clip_fps, jpeg_quality=default_clip_jpeg_quality, max_bytes=default_max_bytes_per_camera):
+        """
+        Rolling in-memory buffer of JPEG-compressed frames covering the last pre_roll_seconds for one camera.
+
+        When an event is triggered, buffering continues for post_roll_seconds and the
+        frames from pre-roll to post-roll are handed out as one clip. The oldest frames
+        are evicted whenever the buffer exceeds max_bytes, even during a capture.
+        """
+        self.camera_id = camera_id
+        self.pre_roll_seconds = pre_roll_seconds
+        self.post_roll_seconds = post_roll_seconds
+        self.clip_fps = clip_fps
+        self.max_bytes = max_bytes
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self._frames = deque()
+        self._bytes = 0
+        self._last_kept = None
+        self._event_timestamp = None
+        self._lock = threading.Lock()
+        self.evicted_for_budget = 0
+
+    @property
+    def buffered_bytes(self):
+        return self._bytes
+
+    def add(self, frame, timestamp):
+        """
+        Compresses and buffers a frame; returns a finished clip (list of (timestamp, jpeg bytes)) or None.
+        """
+        if self._last_kept is not None and timestamp - self._last_kept < 1.0 / self.clip_fps:
+            return None
+        ret, jpeg = cv2.imencode(".jpg", frame, self._params)
+        if not ret:
+            return None
+        jpeg = jpeg.tobytes()
+
+        with self._lock:
+            self._last_kept = timestamp
+            self._frames.append((timestamp, jpeg))
+            self._bytes += len(jpeg)
+
+            # Keep the pre-roll of a pending event even if it is older than the rolling window
+            window_start = timestamp - self.pre_roll_seconds
+            if self._event_timestamp is not None:
+                window_start = min(window_start, self._event_timestamp - self.pre_roll_seconds)
+            while self._frames and (self._frames[0][0] < window_start or self._bytes > self.max_bytes):
+                if self._frames[0][0] >= window_start:
+                    self.evicted_for_budget += 1
+                _, evicted = self._frames.popleft()
+                self._bytes -= len(evicted)
+
+            if self._event_timestamp is None or timestamp < self._event_timestamp + self.post_roll_seconds:
+                return None
+            start = self._event_timestamp - self.pre_roll_seconds
+            end = self._event_timestamp + self.post_roll_seconds
+            self._event_timestamp = None
+            return [(ts, data) for ts, data in self._frames if start <= ts <= end]
+
+    def trigger(self, timestamp):
+        """
+        Starts capturing a clip around an event; ignored while another capture is in progress.
+        """
+        with self._lock:
+            if self._event_timestamp is not None:
+                return False
+            self._event_timestamp = timestamp
+            return True
+
+    def is_capturing(self):
+        return self._event_timestamp is not None
+
+
+class EventClipBank:
+    def __init__(self, on_clip, **buffer_options):
+        """
+        One EventClipBuffer per camera; finished clips are passed to on_clip(camera_id, event_timestamp, frames).
+        """
+        self.on_clip = on_clip
+        self.buffer_options = buffer_options
+        self._buffers = {}
+        self._event_timestamps = {}
+        self._lock = threading.Lock()
+
+    def add_frame(self, camera_id, frame, timestamp):
+        """
+        Frame listener for the ingestion engine.
+        """
+        with self._lock:
+            clip_buffer = self._buffers.get(camera_id)
+            if clip_buffer is None:
+                clip_buffer = EventClipBuffer(camera_id, **self.buffer_options)
+                self._buffers[camera_id] = clip_buffer
+        clip = clip_buffer.add(frame, timestamp)
+        if clip:
+            self.on_clip(camera_id, self._event_timestamps.pop(camera_id, timestamp), clip)
+
+    def trigger(self, camera_id, timestamp):
+        with self._lock:
+            clip_buffer = self._buffers.get(camera_id)
+        if clip_buffer is None or not clip_buffer.trigger(timestamp):
+            return False
+        self._event_timestamps[camera_id] = timestamp
+        return True
+
+    def remove(self, camera_id):
+        with self._lock:
+            self._buffers.pop(camera_id, None)
+            self._event_timestamps.pop(camera_id, None)
+
+    def stats(self):
+        with self._lock:
+            buffers = dict(self._buffers)
+        return {
+            camera_id: {
+                "buffered_bytes": clip_buffer.buffered_bytes,
+                "capturing": clip_buffer.is_capturing(),
+                "evicted_for_budget": clip_buffer.evicted_for_budget,
+            }
+            for camera_id, clip_buffer in buffers.items()
+        }
+
+
+def clip_fps(frames, fallback=default_clip_fps):
+    """
+    Frame rate actually kept in a list of (timestamp, jpeg bytes) frames.
+    """
+    if len(frames) < 2 or frames[-1][0] <= frames[0][0]:
+        return fallback
+    return (len(frames) - 1) / (frames[-1][0] - frames[0][0])
+
+
+def write_clip(frames, output_path, fps=None):
+    """
+    Decodes buffered (timestamp, jpeg bytes) frames and writes them to an mp4 file.
+
+    Without fps the clip plays at the rate the frames were kept, measured from their
+    timestamps. Returns True only if the writer opened and at least one frame was written.
+    """
+    fps = fps or clip_fps(frames)
+    writer = None
+    written = 0
+    try:
+        for _, jpeg in frames:
+            frame = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+            if frame is None:
+                continue
+            if writer is None:
+                height, width = frame.shape[:2]
+                writer = cv2.VideoWriter(output_path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (width, height))
+                if not writer.isOpened():
+                    print(f"Cannot open video writer for {output_path}")
+                    return False
+            writer.write(frame)
+            written += 1
+    finally:
+        if writer is not None:
+            writer.release()
+    return written > 0 and os.path.exists(output_path) and os.path.getsize(output_path) > 0
@@ -0,0 +1,131 @@
+import queue
+import threading
+import time
+
+# Raw accident detections, and the deduplicated incident notifications built from them
+detection_topic = "detections"
+incident_topic = "incidents"
+default_subscription_size = 100
+# Subscriptions not polled for this long (e.g. a closed browser tab) are dropped
+default_idle_timeout_seconds = 300
+
+
+class Subscription:
+    def __init__(self, bus, topic, maxsize=default_subscription_size):
+        """
+        Bounded queue of the events published to a topic since subscribing.
+
+        When the subscriber falls behind, the oldest events are dropped so publishers never block.
+        closed is set once the bus drops the subscription; subscribe again to keep receiving events.
+        """
+        self.bus = bus
+        self.topic = topic
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.last_polled = time.monotonic()
+        self.dropped = 0
+        self.closed = False
+
+    def _deliver(self, event):
+        while True:
+            try:
+                self._queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self._queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """
+        Waits for the next event; returns None if none arrives within timeout.
+        """
+        self.last_polled = time.monotonic()
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def poll(self):
+        """
+        Returns all pending events without waiting.
+        """
+        self.last_polled = time.monotonic()
+        events = []
+        while True:
+            try:
+                events.append(self._queue.get_nowait())
+            except queue.Empty:
+                return events
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class EventBus:
+    def __init__(self, idle_timeout_seconds=default_idle_timeout_seconds):
+        """
+        In-process publish/subscribe bus; a local stand-in for a message broker.
+
+        publish() hands an event to every subscription of the topic immediately, so
+        a subscriber sees it as soon as it polls. Every event gets a "published_at" time.
+        """
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self._subscriptions = {}
+        self._lock = threading.Lock()
+        self.published = 0
+
+    def subscribe(self, topic, maxsize=default_subscription_size):
+        subscription = Subscription(self, topic, maxsize)
+        with self._lock:
+            self._subscriptions.setdefault(topic, []).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.topic, [])
+            if subscription in subscriptions:
+                subscriptions.remove(subscription)
+        subscription.closed = True
+
+    def publish(self, topic, event):
+        """
+        Delivers an event dict to all current subscribers of topic; returns how many received it.
+        """
+        event = dict(event, published_at=time.time())
+        now = time.monotonic()
+        with self._lock:
+            self.published += 1
+            subscriptions = self._subscriptions.get(topic, [])
+            # Drop abandoned subscriptions instead of filling them forever
+            for subscription in subscriptions:
+                if now - subscription.last_polled >= self.idle_timeout_seconds:
+                    subscription.closed = True
+            subscriptions[:] = [subscription for subscription in subscriptions if not subscription.closed]
+            subscriptions = list(subscriptions)
+        for subscription in subscriptions:
+            subscription._deliver(event)
+        return len(subscriptions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "published": self.published,
+                "subscribers": {topic: len(subscriptions) for topic, subscriptions in self._subscriptions.items()},
+            }
+
+
+_bus = None
+_bus_lock = threading.Lock()
+
+
+def get_event_bus():
+    """
+    Returns the process-wide event bus shared by all sessions.
+    """
+    global _bus
+    with _bus_lock:
+        if _bus is None:
+            _bus = EventBus()
+        return _bus
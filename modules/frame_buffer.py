@@ -0,0 +1,195 @@
+import threading
+import time
+from multiprocessing import shared_memory
+import numpy as np
+
+# Header layout (int64 words): [write sequence, slot sequences...]; timestamps follow as float64
+_header_word = 8
+
+
+class SharedFrameRing:
+    def __init__(self, frame_shape, capacity, name=None, create=True):
+        """
+        Fixed-size ring of decoded frames in one shared-memory block.
+
+        A single decoder writes each frame straight into a preallocated slot, and any
+        number of consumers (in this process or others) read NumPy views of the slots
+        without copying. A view stays valid until the writer wraps around to its slot,
+        i.e. for capacity - 1 further frames; consumers that hold on to a view for
+        longer should check is_current() afterwards.
+
+        Consumers holding views call acquire() first and release() when done; close()
+        retires the ring, and the shared block is only unmapped once the last lease is released.
+        """
+        self.frame_shape = tuple(frame_shape)
+        self.capacity = capacity
+        frame_bytes = int(np.prod(self.frame_shape))
+        header_bytes = _header_word * (1 + capacity) + _header_word * capacity
+        size = header_bytes + frame_bytes * capacity
+
+        self._owner = create
+        self.closed = False
+        self.retired = False
+        self._leases = 0
+        self._shm = shared_memory.SharedMemory(name=name, create=create, size=size)
+        buf = self._shm.buf
+        self._sequences = np.ndarray((1 + capacity,), dtype=np.int64, buffer=buf)
+        self._timestamps = np.ndarray(
+            (capacity,), dtype=np.float64, buffer=buf, offset=_header_word * (1 + capacity)
+        )
+        self._frames = np.ndarray(
+            (capacity,) + self.frame_shape, dtype=np.uint8, buffer=buf, offset=header_bytes
+        )
+        if create:
+            self._sequences[:] = 0
+            self._timestamps[:] = 0.0
+
+        # Guards the arrays against close(); also wakes consumers living in the writer's process,
+        # other processes poll latest_sequence()
+        self._lock = threading.RLock()
+        self._condition = threading.Condition(self._lock)
+
+    @classmethod
+    def attach(cls, descriptor):
+        """
+        Opens an existing ring from another process using the dict returned by descriptor().
+        """
+        return cls(descriptor["frame_shape"], descriptor["capacity"], name=descriptor["name"], create=False)
+
+    def descriptor(self):
+        """
+        Returns what another process needs to attach to this ring.
+        """
+        return {"name": self._shm.name, "frame_shape": self.frame_shape, "capacity": self.capacity}
+
+    def acquire(self):
+        """
+        Registers a consumer that will hold views; returns False if the ring is already retired.
+        """
+        with self._lock:
+            if self.retired:
+                return False
+            self._leases += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self._leases -= 1
+            if self.retired and self._leases <= 0:
+                self._unmap()
+
+    def latest_sequence(self):
+        with self._lock:
+            if self.closed:
+                return 0
+            return int(self._sequences[0])
+
+    def acquire_slot(self):
+        """
+        Returns (slot_index, view) of the slot the next frame should be decoded into.
+        """
+        with self._lock:
+            slot_index = int(self._sequences[0]) % self.capacity
+            # Retire the old frame first so readers never see a half-written slot as valid
+            self._sequences[1 + slot_index] = 0
+            return slot_index, self._frames[slot_index]
+
+    def commit(self, slot_index, timestamp=None):
+        """
+        Publishes the frame decoded into an acquired slot and returns its sequence number.
+        """
+        with self._condition:
+            sequence = int(self._sequences[0]) + 1
+            self._timestamps[slot_index] = timestamp or time.time()
+            self._sequences[1 + slot_index] = sequence
+            self._sequences[0] = sequence
+            self._condition.notify_all()
+            return sequence
+
+    def append(self, frame, timestamp=None):
+        """
+        Copies a frame that was decoded elsewhere into the next slot.
+        """
+        slot_index, slot = self.acquire_slot()
+        np.copyto(slot, frame)
+        return self.commit(slot_index, timestamp)
+
+    def get(self, sequence):
+        """
+        Returns (sequence, timestamp, view) for a sequence number still in the ring, or None.
+        """
+        with self._lock:
+            if sequence <= 0 or self.closed:
+                return None
+            slot_index = (sequence - 1) % self.capacity
+            if int(self._sequences[1 + slot_index]) != sequence:
+                return None
+            return sequence, float(self._timestamps[slot_index]), self._frames[slot_index]
+
+    def is_current(self, sequence):
+        """
+        True while the slot for a sequence number has not been overwritten.
+        """
+        return self.get(sequence) is not None
+
+    def latest(self):
+        """
+        Returns the newest (sequence, timestamp, view), or None if nothing was written yet.
+        """
+        return self.get(self.latest_sequence())
+
+    def wait_for_frame(self, after_sequence=0, timeout=None):
+        """
+        Blocks until a frame newer than after_sequence is committed and returns the newest one,
+        or None on timeout or once the ring is retired.
+        """
+        with self._condition:
+            ready = self._condition.wait_for(
+                lambda: self.retired or self.latest_sequence() > after_sequence, timeout
+            )
+            if not ready or self.retired:
+                return None
+            return self.latest()
+
+    def clip(self, seconds=None):
+        """
+        Returns (sequence, timestamp, view) entries from the last `seconds` seconds, oldest first.
+        """
+        with self._lock:
+            newest = self.latest_sequence()
+            oldest = max(1, newest - self.capacity + 1)
+            entries = [entry for entry in (self.get(seq) for seq in range(oldest, newest + 1)) if entry]
+        if seconds is None or not entries:
+            return entries
+        cutoff = entries[-1][1] - seconds
+        return [entry for entry in entries if entry[1] >= cutoff]
+
+    def __len__(self):
+        return min(self.latest_sequence(), self.capacity)
+
+    def close(self):
+        """
+        Retires the ring. This process's mapping is released (and the creator frees the
+        shared block) right away if no consumer holds a lease, otherwise on the last release().
+        """
+        with self._condition:
+            self.retired = True
+            self._condition.notify_all()
+            if self._leases <= 0:
+                self._unmap()
+
+    def _unmap(self):
+        if self.closed:
+            return
+        # Views must not outlive the mapping
+        self.closed = True
+        self._frames = None
+        self._sequences = None
+        self._timestamps = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A consumer still holds a view; the mapping goes away once it is dropped
+            pass
+        if self._owner:
+            self._shm.unlink()
@@ -0,0 +1,65 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+
+default_jpeg_quality = 90
+default_encoder_workers = 4
+
+
+class FrameEncoder:
+    def __init__(self, quality=default_jpeg_quality, target_width=None, workers=default_encoder_workers):
+        """
+        Encodes frames to JPEG bytes in memory on a thread pool.
+
+        quality is the JPEG quality (0-100). If target_width is set, wider frames are
+        downscaled to that width (keeping the aspect ratio) before encoding.
+        OpenCV releases the GIL while resizing and encoding, so workers run in parallel.
+        """
+        self.quality = quality
+        self.target_width = target_width
+        self.workers = workers
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="jpeg-encode")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def encode(self, frame):
+        """
+        Encodes one frame on the calling thread; returns JPEG bytes, or None if encoding failed.
+        """
+        if self.target_width and frame.shape[1] > self.target_width:
+            height = max(1, round(frame.shape[0] * self.target_width / frame.shape[1]))
+            frame = cv2.resize(frame, (self.target_width, height), interpolation=cv2.INTER_AREA)
+        ret, jpeg = cv2.imencode(".jpg", frame, self._params)
+        if not ret:
+            return None
+        return jpeg.tobytes()
+
+    def submit(self, frame):
+        """
+        Encodes one frame on the pool; returns a Future for its JPEG bytes.
+        """
+        return self._executor.submit(self.encode, frame)
+
+    def encode_many(self, frames):
+        """
+        Yields JPEG bytes (or None on failure) for each frame, in order.
+
+        At most twice the worker count of frames are in flight, so a long frame source is
+        not pulled into memory ahead of the consumer.
+        """
+        pending = deque()
+        max_in_flight = self.workers * 2
+        for frame in frames:
+            pending.append(self.submit(frame))
+            if len(pending) >= max_in_flight:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
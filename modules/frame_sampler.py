@@ -0,0 +1,166 @@
+import cv2
+import numpy as np
+from modules.decode_config import open_capture
+
+
+class FixedRatePolicy:
+    def __init__(self, frames_per_second=4, duration_seconds=None):
+        """
+        Keeps the frame nearest to each multiple of 1 / frames_per_second seconds.
+        """
+        self.interval = 1.0 / frames_per_second
+        self.duration_seconds = duration_seconds
+        self.reset()
+
+    def reset(self, source_fps=None):
+        self._next_target = 0.0
+        self._half_frame = 0.5 / source_fps if source_fps else 0.0
+
+    def wants(self, index, time_sec):
+        if self.duration_seconds is not None and self._next_target >= self.duration_seconds:
+            return False
+        # This frame is the closest one to the target once the target falls inside its half-frame window
+        return time_sec + self._half_frame >= self._next_target
+
+    def accept(self, frame, index, time_sec):
+        while self._next_target <= time_sec + self._half_frame:
+            self._next_target += self.interval
+        return True
+
+    def is_done(self, time_sec):
+        return self.duration_seconds is not None and self._next_target >= self.duration_seconds
+
+
+class EveryNthPolicy:
+    def __init__(self, n=5, max_frames=None):
+        """
+        Keeps every nth decoded frame.
+        """
+        self.n = n
+        self.max_frames = max_frames
+        self.reset()
+
+    def reset(self, source_fps=None):
+        self._kept = 0
+
+    def wants(self, index, time_sec):
+        return index % self.n == 0
+
+    def accept(self, frame, index, time_sec):
+        self._kept += 1
+        return True
+
+    def is_done(self, time_sec):
+        return self.max_frames is not None and self._kept >= self.max_frames
+
+
+class SceneChangePolicy:
+    def __init__(self, threshold=12.0, check_every=2, min_interval_seconds=0.5, thumbnail_width=64):
+        """
+        Keeps a frame when its mean absolute difference from the last kept frame exceeds threshold.
+
+        Frames are compared as small grayscale thumbnails; only every check_every-th frame is decoded.
+        """
+        self.threshold = threshold
+        self.check_every = check_every
+        self.min_interval_seconds = min_interval_seconds
+        self.thumbnail_width = thumbnail_width
+        self.reset()
+
+    def reset(self, source_fps=None):
+        self._reference = None
+        self._last_kept_time = None
+
+    def wants(self, index, time_sec):
+        if self._last_kept_time is not None and time_sec - self._last_kept_time < self.min_interval_seconds:
+            return False
+        return index % self.check_every == 0
+
+    def accept(self, frame, index, time_sec):
+        height, width = frame.shape[:2]
+        thumbnail_height = max(1, int(height * self.thumbnail_width / width))
+        small = cv2.resize(frame, (self.thumbnail_width, thumbnail_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        if self._reference is not None and float(np.mean(cv2.absdiff(gray, self._reference))) < self.threshold:
+            return False
+        self._reference = gray
+        self._last_kept_time = time_sec
+        return True
+
+    def is_done(self, time_sec):
+        return False
+
+
+class FrameSampler:
+    def __init__(self, policy=None):
+        """
+        Picks frames from a video file or a live frame source in one sequential pass.
+        """
+        self.policy = policy or FixedRatePolicy()
+        self.frames_seen = 0
+        self.frames_decoded = 0
+        self.frames_kept = 0
+
+    def sample_video(self, video_file_path, decode_config=None):
+        """
+        Yields (index, time_sec, frame) for each kept frame of a video file, decoded with decode_config.
+        """
+        video_capture = open_capture(video_file_path, decode_config)
+        if not video_capture.isOpened():
+            print(f"Failed to open video file: {video_file_path}")
+            return
+        try:
+            yield from self.sample_capture(video_capture)
+        finally:
+            video_capture.release()
+
+    def sample_capture(self, video_capture):
+        """
+        Yields (index, time_sec, frame) for each kept frame of an opened capture.
+
+        The video is decoded once from start to end. Frames the policy does not want are
+        only grabbed, not retrieved, so they skip the colour conversion and copy-out.
+        """
+        fps = video_capture.get(cv2.CAP_PROP_FPS)
+        if not fps or fps <= 0:
+            fps = 20.0
+        self.start(fps)
+
+        index = 0
+        while True:
+            time_sec = index / fps
+            if self.policy.is_done(time_sec):
+                break
+            if not video_capture.grab():
+                break
+            self.frames_seen += 1
+            if self.policy.wants(index, time_sec):
+                ret, frame = video_capture.retrieve()
+                if ret:
+                    self.frames_decoded += 1
+                    if self.policy.accept(frame, index, time_sec):
+                        self.frames_kept += 1
+                        yield index, time_sec, frame
+            index += 1
+
+    def start(self, source_fps=None):
+        """
+        Resets the policy before offering frames from a live source.
+        """
+        self.policy.reset(source_fps)
+        self.frames_seen = self.frames_decoded = self.frames_kept = 0
+
+    def offer(self, frame, time_sec):
+        """
+        Offers one already-decoded live frame; returns True if it should be kept.
+        """
+        index = self.frames_seen
+        self.frames_seen += 1
+        if self.policy.is_done(time_sec) or not self.policy.wants(index, time_sec):
+            return False
+        self.frames_decoded += 1
+        if self.policy.accept(frame, index, time_sec):
+            self.frames_kept += 1
+            return True
+        return False
@@ -0,0 +1,189 @@
+import csv
+import functools
+import math
+import os
+import threading
+from modules.spatial_index import GridIndex, haversine_m, metres_per_degree_lat, to_coordinate
+
+# Road-segment gazetteer, e.g. exported from OpenStreetMap; see ReverseGeocoder for the columns
+gazetteer_path = "data/gazetteer.csv"
+# Lookups farther than this from any road return no name
+default_max_distance_m = 250
+# A second road this close to the point makes the location an intersection
+default_intersection_distance_m = 30
+# Segments are indexed as points sampled along them at this spacing
+segment_sample_spacing_m = 25
+# Coordinates are rounded to 4 decimals (~11 m) for the cache key
+default_coordinate_precision = 4
+default_cache_size = 4096
+# Sampled points checked exactly per lookup
+candidate_samples = 16
+
+
+unknown_location = "location unknown"
+
+
+def coordinate_location(latitude, longitude):
+    """
+    Placeholder location description built from the coordinates, or "location unknown" without them.
+    """
+    latitude = to_coordinate(latitude)
+    longitude = to_coordinate(longitude)
+    if latitude is None or longitude is None:
+        return unknown_location
+    return f"{latitude}, {longitude} (Approximate Location)"
+
+
+def _distance_to_segment_m(lat, lon, segment):
+    # Equirectangular projection around the point; accurate at street scale
+    x_scale = metres_per_degree_lat * math.cos(math.radians(lat))
+    ax = (segment["start_longitude"] - lon) * x_scale
+    ay = (segment["start_latitude"] - lat) * metres_per_degree_lat
+    bx = (segment["end_longitude"] - lon) * x_scale
+    by = (segment["end_latitude"] - lat) * metres_per_degree_lat
+    dx, dy = bx - ax, by - ay
+    length_squared = dx * dx + dy * dy
+    t = 0.0 if length_squared == 0 else max(0.0, min(1.0, -(ax * dx + ay * dy) / length_squared))
+    return math.hypot(ax + t * dx, ay + t * dy)
+
+
+class ReverseGeocoder:
+    def __init__(self, path=gazetteer_path, max_distance_m=default_max_distance_m,
+                 intersection_distance_m=default_intersection_distance_m,
+                 coordinate_precision=default_coordinate_precision, cache_size=default_cache_size):
+        """
+        Offline reverse geocoder over a road-segment gazetteer CSV.
+
+        Each row has a "name" (street), an optional "locality", and either
+        start_latitude/start_longitude/end_latitude/end_longitude for a segment or
+        latitude/longitude for a single point. Segments are indexed in a GridIndex as
+        points sampled along them; a lookup checks the nearest samples and measures the
+        exact distance to their segments. Results are kept in an LRU cache keyed by the
+        rounded coordinates, since cameras are fixed and the same points repeat.
+        """
+        self.max_distance_m = max_distance_m
+        self.intersection_distance_m = intersection_distance_m
+        self.coordinate_precision = coordinate_precision
+        self.segments = []
+        self.index = GridIndex(cell_size_degrees=0.005)
+        self._load(path)
+        self._cached_reverse = functools.lru_cache(maxsize=cache_size)(self._reverse)
+
+    def _load(self, path):
+        with open(path, newline="", encoding="utf-8") as gazetteer:
+            for row in csv.DictReader(gazetteer):
+                start_lat = to_coordinate(row.get("start_latitude", row.get("latitude")))
+                start_lon = to_coordinate(row.get("start_longitude", row.get("longitude")))
+                end_lat = to_coordinate(row.get("end_latitude"))
+                end_lon = to_coordinate(row.get("end_longitude"))
+                if end_lat is None or end_lon is None:
+                    # A single point is a zero-length segment
+                    end_lat, end_lon = start_lat, start_lon
+                name = (row.get("name") or "").strip()
+                if not name or None in (start_lat, start_lon, end_lat, end_lon):
+                    continue
+                segment = {
+                    "name": name,
+                    "locality": (row.get("locality") or "").strip(),
+                    "start_latitude": start_lat,
+                    "start_longitude": start_lon,
+                    "end_latitude": end_lat,
+                    "end_longitude": end_lon,
+                }
+                position = len(self.segments)
+                self.segments.append(segment)
+                samples = max(1, int(haversine_m(start_lat, start_lon, end_lat, end_lon) // segment_sample_spacing_m))
+                for step in range(samples + 1):
+                    fraction = step / samples
+                    self.index.insert(
+                        start_lat + (end_lat - start_lat) * fraction,
+                        start_lon + (end_lon - start_lon) * fraction,
+                        position,
+                    )
+
+    def _reverse(self, lat, lon):
+        samples = self.index.nearest(
+            lat, lon, k=candidate_samples, max_distance_m=self.max_distance_m + segment_sample_spacing_m
+        )
+        # Nearest segment per street name
+        streets = {}
+        for position in {position for _, position in samples}:
+            segment = self.segments[position]
+            distance = _distance_to_segment_m(lat, lon, segment)
+            if distance > self.max_distance_m:
+                continue
+            if segment["name"] not in streets or distance < streets[segment["name"]][0]:
+                streets[segment["name"]] = (distance, segment)
+        if not streets:
+            return None
+
+        ranked = sorted(streets.values(), key=lambda pair: pair[0])
+        distance, segment = ranked[0]
+        cross_street = None
+        if len(ranked) > 1 and ranked[1][0] <= self.intersection_distance_m:
+            cross_street = ranked[1][1]["name"]
+        return {
+            "street": segment["name"],
+            "cross_street": cross_street,
+            "locality": segment["locality"],
+            "distance_m": distance,
+        }
+
+    def reverse(self, latitude, longitude):
+        """
+        Returns the nearest street (and cross street, at intersections) as a dict, or None if no road is near.
+        """
+        lat = to_coordinate(latitude)
+        lon = to_coordinate(longitude)
+        if lat is None or lon is None:
+            return None
+        return self._cached_reverse(round(lat, self.coordinate_precision), round(lon, self.coordinate_precision))
+
+    def describe(self, latitude, longitude):
+        """
+        Returns a readable location such as "Main St & 5th Ave, Albany", or None if no road is near.
+        """
+        place = self.reverse(latitude, longitude)
+        if place is None:
+            return None
+        name = place["street"]
+        if place["cross_street"]:
+            name = f"{name} & {place['cross_street']}"
+        elif place["distance_m"] > self.intersection_distance_m:
+            name = f"near {name}"
+        return f"{name}, {place['locality']}" if place["locality"] else name
+
+    def cache_info(self):
+        return self._cached_reverse.cache_info()
+
+
+_geocoder = None
+_geocoder_loaded = False
+_geocoder_lock = threading.Lock()
+
+
+def get_reverse_geocoder():
+    """
+    Returns the process-wide reverse geocoder, or None if the gazetteer file is missing.
+    """
+    global _geocoder, _geocoder_loaded
+    with _geocoder_lock:
+        if not _geocoder_loaded:
+            _geocoder_loaded = True
+            if os.path.exists(gazetteer_path):
+                _geocoder = ReverseGeocoder()
+                print(f"Loaded {len(_geocoder.segments)} road segments from {gazetteer_path}")
+            else:
+                print(f"Gazetteer not found at {gazetteer_path}; locations fall back to coordinates.")
+        return _geocoder
+
+
+def describe_location(latitude, longitude):
+    """
+    Street or intersection name for a point, or the coordinates if it cannot be resolved.
+    """
+    if to_coordinate(latitude) is None or to_coordinate(longitude) is None:
+        return unknown_location
+    geocoder = get_reverse_geocoder()
+    description = None if geocoder is None else geocoder.describe(latitude, longitude)
+    return description or coordinate_location(latitude, longitude)
@@ -0,0 +1,82 @@
+import streamlit as st
+from modules.stream_health import get_stream_health_registry, metrics_url
+from modules.resources import resource_stats
+from modules.event_bus import get_event_bus
+from modules.notifications import get_notification_pipeline
+
+# Seconds between dashboard refreshes
+health_refresh_seconds = 2
+
+state_icons = {
+    "healthy": "🟢",
+    "degraded": "🟡",
+    "flapping": "🟠",
+    "stale": "🟠",
+    "down": "🔴",
+    "stopped": "⚪",
+}
+
+
+def _rounded(value, digits=1):
+    return None if value is None else round(value, digits)
+
+
+def display_stream_health_table(snapshots):
+    if not snapshots:
+        st.write("No camera streams have been opened yet.")
+        return
+    st.dataframe(
+        [
+            {
+                "State": f"{state_icons.get(snapshot['state'], '')} {snapshot['state']}",
+                "Camera ID": snapshot['camera_id'],
+                "Consumer": snapshot['consumer'],
+                "Decode FPS": _rounded(snapshot['decode_fps']),
+                "Stream FPS": _rounded(snapshot['nominal_fps']),
+                "Frame age (s)": _rounded(snapshot['frame_age_seconds']),
+                "Connect (ms)": _rounded(
+                    None if snapshot['connect_latency_seconds'] is None else snapshot['connect_latency_seconds'] * 1000, 0
+                ),
+                "Bitrate (kbps)": _rounded(snapshot['bitrate_kbps'], 0),
+                "Frames": snapshot['frames'],
+                "Failed reads": snapshot['failed_reads'],
+                "Dropped frames": snapshot['dropped_frames'],
+                "Reconnects": snapshot['reconnects'],
+                "Last error": snapshot['last_error'] or "",
+            }
+            for snapshot in snapshots
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
+
+@st.fragment(run_every=health_refresh_seconds)
+def display_stream_health():
+    """
+    Health dashboard: per-camera stream metrics plus the app's shared services.
+    """
+    registry = get_stream_health_registry()
+    snapshots = registry.snapshot()
+    active = [snapshot for snapshot in snapshots if snapshot['state'] != "stopped"]
+
+    columns = st.columns(4)
+    columns[0].metric("Active streams", len(active))
+    columns[1].metric("Healthy", sum(1 for snapshot in active if snapshot['state'] == "healthy"))
+    columns[2].metric("Unhealthy", sum(1 for snapshot in active if snapshot['state'] != "healthy"))
+    columns[3].metric("Reconnects", sum(snapshot['reconnects'] for snapshot in snapshots))
+
+    display_stream_health_table(snapshots)
+
+    left, right = st.columns(2)
+    with left:
+        st.subheader("Notifications")
+        st.json({"pipeline": get_notification_pipeline().stats(), "event_bus": get_event_bus().stats()})
+    with right:
+        st.subheader("Shared clients")
+        st.json(resource_stats())
+
+    with st.expander("Prometheus metrics"):
+        url = metrics_url()
+        st.caption(f"Scrape {url}" if url else "The metrics endpoint is disabled.")
+        st.code(registry.prometheus_text(), language="text")
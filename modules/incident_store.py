@@ -0,0 +1,358 @@
+import csv
+import datetime
+import json
+import math
+import os
+import sqlite3
+import threading
+import pytz
+from modules.spatial_index import haversine_m, metres_per_degree_lat, to_coordinate
+
+incident_database_path = "./incidents.db"
+timestamp_format = "%Y-%m-%d_%H-%M-%S"
+# Timestamps in metadata, S3 partitions and notifications are in the cameras' local time
+local_timezone_name = "America/New_York"
+local_timezone = pytz.timezone(local_timezone_name)
+# Accident scores at which an incident counts as severe / moderate
+severe_score = 0.8
+moderate_score = 0.5
+severity_levels = ("none", "minor", "moderate", "severe")
+# Detections of one camera less than this far apart are recorded as the same incident
+default_incident_window_seconds = 60
+
+_schema = """
+CREATE TABLE IF NOT EXISTS incidents (
+    id INTEGER PRIMARY KEY,
+    camera_id TEXT NOT NULL,
+    camera_area TEXT,
+    latitude REAL,
+    longitude REAL,
+    detected_at REAL NOT NULL,
+    accident_score REAL,
+    severity TEXT,
+    frame_name TEXT,
+    clip_key TEXT,
+    source TEXT,
+    last_seen REAL,
+    detections INTEGER NOT NULL DEFAULT 1
+);
+-- Live detections have no frame name, so NULLs must compare equal for de-duplication
+CREATE UNIQUE INDEX IF NOT EXISTS incidents_unique ON incidents (camera_id, detected_at, COALESCE(frame_name, ''));
+CREATE INDEX IF NOT EXISTS incidents_by_time ON incidents (detected_at);
+CREATE INDEX IF NOT EXISTS incidents_by_camera ON incidents (camera_id, detected_at);
+CREATE INDEX IF NOT EXISTS incidents_by_severity ON incidents (severity, detected_at);
+CREATE INDEX IF NOT EXISTS incidents_by_location ON incidents (latitude, longitude);
+CREATE TABLE IF NOT EXISTS ingested_sources (
+    source TEXT PRIMARY KEY,
+    byte_offset INTEGER NOT NULL
+);
+"""
+
+_columns = (
+    "camera_id", "camera_area", "latitude", "longitude", "detected_at",
+    "accident_score", "severity", "frame_name", "clip_key", "source",
+)
+
+
+def severity_from_score(accident_score):
+    if accident_score >= severe_score:
+        return "severe"
+    if accident_score >= moderate_score:
+        return "moderate"
+    if accident_score > 0:
+        return "minor"
+    return "none"
+
+
+def local_time(epoch_seconds):
+    """
+    Returns epoch seconds as an aware datetime in local_timezone.
+    """
+    return datetime.datetime.fromtimestamp(epoch_seconds, local_timezone)
+
+
+def parse_timestamp(value):
+    """
+    Converts a "%Y-%m-%d_%H-%M-%S" string, ISO string, datetime or epoch number to epoch seconds.
+
+    Strings and datetimes without a UTC offset are taken to be in local_timezone.
+    """
+    if isinstance(value, (int, float)):
+        return float(value)
+    if not isinstance(value, datetime.datetime):
+        try:
+            value = datetime.datetime.strptime(value, timestamp_format)
+        except ValueError:
+            value = datetime.datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = local_timezone.localize(value)
+    return value.timestamp()
+
+
+class IncidentStore:
+    def __init__(self, path=incident_database_path):
+        """
+        SQLite store of detected incidents, indexed by time, camera, severity and location.
+
+        One connection is shared by all threads and serialised with a lock; WAL mode lets
+        other processes read while detections are written. Sources (CSV or JSON Lines
+        files) are ingested incrementally: the byte offset reached is saved, so only rows
+        appended since the last ingestion are read.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.executescript(_schema)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def add_incidents(self, incidents):
+        """
+        Inserts incident dicts (keys as in the incidents table); duplicates are ignored. Returns the number added.
+        """
+        rows = []
+        for incident in incidents:
+            row = dict.fromkeys(_columns)
+            row.update((key, incident[key]) for key in _columns if key in incident)
+            row["camera_id"] = str(row["camera_id"])
+            row["detected_at"] = parse_timestamp(row["detected_at"])
+            row["latitude"] = to_coordinate(row["latitude"])
+            row["longitude"] = to_coordinate(row["longitude"])
+            rows.append(tuple(row[key] for key in _columns))
+        if not rows:
+            return 0
+        placeholders = ", ".join("?" for _ in _columns)
+        with self._lock, self._connection:
+            before = self._connection.total_changes
+            self._connection.executemany(
+                f"INSERT OR IGNORE INTO incidents ({', '.join(_columns)}) VALUES ({placeholders})", rows
+            )
+            return self._connection.total_changes - before
+
+    def add_incident(self, **incident):
+        return self.add_incidents([incident])
+
+    def record_detection(self, window_seconds=default_incident_window_seconds, **detection):
+        """
+        Records a live detection as one row per incident.
+
+        A detection less than window_seconds after the camera's open incident was last seen
+        updates that row (last_seen, detections, highest score and severity); otherwise a
+        new incident is inserted. Returns the incident row with its "incident_id" and a
+        "status": "new", "escalated" (its severity went up) or "repeat".
+        """
+        camera_id = str(detection["camera_id"])
+        detected_at = parse_timestamp(detection["detected_at"])
+        score = detection.get("accident_score")
+        severity = detection.get("severity")
+        with self._lock, self._connection:
+            open_incident = self._connection.execute(
+                "SELECT id, accident_score, severity, COALESCE(last_seen, detected_at) AS last_seen FROM incidents "
+                "WHERE camera_id = ? AND detected_at <= ? AND COALESCE(last_seen, detected_at) >= ? "
+                "ORDER BY detected_at DESC LIMIT 1",
+                (camera_id, detected_at, detected_at - window_seconds),
+            ).fetchone()
+            if open_incident is not None:
+                if score is None or (open_incident["accident_score"] is not None and open_incident["accident_score"] >= score):
+                    score = open_incident["accident_score"]
+                if severity not in severity_levels or (
+                    open_incident["severity"] in severity_levels
+                    and severity_levels.index(open_incident["severity"]) >= severity_levels.index(severity)
+                ):
+                    severity = open_incident["severity"]
+                status = "escalated" if severity != open_incident["severity"] else "repeat"
+                self._connection.execute(
+                    "UPDATE incidents SET last_seen = ?, detections = detections + 1, accident_score = ?, severity = ? "
+                    "WHERE id = ?",
+                    (max(open_incident["last_seen"], detected_at), score, severity, open_incident["id"]),
+                )
+                return self._incident(open_incident["id"], status)
+
+            row = dict.fromkeys(_columns)
+            row.update((key, detection[key]) for key in _columns if key in detection)
+            row.update(
+                camera_id=camera_id, detected_at=detected_at,
+                latitude=to_coordinate(row["latitude"]), longitude=to_coordinate(row["longitude"]),
+            )
+            columns = _columns + ("last_seen",)
+            cursor = self._connection.execute(
+                f"INSERT OR IGNORE INTO incidents ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})",
+                tuple(row[key] for key in _columns) + (detected_at,),
+            )
+            if cursor.rowcount > 0:
+                return self._incident(cursor.lastrowid, "new")
+            # Ignored as a duplicate; lastrowid is stale then, so look the existing row up
+            existing = self._connection.execute(
+                "SELECT id FROM incidents WHERE camera_id = ? AND detected_at = ? AND COALESCE(frame_name, '') = ?",
+                (camera_id, detected_at, row["frame_name"] or ""),
+            ).fetchone()
+            return self._incident(existing["id"], "repeat")
+
+    def _incident(self, incident_id, status):
+        # Called with the lock held
+        incident = dict(self._connection.execute("SELECT * FROM incidents WHERE id = ?", (incident_id,)).fetchone())
+        incident.update(incident_id=incident_id, status=status)
+        return incident
+
+    def _query(self, sql, parameters=()):
+        with self._lock:
+            return [dict(row) for row in self._connection.execute(sql, parameters)]
+
+    def latest(self, limit=10, camera_id=None, severities=None, source=None):
+        """
+        Returns the newest incidents, optionally only for one camera, some severities or one ingested source.
+        """
+        sql = "SELECT * FROM incidents"
+        conditions, parameters = [], []
+        if camera_id is not None:
+            conditions.append("camera_id = ?")
+            parameters.append(str(camera_id))
+        if severities is not None:
+            conditions.append(f"severity IN ({', '.join('?' for _ in severities)})")
+            parameters.extend(severities)
+        if source is not None:
+            conditions.append("source = ?")
+            parameters.append(os.path.abspath(source))
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        sql += " ORDER BY detected_at DESC LIMIT ?"
+        parameters.append(limit)
+        return self._query(sql, parameters)
+
+    def in_time_window(self, start, end, camera_id=None):
+        """
+        Returns incidents detected between start and end (datetimes, strings or epoch seconds), oldest first.
+        """
+        sql = "SELECT * FROM incidents WHERE detected_at BETWEEN ? AND ?"
+        parameters = [parse_timestamp(start), parse_timestamp(end)]
+        if camera_id is not None:
+            sql += " AND camera_id = ?"
+            parameters.append(str(camera_id))
+        return self._query(sql + " ORDER BY detected_at", parameters)
+
+    def near(self, latitude, longitude, radius_m, since=None, limit=50):
+        """
+        Returns incidents within radius_m metres of a point, nearest first.
+
+        The location index narrows the search to a bounding box; exact distances are then
+        computed for the candidates only. Each result has a "distance_m" key.
+        """
+        d_lat = radius_m / metres_per_degree_lat
+        d_lon = radius_m / (metres_per_degree_lat * max(math.cos(math.radians(latitude)), 1e-6))
+        sql = "SELECT * FROM incidents WHERE latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?"
+        parameters = [latitude - d_lat, latitude + d_lat, longitude - d_lon, longitude + d_lon]
+        if since is not None:
+            sql += " AND detected_at >= ?"
+            parameters.append(parse_timestamp(since))
+        matches = []
+        for incident in self._query(sql, parameters):
+            distance = haversine_m(latitude, longitude, incident["latitude"], incident["longitude"])
+            if distance <= radius_m:
+                incident["distance_m"] = distance
+                matches.append(incident)
+        matches.sort(key=lambda incident: incident["distance_m"])
+        return matches[:limit]
+
+    def count(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM incidents").fetchone()[0]
+
+    def _source_offset(self, source):
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT byte_offset FROM ingested_sources WHERE source = ?", (source,)
+            ).fetchone()
+        return 0 if row is None else row[0]
+
+    def _save_source_offset(self, source, offset):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT INTO ingested_sources (source, byte_offset) VALUES (?, ?) "
+                "ON CONFLICT(source) DO UPDATE SET byte_offset = excluded.byte_offset",
+                (source, offset),
+            )
+
+    def _read_new_lines(self, path):
+        source = os.path.abspath(path)
+        offset = self._source_offset(source)
+        if os.path.getsize(path) < offset:
+            # The file was replaced; read it again from the start
+            offset = 0
+        with open(path, "rb") as source_file:
+            source_file.seek(offset)
+            data = source_file.read()
+        # Leave a partially written last line for the next ingestion
+        complete = data[:data.rfind(b"\n") + 1]
+        return source, offset, offset + len(complete), complete.decode("utf-8").splitlines()
+
+    def ingest_csv(self, path, severity="severe"):
+        """
+        Adds the rows appended to a detection CSV (Frame Name, Camera Area, Latitude, Longitude, Timestamp).
+        """
+        source, offset, new_offset, lines = self._read_new_lines(path)
+        if offset == 0:
+            lines = lines[1:]
+        header = ["Frame Name", "Camera Area", "Latitude", "Longitude", "Timestamp"]
+        incidents = [
+            {
+                # The camera ID is the part of the frame name before the first underscore
+                "camera_id": row["Frame Name"].split("_")[0],
+                "camera_area": row["Camera Area"],
+                "latitude": row["Latitude"],
+                "longitude": row["Longitude"],
+                "detected_at": row["Timestamp"],
+                "severity": severity,
+                "frame_name": row["Frame Name"],
+                "source": source,
+            }
+            for row in csv.DictReader(lines, fieldnames=header)
+        ]
+        added = self.add_incidents(incidents)
+        self._save_source_offset(source, new_offset)
+        return added
+
+    def ingest_jsonl(self, path, min_accident_score=0.5):
+        """
+        Adds the records appended to a frame metadata JSON Lines file whose accident score reaches the threshold.
+        """
+        source, _, new_offset, lines = self._read_new_lines(path)
+        incidents = []
+        for line in lines:
+            record = json.loads(line)
+            score = record.get("accident_score")
+            if score is None or score < min_accident_score:
+                continue
+            incidents.append({
+                "camera_id": record["camera_id"],
+                "camera_area": record.get("camera_name"),
+                "latitude": record.get("latitude"),
+                "longitude": record.get("longitude"),
+                "detected_at": record.get("frame_time") or record["timestamp"],
+                "accident_score": score,
+                "severity": severity_from_score(score),
+                "frame_name": record.get("frame_name"),
+                "source": source,
+            })
+        added = self.add_incidents(incidents)
+        self._save_source_offset(source, new_offset)
+        return added
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_incident_store():
+    """
+    Returns the process-wide incident store.
+    """
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = IncidentStore()
+        return _store
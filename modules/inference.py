@@ -0,0 +1,217 @@
+import os
+import threading
+import time
+import cv2
+import numpy as np
+
+try:
+    import onnxruntime
+except ImportError:
+    onnxruntime = None
+
+# Local detector weights (YOLO-style ONNX export)
+default_model_path = "models/accident_detector.onnx"
+default_input_size = 640
+default_batch_size = 8
+default_threads = 4
+default_score_threshold = 0.25
+default_nms_threshold = 0.45
+# Classes of the model that mean "accident"; the remaining classes are reported as boxes only
+default_accident_class_ids = (0,)
+
+
+class OnnxRuntimeBackend:
+    name = "onnxruntime"
+
+    def __init__(self, model_path, threads=default_threads):
+        """
+        Runs the model with ONNX Runtime on the CPU.
+        """
+        if onnxruntime is None:
+            raise ImportError("onnxruntime is not installed.")
+        options = onnxruntime.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        self.session = onnxruntime.InferenceSession(
+            model_path, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        self.input_name = self.session.get_inputs()[0].name
+        # Models exported with a fixed batch dimension can only run one frame per call
+        batch_dim = self.session.get_inputs()[0].shape[0]
+        self.max_batch_size = batch_dim if isinstance(batch_dim, int) else None
+
+    def run(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenCVDnnBackend:
+    name = "opencv-dnn"
+
+    def __init__(self, model_path, threads=default_threads):
+        """
+        Runs the model with OpenCV's DNN module on the CPU.
+
+        threads is not applied: OpenCV's thread count is process-wide and shared with
+        decoding, resizing and JPEG encoding, so it is left at OpenCV's default.
+        """
+        self.net = cv2.dnn.readNet(model_path)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.max_batch_size = None
+
+    def run(self, blob):
+        self.net.setInput(blob)
+        return self.net.forward()
+
+
+backends = {
+    OnnxRuntimeBackend.name: OnnxRuntimeBackend,
+    OpenCVDnnBackend.name: OpenCVDnnBackend,
+}
+
+
+def create_backend(model_path, backend="auto", threads=default_threads):
+    """
+    Creates an inference backend by name; "auto" prefers ONNX Runtime when it is installed.
+    """
+    if backend == "auto":
+        backend = OnnxRuntimeBackend.name if onnxruntime is not None else OpenCVDnnBackend.name
+    if backend not in backends:
+        raise ValueError(f"Unknown inference backend: {backend}")
+    return backends[backend](model_path, threads)
+
+
+class AccidentDetector:
+    def __init__(self, model_path=default_model_path, backend="auto", batch_size=default_batch_size,
+                 threads=default_threads, input_size=default_input_size,
+                 score_threshold=default_score_threshold, nms_threshold=default_nms_threshold,
+                 accident_class_ids=default_accident_class_ids):
+        """
+        Batched CPU object detector that scores frames for accidents.
+
+        The model must be a YOLO-style ONNX export taking (N, 3, input_size, input_size) RGB
+        input scaled to [0, 1] and returning (N, 4 + classes, candidates) with cx, cy, w, h
+        boxes followed by per-class scores.
+        """
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(f"Model file not found: {model_path}")
+        self.model_path = model_path
+        self.backend = create_backend(model_path, backend, threads)
+        self.batch_size = batch_size
+        if self.backend.max_batch_size:
+            self.batch_size = min(batch_size, self.backend.max_batch_size)
+        self.input_size = input_size
+        self.score_threshold = score_threshold
+        self.nms_threshold = nms_threshold
+        self.accident_class_ids = set(accident_class_ids)
+
+        # Backends are not guaranteed to be re-entrant
+        self._lock = threading.Lock()
+        self.frames_processed = 0
+        self.batches_processed = 0
+        self.inference_seconds = 0.0
+
+    def detect(self, frames):
+        """
+        Runs detection on BGR frames and returns one result per frame.
+
+        Each result is a dict with "boxes" (list of (x1, y1, x2, y2, score, class_id) in
+        frame pixels) and "accident_score" (highest accident-class score, 0 if none).
+        """
+        results = []
+        for start in range(0, len(frames), self.batch_size):
+            results.extend(self.detect_batch(frames[start:start + self.batch_size]))
+        return results
+
+    def detect_batch(self, frames):
+        """
+        Runs a single model call over up to batch_size frames.
+        """
+        if not frames:
+            return []
+        blob = cv2.dnn.blobFromImages(
+            frames, scalefactor=1 / 255.0, size=(self.input_size, self.input_size), swapRB=True, crop=False
+        )
+        with self._lock:
+            started = time.perf_counter()
+            outputs = self.backend.run(blob)
+            elapsed = time.perf_counter() - started
+            self.frames_processed += len(frames)
+            self.batches_processed += 1
+            self.inference_seconds += elapsed
+
+        outputs = np.asarray(outputs)
+        # Some exports put candidates before attributes
+        if outputs.shape[1] > outputs.shape[2]:
+            outputs = outputs.transpose(0, 2, 1)
+        return [self._postprocess(output, frame.shape) for output, frame in zip(outputs, frames)]
+
+    def _postprocess(self, output, frame_shape):
+        class_scores = output[4:]
+        class_ids = np.argmax(class_scores, axis=0)
+        scores = class_scores[class_ids, np.arange(class_scores.shape[1])]
+        keep = scores >= self.score_threshold
+        if not np.any(keep):
+            return {"boxes": [], "accident_score": 0.0}
+
+        cx, cy, w, h = output[:4, keep]
+        scores = scores[keep]
+        class_ids = class_ids[keep]
+        x_scale = frame_shape[1] / self.input_size
+        y_scale = frame_shape[0] / self.input_size
+        rects = np.stack([(cx - w / 2) * x_scale, (cy - h / 2) * y_scale, w * x_scale, h * y_scale], axis=1)
+
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), scores.tolist(), self.score_threshold, self.nms_threshold)
+        boxes = []
+        accident_score = 0.0
+        for index in np.array(indices).flatten():
+            x, y, box_w, box_h = rects[index]
+            score = float(scores[index])
+            class_id = int(class_ids[index])
+            boxes.append((int(x), int(y), int(x + box_w), int(y + box_h), score, class_id))
+            if class_id in self.accident_class_ids:
+                accident_score = max(accident_score, score)
+        return {"boxes": boxes, "accident_score": accident_score}
+
+    def stats(self):
+        """
+        Returns throughput (frames/s) and mean batch latency (ms) of model calls so far.
+        """
+        with self._lock:
+            seconds = self.inference_seconds
+            return {
+                "backend": self.backend.name,
+                "frames": self.frames_processed,
+                "batches": self.batches_processed,
+                "frames_per_second": self.frames_processed / seconds if seconds else 0.0,
+                "batch_latency_ms": 1000 * seconds / self.batches_processed if self.batches_processed else 0.0,
+            }
+
+
+def draw_detections(frame, result, accident_class_ids=default_accident_class_ids):
+    """
+    Returns a copy of a BGR frame with detection boxes drawn on it (accidents in red).
+    """
+    annotated = frame.copy()
+    for x1, y1, x2, y2, score, class_id in result["boxes"]:
+        color = (0, 0, 255) if class_id in accident_class_ids else (0, 200, 0)
+        cv2.rectangle(annotated, (x1, y1), (x2, y2), color, 2)
+        cv2.putText(annotated, f"{score:.2f}", (x1, max(y1 - 5, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+    return annotated
+
+
+_detectors = {}
+_detectors_lock = threading.Lock()
+
+
+def get_accident_detector(model_path=default_model_path, backend="auto", batch_size=default_batch_size, threads=default_threads):
+    """
+    Returns a process-wide detector for the given settings, loading the model once.
+    """
+    key = (model_path, backend, batch_size, threads)
+    with _detectors_lock:
+        detector = _detectors.get(key)
+        if detector is None:
+            detector = AccidentDetector(model_path, backend, batch_size, threads)
+            _detectors[key] = detector
+        return detector
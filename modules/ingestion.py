@@ -0,0 +1,407 @@
+import random
+import threading
+import time
+from collections import deque
+import cv2
+from modules.frame_buffer import SharedFrameRing
+from modules.decode_config import open_capture, monitoring_decode
+from modules.stream_health import get_stream_health_registry
+
+# Frames kept per camera (~5 s at 20 fps); decoded frames are large, longer history belongs in compressed buffers
+default_buffer_frames = 100
+# Reconnect backoff bounds (seconds)
+reconnect_initial_delay = 1.0
+reconnect_max_delay = 30.0
+
+
+class FrameRing:
+    def __init__(self, capacity=default_buffer_frames):
+        """
+        Bounded buffer of the most recent (sequence, timestamp, frame) entries for one camera.
+        """
+        self.capacity = capacity
+        self._frames = deque(maxlen=capacity)
+        self._condition = threading.Condition()
+        self._sequence = 0
+
+    def append(self, frame, timestamp=None):
+        """
+        Stores a frame, evicting the oldest one when the buffer is full.
+        """
+        with self._condition:
+            self._sequence += 1
+            self._frames.append((self._sequence, timestamp or time.time(), frame))
+            self._condition.notify_all()
+            return self._sequence
+
+    def latest(self):
+        """
+        Returns the newest (sequence, timestamp, frame), or None if the buffer is empty.
+        """
+        with self._condition:
+            return self._frames[-1] if self._frames else None
+
+    def wait_for_frame(self, after_sequence=0, timeout=None):
+        """
+        Blocks until a frame newer than after_sequence arrives and returns it, or None on timeout.
+        """
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._sequence > after_sequence, timeout):
+                return None
+            return self._frames[-1]
+
+    def is_current(self, sequence):
+        """
+        Always True: frames are stored as separate arrays and never overwritten in place.
+        """
+        return True
+
+    def acquire(self):
+        # Frames are plain arrays owned by whoever holds them, so no lease is needed
+        return True
+
+    def release(self):
+        pass
+
+    def clip(self, seconds=None):
+        """
+        Returns buffered entries from the last `seconds` seconds (all of them if None), oldest first.
+        """
+        with self._condition:
+            entries = list(self._frames)
+        if seconds is None or not entries:
+            return entries
+        cutoff = entries[-1][1] - seconds
+        return [entry for entry in entries if entry[1] >= cutoff]
+
+    def __len__(self):
+        with self._condition:
+            return len(self._frames)
+
+
+class RingLease:
+    def __init__(self, reader):
+        """
+        Context manager holding a consumer lease on a reader's current ring.
+
+        Entering returns the ring, or None if the reader has no ring yet or it was just
+        replaced; views taken from the ring stay mapped until the lease is released.
+        """
+        self.reader = reader
+        self.ring = None
+
+    def __enter__(self):
+        ring = None if self.reader is None else self.reader.ring
+        if ring is not None and ring.acquire():
+            self.ring = ring
+        return self.ring
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if self.ring is not None:
+            self.ring.release()
+            self.ring = None
+        return False
+
+
+class StreamReader:
+    def __init__(self, camera_id, video_url, buffer_frames=default_buffer_frames, shared_memory=True,
+                 decode_config=monitoring_decode):
+        """
+        Keeps one camera stream open on a background thread and feeds its frames into a ring buffer.
+
+        With shared_memory the stream is decoded straight into a SharedFrameRing, so preview,
+        recording, sampling and detection all read the same decoded frames without copies.
+        The ring is created once the frame size is known and is None until then.
+        decode_config sets the decode backend, frame step and resolution of the buffered frames.
+        Connects, reads and reconnects are recorded in the camera's StreamHealth.
+        """
+        self.camera_id = camera_id
+        self.video_url = video_url
+        self.decode_config = decode_config
+        self.buffer_frames = buffer_frames
+        self.shared_memory = shared_memory
+        self.ring = None if shared_memory else FrameRing(buffer_frames)
+        self.fps = None
+        self.frame_size = None
+        self.connected = False
+        self.frames_read = 0
+        self.reconnects = 0
+        self.last_error = None
+        self.health = get_stream_health_registry().for_stream(camera_id, "ingestion")
+        self._listeners = []
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def add_listener(self, listener):
+        """
+        Calls listener(camera_id, frame, timestamp) on the reader thread for every decoded frame.
+
+        With shared memory the frame is a view into the ring, valid only during the call.
+        """
+        if listener not in self._listeners:
+            self._listeners = self._listeners + [listener]
+
+    def remove_listener(self, listener):
+        self._listeners = [registered for registered in self._listeners if registered != listener]
+
+    def _notify_listeners(self, frame, timestamp):
+        for listener in self._listeners:
+            try:
+                listener(self.camera_id, frame, timestamp)
+            except Exception as e:
+                print(f"Frame listener failed for camera {self.camera_id}: {e}")
+
+    def start(self):
+        if self.is_running():
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(
+            target=self._run, name=f"ingest-{self.camera_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=5):
+        """
+        Stops the reader thread; the shared ring is released when the thread exits, even after a timeout.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+        self.health.record_disconnect()
+
+    def lease_ring(self):
+        """
+        Returns a RingLease; use it as `with reader.lease_ring() as ring:` around any access to frame views.
+        """
+        return RingLease(self)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _open(self):
+        started = time.monotonic()
+        cap = open_capture(self.video_url, self.decode_config)
+        if not cap.isOpened():
+            cap.release()
+            self.health.record_connect(time.monotonic() - started, False)
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if fps and fps > 0 else 20.0
+        self.frame_size = (
+            int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        )
+        # Only reported by the FFmpeg backend of recent OpenCV builds
+        bitrate = cap.get(cv2.CAP_PROP_BITRATE) if hasattr(cv2, "CAP_PROP_BITRATE") else None
+        self.health.record_connect(
+            time.monotonic() - started, True, nominal_fps=fps if fps and fps > 0 else None, bitrate_kbps=bitrate
+        )
+        return cap
+
+    def _run(self):
+        try:
+            self._read_stream()
+        finally:
+            # Closed by the reader thread itself, so a stop() that timed out cannot leak the block
+            if self.shared_memory and self.ring is not None:
+                ring = self.ring
+                self.ring = None
+                ring.close()
+
+    def _read_stream(self):
+        delay = reconnect_initial_delay
+        while not self._stop_event.is_set():
+            cap = self._open()
+            if cap is None:
+                self.last_error = "Failed to open video stream."
+                # Exponential backoff with jitter so many cameras don't reconnect in lockstep
+                self._stop_event.wait(delay * random.uniform(0.5, 1.0))
+                delay = min(delay * 2, reconnect_max_delay)
+                self.reconnects += 1
+                self.health.record_reconnect()
+                continue
+
+            self.connected = True
+            self.last_error = None
+            delay = reconnect_initial_delay
+            try:
+                if self.shared_memory:
+                    self._read_into_shared_ring(cap)
+                else:
+                    self._read_into_ring(cap)
+            finally:
+                self.connected = False
+                self.health.record_disconnect(self.last_error)
+                cap.release()
+
+            if not self._stop_event.is_set():
+                self.reconnects += 1
+                self.health.record_reconnect()
+                self._stop_event.wait(delay)
+
+    def _read_into_ring(self, cap):
+        while not self._stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                self.last_error = "Stream read failed; reconnecting."
+                self.health.record_failed_read(self.last_error)
+                return
+            timestamp = time.time()
+            self.ring.append(frame, timestamp)
+            self.frames_read += 1
+            self.health.record_frame(timestamp)
+            self._notify_listeners(frame, timestamp)
+
+    def _read_into_shared_ring(self, cap):
+        while not self._stop_event.is_set():
+            ring = self.ring
+            if ring is None:
+                ret, frame = cap.read()
+                if not ret:
+                    self.last_error = "Stream read failed; reconnecting."
+                    self.health.record_failed_read(self.last_error)
+                    return
+                # First frame tells us the slab shape
+                timestamp = time.time()
+                self.ring = SharedFrameRing(frame.shape, self.buffer_frames)
+                self.ring.append(frame, timestamp)
+                self.frames_read += 1
+                self.health.record_frame(timestamp)
+                self._notify_listeners(frame, timestamp)
+                continue
+
+            slot_index, slot = ring.acquire_slot()
+            ret, frame = cap.read(slot)
+            if not ret:
+                self.last_error = "Stream read failed; reconnecting."
+                self.health.record_failed_read(self.last_error)
+                return
+            timestamp = time.time()
+            if frame is not slot:
+                if frame.shape != ring.frame_shape:
+                    # Resolution changed; consumers pick up the new ring on their next lookup
+                    self.ring = SharedFrameRing(frame.shape, self.buffer_frames)
+                    ring.close()
+                    self.ring.append(frame, timestamp)
+                    self.frames_read += 1
+                    self.health.record_frame(timestamp)
+                    self._notify_listeners(frame, timestamp)
+                    continue
+                slot[...] = frame
+            ring.commit(slot_index, timestamp)
+            self.frames_read += 1
+            self.health.record_frame(timestamp)
+            self._notify_listeners(slot, timestamp)
+
+    def status(self):
+        latest = None if self.ring is None else self.ring.latest()
+        return {
+            "camera_id": self.camera_id,
+            "running": self.is_running(),
+            "connected": self.connected,
+            "fps": self.fps,
+            "frames_read": self.frames_read,
+            "buffered_frames": 0 if self.ring is None else len(self.ring),
+            "reconnects": self.reconnects,
+            "last_frame_age": None if latest is None else time.time() - latest[1],
+            "last_error": self.last_error,
+        }
+
+
+class IngestionEngine:
+    def __init__(self, buffer_frames=default_buffer_frames, shared_memory=True, decode_config=monitoring_decode):
+        """
+        Pool of long-lived StreamReaders, one per monitored camera, all decoding with decode_config.
+
+        Readers are reference counted: every start_camera() must be paired with a
+        stop_camera(), and a camera's reader only stops when its last user releases it.
+        """
+        self.buffer_frames = buffer_frames
+        self.shared_memory = shared_memory
+        self.decode_config = decode_config
+        self._readers = {}
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def start_camera(self, camera):
+        """
+        Acquires a camera: starts ingesting it unless it is already running, and returns its reader.
+        """
+        camera_id = camera.__dict__["id"]
+        with self._lock:
+            reader = self._readers.get(camera_id)
+            if reader is None:
+                reader = StreamReader(
+                    camera_id, camera.__dict__["video_url"], self.buffer_frames, self.shared_memory,
+                    self.decode_config,
+                )
+                self._readers[camera_id] = reader
+            self._users[camera_id] = self._users.get(camera_id, 0) + 1
+            reader.start()
+            return reader
+
+    def stop_camera(self, camera_id):
+        """
+        Releases a camera acquired with start_camera(); the last release stops the reader and drops its buffer.
+
+        Returns False if the camera was not being ingested.
+        """
+        with self._lock:
+            if camera_id not in self._readers:
+                return False
+            self._users[camera_id] -= 1
+            if self._users[camera_id] > 0:
+                return True
+            del self._users[camera_id]
+            reader = self._readers.pop(camera_id)
+        reader.stop()
+        return True
+
+    def users(self, camera_id):
+        with self._lock:
+            return self._users.get(camera_id, 0)
+
+    def stop_all(self):
+        with self._lock:
+            readers = list(self._readers.values())
+            self._readers.clear()
+            self._users.clear()
+        for reader in readers:
+            reader.stop()
+
+    def get_reader(self, camera_id):
+        with self._lock:
+            return self._readers.get(camera_id)
+
+    def is_monitoring(self, camera_id):
+        reader = self.get_reader(camera_id)
+        return reader is not None and reader.is_running()
+
+    def lease_ring(self, camera_id):
+        """
+        Returns a RingLease on a camera's ring (entering yields None if the camera has no ring).
+
+        With shared memory, frames from ring.latest() and ring.clip() are views into the ring,
+        valid only while the lease is held.
+        """
+        return RingLease(self.get_reader(camera_id))
+
+    def status(self):
+        with self._lock:
+            readers = list(self._readers.values())
+        return [reader.status() for reader in readers]
+
+
+_engine = None
+_engine_lock = threading.Lock()
+
+
+def get_ingestion_engine():
+    """
+    Returns the process-wide ingestion engine shared by all sessions.
+    """
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = IngestionEngine()
+        return _engine
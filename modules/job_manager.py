@@ -0,0 +1,157 @@
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+default_max_workers = 4
+# Finished jobs are forgotten after this many seconds
+finished_job_ttl_seconds = 3600
+
+
+class Job:
+    def __init__(self, session_id, camera_id, name):
+        """
+        A background task with progress that the UI can poll across reruns.
+        """
+        self.id = uuid.uuid4().hex
+        self.session_id = session_id
+        self.camera_id = camera_id
+        self.name = name
+        self.status = "queued"
+        self.progress = 0.0
+        self.message = ""
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.cancel_requested = False
+        self._lock = threading.Lock()
+
+    def update(self, progress=None, message=None):
+        """
+        Reports progress (0-1) and/or a status message from inside the job.
+        """
+        with self._lock:
+            if progress is not None:
+                self.progress = max(0.0, min(1.0, progress))
+            if message is not None:
+                self.message = message
+
+    def is_finished(self):
+        return self.status in ("done", "failed", "cancelled")
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "id": self.id,
+                "name": self.name,
+                "camera_id": self.camera_id,
+                "status": self.status,
+                "progress": self.progress,
+                "message": self.message,
+                "error": self.error,
+            }
+
+
+class JobManager:
+    def __init__(self, max_workers=default_max_workers):
+        """
+        Runs recording, extraction, upload and analysis jobs on a shared thread pool, keyed by session and camera.
+        """
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id, camera_id, name, func, *args, **kwargs):
+        """
+        Runs func(job, *args, **kwargs) in the background and returns its Job.
+
+        If the same session already has an unfinished job with this name for this camera,
+        that job is returned instead of starting a duplicate.
+        """
+        with self._lock:
+            self._prune()
+            for job in self._jobs.values():
+                if (job.session_id, job.camera_id, job.name) == (session_id, camera_id, name) and not job.is_finished():
+                    return job
+            job = Job(session_id, camera_id, name)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job, func, args, kwargs)
+        return job
+
+    def _run(self, job, func, args, kwargs):
+        if job.cancel_requested:
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        try:
+            job.result = func(job, *args, **kwargs)
+            job.status = "cancelled" if job.cancel_requested else "done"
+            if job.status == "done":
+                job.update(progress=1.0)
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+            traceback.print_exc()
+        finally:
+            job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        """
+        Asks a job to stop; jobs check job.cancel_requested between steps.
+        """
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel_requested = True
+        return job
+
+    def jobs_for(self, session_id=None, camera_id=None):
+        """
+        Returns jobs filtered by session and/or camera, newest first.
+        """
+        with self._lock:
+            jobs = list(self._jobs.values())
+        jobs = [
+            job for job in jobs
+            if (session_id is None or job.session_id == session_id)
+            and (camera_id is None or job.camera_id == camera_id)
+        ]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def _prune(self):
+        cutoff = time.time() - finished_job_ttl_seconds
+        for job_id in [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]:
+            del self._jobs[job_id]
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    """
+    Returns the process-wide job manager shared by all sessions.
+    """
+    global _job_manager
+    with _job_manager_lock:
+        if _job_manager is None:
+            _job_manager = JobManager()
+        return _job_manager
+
+
+def get_session_id(session_state):
+    """
+    Returns a stable ID for a Streamlit session, stored in its session state.
+    """
+    if 'session_id' not in session_state:
+        session_state['session_id'] = uuid.uuid4().hex
+    return session_state['session_id']
@@ -0,0 +1,79 @@
+import cv2
+
+default_preview_width = 640
+default_preview_jpeg_quality = 70
+default_min_fps = 1.0
+default_max_fps = 10.0
+# Frame interval is kept this many times above the measured round-trip
+round_trip_headroom = 1.5
+# Weight of the newest round-trip measurement in the moving average
+round_trip_smoothing = 0.3
+
+
+class AdaptivePreview:
+    def __init__(self, display_width=default_preview_width, jpeg_quality=default_preview_jpeg_quality,
+                 min_fps=default_min_fps, max_fps=default_max_fps):
+        """
+        Turns the newest frame of a stream into a small JPEG for display, at an adaptive rate.
+
+        Frames are downscaled to display_width and JPEG-encoded at jpeg_quality before they
+        reach the browser. interval is the delay until the next frame should be shown:
+        it follows a moving average of the measured render round-trip (encode plus
+        display), clamped between 1/max_fps and 1/min_fps, so a slow client gets fewer
+        frames instead of a growing lag.
+        """
+        self.display_width = display_width
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), int(jpeg_quality)]
+        self._round_trip = None
+        self.frames_shown = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self._last_sequence = None
+
+    def encode(self, frame):
+        """
+        Returns the frame downscaled to the display width and encoded as JPEG bytes, or None.
+        """
+        height, width = frame.shape[:2]
+        if width > self.display_width:
+            frame = cv2.resize(
+                frame, (self.display_width, max(1, int(height * self.display_width / width))),
+                interpolation=cv2.INTER_AREA,
+            )
+        ret, jpeg = cv2.imencode(".jpg", frame, self._params)
+        return jpeg.tobytes() if ret else None
+
+    def frame_shown(self, sequence, jpeg, round_trip_seconds):
+        """
+        Records a displayed frame; frames between the previous one and this one count as skipped.
+        """
+        if self._last_sequence is not None:
+            self.frames_skipped += max(0, sequence - self._last_sequence - 1)
+        self._last_sequence = sequence
+        self.frames_shown += 1
+        self.bytes_sent += len(jpeg)
+        if self._round_trip is None:
+            self._round_trip = round_trip_seconds
+        else:
+            self._round_trip += round_trip_smoothing * (round_trip_seconds - self._round_trip)
+
+    @property
+    def interval(self):
+        if self._round_trip is None:
+            return 1.0 / self.max_fps
+        return min(1.0 / self.min_fps, max(1.0 / self.max_fps, self._round_trip * round_trip_headroom))
+
+    @property
+    def fps(self):
+        return 1.0 / self.interval
+
+    def stats(self):
+        return {
+            "frames_shown": self.frames_shown,
+            "frames_skipped": self.frames_skipped,
+            "fps": self.fps,
+            "round_trip_ms": None if self._round_trip is None else self._round_trip * 1000,
+            "average_jpeg_bytes": self.bytes_sent / self.frames_shown if self.frames_shown else 0,
+        }
@@ -0,0 +1,135 @@
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from modules.incident_store import local_timezone
+
+# Records per partition that trigger a flush, and the longest a record waits before one
+default_flush_records = 200
+default_flush_seconds = 5.0
+
+
+def partition_path(camera_id, record_time):
+    """
+    Hive-style partition for a camera and day, e.g. camera_id=123/date=2024-05-01/.
+    """
+    return f"camera_id={camera_id}/date={record_time.strftime('%Y-%m-%d')}/"
+
+
+class MetadataSink:
+    def __init__(self, s3_client=None, bucket=None, prefix="", local_directory=None,
+                 flush_records=default_flush_records, flush_seconds=default_flush_seconds):
+        """
+        Streams per-frame metadata records to JSON Lines files partitioned by camera and date.
+
+        Records are buffered per partition and written in batches: a partition is flushed
+        once it holds flush_records records or its oldest record is flush_seconds old.
+        Every flush writes a new, uniquely named part file, so concurrent writers never
+        overwrite each other and readers can pick up new parts incrementally. Parts go to
+        s3://bucket/prefix when an S3 client is given, otherwise under local_directory.
+        """
+        if s3_client is None and local_directory is None:
+            raise ValueError("MetadataSink needs an S3 client or a local directory")
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.prefix = prefix
+        self.local_directory = local_directory
+        self.flush_records = flush_records
+        self.flush_seconds = flush_seconds
+        self._buffers = {}
+        self._oldest = {}
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self.records = 0
+        self.parts_written = 0
+        self.failed_parts = 0
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="metadata-flush", daemon=True)
+        self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def add(self, record, record_time=None):
+        """
+        Buffers one record (a JSON-serialisable dict with a camera_id).
+
+        record_time is a datetime used for the date partition; defaults to the current local time.
+        """
+        partition = partition_path(record["camera_id"], record_time or datetime.datetime.now(local_timezone))
+        line = json.dumps(record, default=str)
+        ready = None
+        with self._lock:
+            buffer = self._buffers.setdefault(partition, [])
+            if not buffer:
+                self._oldest[partition] = time.monotonic()
+            buffer.append(line)
+            self.records += 1
+            if len(buffer) >= self.flush_records:
+                ready = self._take(partition)
+        if ready:
+            self._write_part(partition, ready)
+
+    def _take(self, partition):
+        self._oldest.pop(partition, None)
+        return self._buffers.pop(partition, [])
+
+    def flush(self, max_age_seconds=0.0):
+        """
+        Writes every partition whose oldest record is at least max_age_seconds old.
+        """
+        now = time.monotonic()
+        with self._lock:
+            due = [partition for partition, oldest in self._oldest.items() if now - oldest >= max_age_seconds]
+            batches = [(partition, self._take(partition)) for partition in due]
+        for partition, lines in batches:
+            if lines:
+                self._write_part(partition, lines)
+
+    def _flush_periodically(self):
+        while not self._stop.wait(self.flush_seconds / 2):
+            self.flush(self.flush_seconds)
+
+    def _write_part(self, partition, lines):
+        part_name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.jsonl"
+        body = ("\n".join(lines) + "\n").encode("utf-8")
+        # Serialise writes so parts of a partition appear in order
+        with self._write_lock:
+            try:
+                if self.s3_client is not None:
+                    self.s3_client.put_object(
+                        Bucket=self.bucket, Key=f"{self.prefix}{partition}{part_name}",
+                        Body=body, ContentType="application/x-ndjson",
+                    )
+                else:
+                    directory = os.path.join(self.local_directory, partition)
+                    os.makedirs(directory, exist_ok=True)
+                    with open(os.path.join(directory, part_name), "wb") as part_file:
+                        part_file.write(body)
+                self.parts_written += 1
+            except Exception as e:
+                self.failed_parts += 1
+                print(f"Error writing metadata part {partition}{part_name}: {e}")
+
+    def close(self):
+        """
+        Stops the background flusher and writes all buffered records.
+        """
+        self._stop.set()
+        self._flusher.join()
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            buffered = sum(len(lines) for lines in self._buffers.values())
+        return {
+            "records": self.records,
+            "buffered": buffered,
+            "parts_written": self.parts_written,
+            "failed_parts": self.failed_parts,
+        }
@@ -1,10 +1,198 @@
 import streamlit as st
 from PIL import Image
+import os
+import math
+import hashlib
 import time
+import cv2
+import numpy as np
+from modules.inference import get_accident_detector, draw_detections, default_model_path
+from modules.frame_sampler import FrameSampler, FixedRatePolicy
+from modules.ingestion import get_ingestion_engine
+from modules.job_manager import get_job_manager, get_session_id
+from modules.workspace import JobWorkspace
+from modules.incident_store import get_incident_store, severity_from_score
+from modules.event_bus import get_event_bus, detection_topic
+from modules.notifications import get_notification_pipeline
+
+# Frames analysed per uploaded video / live clip
+analysis_sample_fps = 2
+analysis_max_frames = 64
+live_clip_seconds = 5
+# Accident score above which a notification is raised
+notification_score_threshold = 0.5
+
+
+def load_uploaded_frames(uploaded_file):
+    """
+    Decodes an uploaded image, or samples frames from an uploaded video, as BGR arrays.
+    """
+    data = uploaded_file.getvalue()
+    if uploaded_file.type.startswith("image"):
+        frame = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        return [] if frame is None else [frame]
+
+    # OpenCV needs a file path to decode video
+    suffix = os.path.splitext(uploaded_file.name)[1] or ".mp4"
+    # The upload only needs to exist while it is decoded, so keep it in memory when possible
+    with JobWorkspace("upload", in_memory=True) as workspace:
+        video_path = workspace.file_path(f"video{suffix}")
+        with open(video_path, "wb") as video_file:
+            video_file.write(data)
+        sampler = FrameSampler(FixedRatePolicy(analysis_sample_fps))
+        frames = []
+        for _, _, frame in sampler.sample_video(video_path):
+            frames.append(frame)
+            if len(frames) >= analysis_max_frames:
+                break
+        return frames
+
+
+def load_live_frames(camera_id):
+    """
+    Samples frames from the last few seconds buffered for a monitored camera.
+    """
+    with get_ingestion_engine().lease_ring(camera_id) as ring:
+        clip = [] if ring is None else ring.clip(live_clip_seconds)
+        sampler = FrameSampler(FixedRatePolicy(analysis_sample_fps))
+        sampler.start()
+        start_time = clip[0][1] if clip else 0
+        frames = []
+        for sequence, timestamp, frame in clip:
+            if len(frames) >= analysis_max_frames:
+                break
+            if not sampler.offer(frame, timestamp - start_time):
+                continue
+            # Copy out of the shared ring so the decoder can keep writing; a slot reused
+            # during the copy holds a newer, possibly half-written frame, so that copy is dropped
+            copied = frame.copy()
+            if ring.is_current(sequence):
+                frames.append(copied)
+        return frames
+
+
+def analyze_frames(frames):
+    """
+    Runs the accident detector over frames and summarises the results for the UI.
+    """
+    detector = get_accident_detector()
+    started = time.perf_counter()
+    results = detector.detect(frames)
+    elapsed = time.perf_counter() - started
+    batches = math.ceil(len(frames) / detector.batch_size)
+
+    best_index = max(range(len(results)), key=lambda i: results[i]["accident_score"])
+    accident_score = results[best_index]["accident_score"]
+    annotated = draw_detections(frames[best_index], results[best_index])
+    return {
+        "backend": detector.backend.name,
+        "frames": len(frames),
+        "frames_per_second": len(frames) / elapsed if elapsed else 0.0,
+        "batch_latency_ms": 1000 * elapsed / batches,
+        "accident_score": accident_score,
+        "severity": severity_from_score(accident_score),
+        "annotated_frame": annotated,
+    }
+
+
+def analysis_job(job, load_frames, *args):
+    """
+    Background job that loads frames with load_frames(*args) and runs the detector on them.
+    """
+    job.update(progress=0.1, message="Loading frames")
+    frames = load_frames(*args)
+    if not frames:
+        raise ValueError("No frames to analyze.")
+    job.update(progress=0.4, message=f"Accident detecting ({len(frames)} frames)")
+    return analyze_frames(frames)
+
+
+def upload_source_id(uploaded_file):
+    """
+    Stable incident source ID for an uploaded file, so unrelated uploads are never grouped together.
+    """
+    return f"upload-{hashlib.sha1(uploaded_file.getvalue()).hexdigest()[:12]}"
+
+
+def start_analysis(camera_id, load_frames, *args, source_id=None):
+    job = get_job_manager().submit(
+        get_session_id(st.session_state), camera_id, "analysis", analysis_job, load_frames, *args
+    )
+    st.session_state['analysis_job_id'] = job.id
+    st.session_state['analysis_camera_id'] = camera_id
+    st.session_state['analysis_source_id'] = source_id or camera_id
+    st.session_state['analysis_complete'] = False
+    st.session_state.pop('analysis_result', None)
+    st.session_state.pop('notification_sent', None)
+
+
+@st.fragment(run_every=1)
+def display_analysis_progress(job_id):
+    """
+    Polls the analysis job and reruns the app once it has finished.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return
+    if job.is_finished():
+        st.rerun()
+    snapshot = job.snapshot()
+    st.progress(snapshot['progress'], text=snapshot['message'] or snapshot['status'])
+
+
+def collect_analysis_result():
+    """
+    Moves a finished analysis job's result into session state.
+    """
+    job_id = st.session_state.get('analysis_job_id')
+    job = get_job_manager().get(job_id) if job_id else None
+    if job is None:
+        return
+    if not job.is_finished():
+        display_analysis_progress(job_id)
+        return
+    del st.session_state['analysis_job_id']
+    if job.status == "done":
+        st.session_state['analysis_result'] = job.result
+        st.session_state['analysis_complete'] = True
+    else:
+        st.write(f"Analysis failed: {job.error}")
+
+
+def publish_analysis_incident(result):
+    """
+    Records an analysis that crossed the notification threshold as an incident and publishes it for the responder feed.
+    """
+    get_notification_pipeline()
+    camera_id = st.session_state.get('analysis_camera_id')
+    camera = st.session_state.get('selected_camera')
+    camera_info = camera.__dict__ if camera is not None and camera.__dict__['id'] == camera_id else {}
+    incident = get_incident_store().record_detection(**{
+        "camera_id": st.session_state.get('analysis_source_id') or camera_id or f"upload-{time.time_ns()}",
+        "camera_area": camera_info.get('name', "Uploaded footage"),
+        "latitude": camera_info.get('latitude'),
+        "longitude": camera_info.get('longitude'),
+        "detected_at": time.time(),
+        "accident_score": result['accident_score'],
+        "severity": result['severity'],
+        "source": "analysis",
+    })
+    get_event_bus().publish(detection_topic, incident)
+
+
+def model_available():
+    """
+    True if the detector weights are installed; otherwise warns that analysis is unavailable.
+    """
+    if os.path.exists(default_model_path):
+        return True
+    st.warning(f"Accident detection model not found at {default_model_path}; analysis is unavailable.")
+    return False
+
 
 def display_model_analysis():
     # st.subheader("Model Module")
-    
+
     # Check if the session state has the result of the analysis to avoid clearing it after rerun
     if 'analysis_complete' not in st.session_state:
         st.session_state['analysis_complete'] = False
@@ -21,6 +209,14 @@ def display_model_analysis():
     else:
         uploaded_file = st.session_state['uploaded_file']  # Retrieve the uploaded file from session state
 
+    # A monitored camera can be analysed from its live buffer instead of an upload
+    selected_camera = st.session_state.get('selected_camera')
+    live_camera_id = None
+    if selected_camera is not None and get_ingestion_engine().is_monitoring(selected_camera.__dict__['id']):
+        live_camera_id = selected_camera.__dict__['id']
+        if st.button("Analyze Live Camera") and model_available():
+            start_analysis(live_camera_id, load_live_frames, live_camera_id)
+
     if uploaded_file is not None:
         col1, col2, col3 = st.columns([2, 2, 1])  # Adjust column widths as needed
 
@@ -35,52 +231,30 @@ def display_model_analysis():
 
         # Button to trigger the display in col2
         button_clicked = st.button("Analyze")
-        if button_clicked or st.session_state['analysis_complete']:
-            st.session_state['analysis_complete'] = True
-
-            with col2:
-                if uploaded_file.type.startswith("image"):
-                    st.image(image, caption="First visual analysis", use_column_width=True)
-                elif uploaded_file.type.startswith("video"):
-                    st.video('demo/demo_visual.mp4')
-                    st.caption("First visual analysis")
-
-            # In col3, display the analysis phases
-            with col3:
-                # Phase 1: Accident detecting
-                if 'phase1_complete' not in st.session_state:
-                    st.write("🔍 Accident detecting:")
-                    progress_bar1 = st.progress(0)
-                    for percent in range(100):
-                        time.sleep(0.05)
-                        progress_bar1.progress(percent + 1)
-                    time.sleep(2)
-                    st.session_state['phase1_complete'] = True  # Mark phase 1 as done
-                else:
-                    st.write("🔍 Accident detecting completed ✔️")
-
-                # Phase 2: Severity analyzing
-                if 'phase2_complete' not in st.session_state:
-                    st.write("🧠 Severity analyzing:")
-                    progress_bar2 = st.progress(0)
-                    for percent in range(100):
-                        time.sleep(0.05)
-                        progress_bar2.progress(percent + 1)
-                    time.sleep(2)
-                    st.session_state['phase2_complete'] = True  # Mark phase 2 as done
-                else:
-                    st.write("🧠 Severity analyzing completed ✔️")
-
-                # Phase 3: Generating the notification
-                if 'phase3_complete' not in st.session_state:
-                    st.write("✅ Generating the notification")
-                    progress_bar3 = st.progress(0)
-                    for percent in range(100):
-                        time.sleep(0.05)
-                        progress_bar3.progress(percent + 1)
-                    time.sleep(2)
-                    st.session_state['notification_ready'] = True
-                    st.session_state['phase3_complete'] = True  # Mark phase 3 as done
-                    st.write("Analyzing completed ✔️")
-                else:
-                    st.write("✅ Notification generated ✔️")
\ No newline at end of file
+        if button_clicked and model_available():
+            start_analysis(None, load_uploaded_frames, uploaded_file, source_id=upload_source_id(uploaded_file))
+
+    # Analysis runs in the background; poll it until the result is ready
+    collect_analysis_result()
+
+    if st.session_state['analysis_complete'] and 'analysis_result' in st.session_state:
+        result = st.session_state['analysis_result']
+        if uploaded_file is None:
+            col2, col3 = st.columns([2, 1])
+
+        with col2:
+            st.image(result["annotated_frame"], channels="BGR", caption="First visual analysis", use_column_width=True)
+
+        # In col3, display the analysis results
+        with col3:
+            st.write(f"🔍 Accident detecting completed ✔️ ({result['frames']} frames)")
+            st.write(f"⚡ {result['frames_per_second']:.1f} frames/s, {result['batch_latency_ms']:.0f} ms/batch ({result['backend']})")
+            st.write(f"🧠 Severity: {result['severity']} (score {result['accident_score']:.2f})")
+
+            if result["accident_score"] >= notification_score_threshold:
+                if 'notification_sent' not in st.session_state:
+                    publish_analysis_incident(result)
+                    st.session_state['notification_sent'] = True
+                st.write("✅ Notification generated ✔️")
+            else:
+                st.write("No accident detected.")
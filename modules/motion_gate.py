@@ -0,0 +1,133 @@
+import threading
+import cv2
+import numpy as np
+
+# Percentage of changed thumbnail pixels needed to count as motion
+default_motion_threshold = 1.0
+# Forward a frame at least this often (seconds) even when nothing moves
+default_heartbeat_seconds = 10.0
+# Grey-level change for a pixel to count as changed (difference method)
+pixel_change_threshold = 25
+thumbnail_width = 160
+
+
+class MotionGate:
+    def __init__(self, threshold=default_motion_threshold, heartbeat_seconds=default_heartbeat_seconds, method="difference"):
+        """
+        Cheap per-camera pre-filter that passes on frames only when the scene changes.
+
+        method is "difference" (changed pixels against the previous frame) or "mog2"
+        (foreground pixels from cv2.createBackgroundSubtractorMOG2). Both work on a small
+        blurred grayscale thumbnail. The motion score is the percentage of changed pixels.
+        """
+        if method not in ("difference", "mog2"):
+            raise ValueError(f"Unknown motion gate method: {method}")
+        self.threshold = threshold
+        self.heartbeat_seconds = heartbeat_seconds
+        self.method = method
+        self._previous = None
+        self._subtractor = None
+        if method == "mog2":
+            self._subtractor = cv2.createBackgroundSubtractorMOG2(history=200, detectShadows=False)
+        self._last_forwarded = None
+        self.last_score = 0.0
+        self.frames = 0
+        self.forwarded = 0
+
+    def score(self, frame):
+        """
+        Returns the motion score (0-100) of a BGR frame and updates the reference.
+        """
+        height, width = frame.shape[:2]
+        small_height = max(1, int(height * thumbnail_width / width))
+        small = cv2.resize(frame, (thumbnail_width, small_height), interpolation=cv2.INTER_AREA)
+        gray = cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_BGR2GRAY), (5, 5), 0)
+
+        if self._subtractor is not None:
+            mask = self._subtractor.apply(gray)
+            return 100.0 * np.count_nonzero(mask) / mask.size
+
+        previous = self._previous
+        self._previous = gray
+        if previous is None or previous.shape != gray.shape:
+            return 100.0
+        changed = cv2.absdiff(gray, previous) > pixel_change_threshold
+        return 100.0 * np.count_nonzero(changed) / changed.size
+
+    def should_forward(self, frame, timestamp):
+        """
+        True if the frame moved enough, or the heartbeat interval has passed since the last forwarded frame.
+        """
+        self.frames += 1
+        self.last_score = self.score(frame)
+        heartbeat_due = (
+            self._last_forwarded is None
+            or timestamp - self._last_forwarded >= self.heartbeat_seconds
+        )
+        if self.last_score >= self.threshold or heartbeat_due:
+            self._last_forwarded = timestamp
+            self.forwarded += 1
+            return True
+        return False
+
+    @property
+    def skipped(self):
+        return self.frames - self.forwarded
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.frames if self.frames else 0.0
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "forwarded": self.forwarded,
+            "skipped": self.skipped,
+            "skip_ratio": self.skip_ratio,
+            "last_score": self.last_score,
+        }
+
+
+class MotionGateBank:
+    def __init__(self, threshold=default_motion_threshold, heartbeat_seconds=default_heartbeat_seconds, method="difference"):
+        """
+        Keeps one MotionGate per camera.
+        """
+        self.threshold = threshold
+        self.heartbeat_seconds = heartbeat_seconds
+        self.method = method
+        self._gates = {}
+        self._lock = threading.Lock()
+
+    def gate_for(self, camera_id):
+        with self._lock:
+            gate = self._gates.get(camera_id)
+            if gate is None:
+                gate = MotionGate(self.threshold, self.heartbeat_seconds, self.method)
+                self._gates[camera_id] = gate
+            return gate
+
+    def get(self, camera_id):
+        """
+        Returns the camera's gate, or None if it has none; unlike gate_for() it never creates one.
+        """
+        with self._lock:
+            return self._gates.get(camera_id)
+
+    def remove(self, camera_id):
+        with self._lock:
+            self._gates.pop(camera_id, None)
+
+    def stats(self):
+        """
+        Returns per-camera gate stats plus the overall skip ratio.
+        """
+        with self._lock:
+            gates = dict(self._gates)
+        per_camera = {camera_id: gate.stats() for camera_id, gate in gates.items()}
+        frames = sum(stats["frames"] for stats in per_camera.values())
+        skipped = sum(stats["skipped"] for stats in per_camera.values())
+        return {
+            "cameras": per_camera,
+            "skip_ratio": skipped / frames if frames else 0.0,
+        }
@@ -0,0 +1,306 @@
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from boto3.s3.transfer import TransferConfig
+
+# S3 requires parts of at least 5 MB (except the last one)
+default_part_size = 8 * 1024 * 1024
+default_max_concurrency = 4
+# Progress of unfinished uploads, so they can resume after a crash
+upload_state_directory = "./upload_state/"
+# In-process attempts per upload, with exponential backoff between them
+default_upload_attempts = 3
+retry_backoff_seconds = 2
+# Unfinished uploads are retried this often, and aborted (parts deleted on S3) after the max age
+pending_retry_interval_seconds = 600
+pending_upload_max_age_seconds = 24 * 3600
+
+# State paths of uploads running in this process, which the retry sweep must not touch
+_active_uploads = set()
+_active_lock = threading.Lock()
+
+# For small files that go through boto3's managed transfer
+transfer_config = TransferConfig(
+    multipart_threshold=default_part_size,
+    multipart_chunksize=default_part_size,
+    max_concurrency=default_max_concurrency,
+    use_threads=True,
+)
+
+
+class ResumableUpload:
+    def __init__(self, s3_client, file_path, bucket, key, part_size=default_part_size,
+                 max_concurrency=default_max_concurrency, state_directory=upload_state_directory,
+                 max_attempts=default_upload_attempts):
+        """
+        Multipart upload of one file that can pick up from its last completed part.
+
+        Every part is sent with its Content-MD5 so S3 rejects corrupted parts, and the
+        final ETag is compared with the MD5s of the parts. Completed parts are written
+        to a state file after each part; if the process dies, a new ResumableUpload for
+        the same file and key continues the same S3 upload instead of starting over.
+        Failed parts are retried up to max_attempts times; an upload that still fails is
+        left to resume_pending_uploads(), which retries it later or aborts it once too old.
+        """
+        self.s3_client = s3_client
+        self.file_path = file_path
+        self.bucket = bucket
+        self.key = key
+        self.part_size = part_size
+        self.max_concurrency = max_concurrency
+        self.state_directory = state_directory
+        self.max_attempts = max(1, max_attempts)
+        self.created_at = None
+        self.file_size = os.path.getsize(file_path)
+        self.part_count = max(1, -(-self.file_size // part_size))
+        self.upload_id = None
+        self.parts = {}
+        self.resumed_parts = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state_path(self):
+        name = hashlib.sha1(f"{self.bucket}/{self.key}".encode()).hexdigest()
+        return os.path.join(self.state_directory, f"{name}.json")
+
+    def _fingerprint(self):
+        stat = os.stat(self.file_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime, "part_size": self.part_size}
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return None
+        try:
+            with open(self.state_path) as state_file:
+                state = json.load(state_file)
+        except (OSError, ValueError):
+            return None
+        # A changed file or part size makes the saved parts useless
+        if state.get("fingerprint") != self._fingerprint() or state.get("key") != self.key:
+            self._abort(state.get("upload_id"))
+            return None
+        return state
+
+    def _save_state(self):
+        os.makedirs(self.state_directory, exist_ok=True)
+        state = {
+            "file_path": os.path.abspath(self.file_path),
+            "bucket": self.bucket,
+            "key": self.key,
+            "upload_id": self.upload_id,
+            "fingerprint": self._fingerprint(),
+            "created_at": self.created_at,
+            "parts": {str(number): part for number, part in self.parts.items()},
+        }
+        temp_path = f"{self.state_path}.tmp"
+        with open(temp_path, "w") as state_file:
+            json.dump(state, state_file)
+        os.replace(temp_path, self.state_path)
+
+    def _clear_state(self):
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+
+    def _abort(self, upload_id):
+        if not upload_id:
+            return
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=upload_id)
+        except Exception:
+            pass
+
+    def _read_part(self, number):
+        with open(self.file_path, "rb") as source:
+            source.seek((number - 1) * self.part_size)
+            return source.read(self.part_size)
+
+    def _start(self):
+        state = self._load_state()
+        if state is not None:
+            try:
+                # Trust only parts S3 still has with the checksum we recorded
+                listed = self.s3_client.list_parts(Bucket=self.bucket, Key=self.key, UploadId=state["upload_id"])
+                server_etags = {part["PartNumber"]: part["ETag"] for part in listed.get("Parts", [])}
+                self.upload_id = state["upload_id"]
+                self.created_at = state.get("created_at") or time.time()
+                for number, part in state["parts"].items():
+                    if server_etags.get(int(number)) == part["etag"]:
+                        self.parts[int(number)] = part
+                self.resumed_parts = len(self.parts)
+                return
+            except Exception as e:
+                print(f"Cannot resume upload of {self.key}, starting over: {e}")
+                self._clear_state()
+
+        response = self.s3_client.create_multipart_upload(Bucket=self.bucket, Key=self.key)
+        self.upload_id = response["UploadId"]
+        self.created_at = time.time()
+        self._save_state()
+
+    def _upload_part(self, number):
+        data = self._read_part(number)
+        digest = hashlib.md5(data).digest()
+        response = self.s3_client.upload_part(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=number,
+            Body=data, ContentMD5=base64.b64encode(digest).decode(),
+        )
+        with self._lock:
+            self.parts[number] = {"etag": response["ETag"], "md5": digest.hex()}
+            self._save_state()
+
+    def upload(self):
+        """
+        Uploads all parts not already on S3 and completes the upload. Returns the object's ETag.
+
+        Raises the last error once max_attempts are used up; the state file is kept so
+        the upload can be resumed later.
+        """
+        with _active_lock:
+            if self.state_path in _active_uploads:
+                raise RuntimeError(f"Upload to s3://{self.bucket}/{self.key} is already running")
+            _active_uploads.add(self.state_path)
+        try:
+            for attempt in range(1, self.max_attempts + 1):
+                try:
+                    return self._upload_once()
+                except Exception as e:
+                    if attempt == self.max_attempts:
+                        raise
+                    print(f"Upload of {self.key} failed (attempt {attempt}/{self.max_attempts}), retrying: {e}")
+                    time.sleep(retry_backoff_seconds * 2 ** (attempt - 1))
+        finally:
+            with _active_lock:
+                _active_uploads.discard(self.state_path)
+
+    def abort(self):
+        """
+        Gives up on the upload: deletes its parts on S3 and forgets its state.
+        """
+        state = self._load_state() if self.upload_id is None else None
+        self._abort(self.upload_id or (state or {}).get("upload_id"))
+        self._clear_state()
+
+    def _upload_once(self):
+        if self.upload_id is None:
+            self._start()
+        missing = [number for number in range(1, self.part_count + 1) if number not in self.parts]
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+            # Surface the first failure; completed parts stay recorded for the next attempt
+            for future in [executor.submit(self._upload_part, number) for number in missing]:
+                future.result()
+
+        ordered = [(number, self.parts[number]) for number in sorted(self.parts)]
+        response = self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket, Key=self.key, UploadId=self.upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": number, "ETag": part["etag"]} for number, part in ordered]},
+        )
+        combined = hashlib.md5(b"".join(bytes.fromhex(part["md5"]) for _, part in ordered)).hexdigest()
+        expected_etag = f"{combined}-{len(ordered)}"
+        etag = response.get("ETag", "").strip('"')
+        if etag and etag != expected_etag:
+            # Buckets with SSE-KMS return ETags that are not MD5-based
+            print(f"Warning: ETag of s3://{self.bucket}/{self.key} does not match its part checksums")
+        self._clear_state()
+        return etag
+
+
+def upload_file_resumable(s3_client, file_path, bucket, key, part_size=default_part_size):
+    """
+    Uploads a file, using a resumable, checksummed multipart upload when it spans more than one part.
+    """
+    if os.path.getsize(file_path) <= part_size:
+        s3_client.upload_file(file_path, bucket, key, Config=transfer_config)
+        return None
+    return ResumableUpload(s3_client, file_path, bucket, key, part_size).upload()
+
+
+def _read_pending_states(state_directory):
+    if not os.path.isdir(state_directory):
+        return []
+    states = []
+    for state_filename in os.listdir(state_directory):
+        if not state_filename.endswith(".json"):
+            continue
+        state_path = os.path.join(state_directory, state_filename)
+        try:
+            with open(state_path) as state_file:
+                states.append((state_path, json.load(state_file)))
+        except (OSError, ValueError) as e:
+            print(f"Error reading upload state {state_filename}: {e}")
+    return states
+
+
+def pending_upload_sources(state_directory=upload_state_directory):
+    """
+    Returns the absolute paths of source files whose uploads are unfinished.
+    """
+    return {state["file_path"] for _, state in _read_pending_states(state_directory) if "file_path" in state}
+
+
+def _abort_pending(s3_client, state_path, state):
+    try:
+        s3_client.abort_multipart_upload(Bucket=state["bucket"], Key=state["key"], UploadId=state["upload_id"])
+    except Exception as e:
+        print(f"Error aborting upload to s3://{state['bucket']}/{state['key']}: {e}")
+    if os.path.exists(state_path):
+        os.remove(state_path)
+
+
+def resume_pending_uploads(s3_client, state_directory=upload_state_directory,
+                           max_age_seconds=pending_upload_max_age_seconds):
+    """
+    Finishes unfinished uploads (from a previous process, or ones that failed in this one).
+
+    Uploads whose source file is gone, or that are older than max_age_seconds, are
+    aborted so their parts stop accruing storage on S3. Uploads still running in this
+    process are skipped.
+    """
+    resumed = 0
+    now = time.time()
+    for state_path, state in _read_pending_states(state_directory):
+        with _active_lock:
+            if state_path in _active_uploads:
+                continue
+        try:
+            created_at = state.get("created_at") or os.path.getmtime(state_path)
+            if not os.path.exists(state["file_path"]) or now - created_at > max_age_seconds:
+                print(f"Aborting unfinished upload to s3://{state['bucket']}/{state['key']}")
+                _abort_pending(s3_client, state_path, state)
+                continue
+            ResumableUpload(
+                s3_client, state["file_path"], state["bucket"], state["key"],
+                state["fingerprint"]["part_size"], state_directory=state_directory, max_attempts=1,
+            ).upload()
+            resumed += 1
+            print(f"Resumed upload to s3://{state['bucket']}/{state['key']}")
+        except Exception as e:
+            print(f"Error resuming upload from {os.path.basename(state_path)}: {e}")
+    return resumed
+
+
+_resume_started = False
+_resume_lock = threading.Lock()
+
+
+def _resume_pending_uploads_forever(s3_client, interval_seconds):
+    while True:
+        resume_pending_uploads(s3_client)
+        time.sleep(interval_seconds)
+
+
+def resume_pending_uploads_in_background(s3_client, interval_seconds=pending_retry_interval_seconds):
+    """
+    Runs resume_pending_uploads on a background thread at startup and then every interval_seconds, once per process.
+    """
+    global _resume_started
+    with _resume_lock:
+        if _resume_started:
+            return
+        _resume_started = True
+    threading.Thread(
+        target=_resume_pending_uploads_forever, args=(s3_client, interval_seconds), name="resume-uploads", daemon=True
+    ).start()
@@ -0,0 +1,127 @@
+import threading
+import time
+from string import Template
+from modules.event_bus import get_event_bus, detection_topic, incident_topic
+from modules.geocoder import describe_location
+from modules.incident_store import local_time
+
+# Incident statuses (see IncidentStore.record_detection) that get a notification
+notified_statuses = ("new", "escalated")
+
+# Compiled once; rendering only substitutes fields
+brief_template = Template(
+    "A $severity accident has been detected at $camera_area, $location, on $date at $time from Camera ID: $camera_id. "
+    "Emergency services are urgently needed. Please divert traffic to ensure safety."
+)
+update_template = Template(
+    "Update: the accident at $camera_area, $location (Camera ID: $camera_id) is now $severity "
+    "after $detections detections since $time."
+)
+
+
+def render_notification(incident, location, template=brief_template):
+    started = local_time(incident["detected_at"])
+    return template.safe_substitute(
+        severity=incident["severity"],
+        camera_area=incident["camera_area"],
+        camera_id=incident["camera_id"],
+        location=location,
+        date=started.strftime("%Y-%m-%d"),
+        time=started.strftime("%H-%M-%S"),
+        detections=incident.get("detections", 1),
+    )
+
+
+def render_notifications(incidents, location_lookup=describe_location):
+    """
+    Renders messages for a batch of incidents, looking up each distinct location once.
+    """
+    locations = {}
+    messages = []
+    for incident in incidents:
+        coordinates = (incident["latitude"], incident["longitude"])
+        if coordinates not in locations:
+            locations[coordinates] = location_lookup(*coordinates)
+        template = update_template if incident.get("status") == "escalated" else brief_template
+        messages.append(render_notification(incident, locations[coordinates], template))
+    return messages
+
+
+class NotificationPipeline:
+    def __init__(self, event_bus, location_lookup=describe_location):
+        """
+        Turns detections from the bus into incident notifications.
+
+        Publishers record each detection with IncidentStore.record_detection first, so the
+        events carry the store's incident_id and status. Events are read in batches; new and
+        escalated incidents are rendered together and published to the incidents topic with
+        a "message", repeats of an open incident are suppressed. Events without a status
+        (published without a store) are treated as new.
+        """
+        self.event_bus = event_bus
+        self.location_lookup = location_lookup
+        self._subscription = event_bus.subscribe(detection_topic, maxsize=10000)
+        self._stop_event = threading.Event()
+        self.detections = 0
+        self.notifications = 0
+        self.suppressed = 0
+        self.batches = 0
+        self.render_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name="notification-pipeline", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            first = self._subscription.get(timeout=1.0)
+            if first is None:
+                continue
+            self.process([first] + self._subscription.poll())
+
+    def process(self, detections):
+        """
+        Publishes notifications for the new and escalated incidents in a batch of detections.
+        """
+        self.detections += len(detections)
+        incidents = [dict(detection) for detection in detections if detection.get("status", "new") in notified_statuses]
+        self.suppressed += len(detections) - len(incidents)
+        if not incidents:
+            return []
+        started = time.perf_counter()
+        messages = render_notifications(incidents, self.location_lookup)
+        self.render_seconds += time.perf_counter() - started
+        self.batches += 1
+        self.notifications += len(incidents)
+        for incident, message in zip(incidents, messages):
+            incident["message"] = message
+            self.event_bus.publish(incident_topic, incident)
+        return incidents
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=5)
+        self._subscription.close()
+
+    def stats(self):
+        return {
+            "detections": self.detections,
+            "notifications": self.notifications,
+            "suppressed": self.suppressed,
+            "batches": self.batches,
+            # Rendering throughput only; recording and publishing are not included
+            "renders_per_second": self.notifications / self.render_seconds if self.render_seconds else None,
+        }
+
+
+_pipeline = None
+_pipeline_lock = threading.Lock()
+
+
+def get_notification_pipeline():
+    """
+    Returns the process-wide notification pipeline, starting it on first use.
+    """
+    global _pipeline
+    with _pipeline_lock:
+        if _pipeline is None:
+            _pipeline = NotificationPipeline(get_event_bus())
+        return _pipeline
@@ -0,0 +1,182 @@
+import os
+import time
+import cv2
+from modules.decode_config import open_capture, full_decode
+
+default_segment_seconds = 60
+default_open_timeout_seconds = 10
+default_read_timeout_seconds = 5
+# No successful read for this long counts as a stall and forces a reconnect
+default_stall_seconds = 5
+default_max_reconnects = 3
+# Pause after a failed read so a broken stream cannot spin a core
+failed_read_backoff_seconds = 0.05
+
+
+class StreamRecorder:
+    def __init__(self, video_url, output_dir, base_name, duration_seconds,
+                 segment_seconds=default_segment_seconds, open_timeout_seconds=default_open_timeout_seconds,
+                 read_timeout_seconds=default_read_timeout_seconds, stall_seconds=default_stall_seconds,
+                 max_reconnects=default_max_reconnects, fourcc="mp4v", decode_config=full_decode, health=None):
+        """
+        Records a stream for a fixed wall-clock duration into rolling segment files.
+
+        The first segment is written to <base_name>.mp4 and later ones to
+        <base_name>_part<n>.mp4; each is handed to on_segment as soon as it is closed.
+        With output_dir=None frames are only passed to on_frame and nothing is written.
+        Reads time out instead of blocking, a stalled stream is reopened up to
+        max_reconnects times, and failed reads and missing frames are counted.
+        decode_config selects the decoder; the timeouts above override its own.
+        health, an optional StreamHealth, receives the same connect, read and reconnect events.
+        """
+        self.video_url = video_url
+        self.output_dir = output_dir
+        self.base_name = base_name
+        self.duration_seconds = duration_seconds
+        self.segment_seconds = segment_seconds or duration_seconds
+        self.open_timeout_seconds = open_timeout_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+        self.stall_seconds = stall_seconds
+        self.max_reconnects = max_reconnects
+        self.fourcc = cv2.VideoWriter_fourcc(*fourcc)
+        self.decode_config = decode_config.with_options(
+            open_timeout_seconds=open_timeout_seconds, read_timeout_seconds=read_timeout_seconds
+        )
+
+        self.fps = None
+        self.frames_written = 0
+        self.failed_reads = 0
+        self.reconnects = 0
+        self.segments = []
+        self.health = health
+
+    def _open(self):
+        started = time.monotonic()
+        cap = open_capture(self.video_url, self.decode_config)
+        if not cap.isOpened():
+            cap.release()
+            if self.health is not None:
+                self.health.record_connect(time.monotonic() - started, False)
+            return None
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if self.fps is None:
+            self.fps = fps if fps and fps > 0 else 20.0  # Default FPS
+        if self.health is not None:
+            self.health.record_connect(time.monotonic() - started, True, nominal_fps=fps if fps and fps > 0 else None)
+        return cap
+
+    def _segment_path(self, index):
+        suffix = "" if index == 0 else f"_part{index + 1}"
+        return os.path.join(self.output_dir, f"{self.base_name}{suffix}.mp4")
+
+    def record(self, on_frame=None, on_segment=None, progress_callback=None, should_stop=None):
+        """
+        Records until the duration has elapsed, should_stop() returns True, or the stream cannot be recovered.
+
+        on_frame(frame, elapsed_seconds) is called for every frame written,
+        on_segment(path) for every finished segment, and progress_callback(fraction)
+        about once per second. Returns a summary dict, or None if the stream never opened.
+        """
+        cap = self._open()
+        if cap is None:
+            return None
+
+        started = time.monotonic()
+        deadline = started + self.duration_seconds
+        last_good_read = started
+        last_progress = started
+        writer = None
+        segment_index = 0
+        segment_started = None
+
+        try:
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                if should_stop is not None and should_stop():
+                    print("Recording stopped early.")
+                    break
+
+                if now - last_good_read > self.stall_seconds:
+                    if self.reconnects >= self.max_reconnects:
+                        print(f"Stream stalled {self.reconnects} times; stopping recording early.")
+                        break
+                    if cap is not None:
+                        cap.release()
+                    self.reconnects += 1
+                    if self.health is not None:
+                        self.health.record_disconnect("Stream stalled; reconnecting.")
+                        self.health.record_reconnect()
+                    cap = self._open()
+                    last_good_read = time.monotonic()
+                    if cap is None:
+                        continue
+                if cap is None:
+                    cap = self._open()
+                    if cap is None:
+                        time.sleep(failed_read_backoff_seconds)
+                        continue
+
+                ret, frame = cap.read()
+                if not ret:
+                    self.failed_reads += 1
+                    if self.health is not None:
+                        self.health.record_failed_read()
+                    time.sleep(failed_read_backoff_seconds)
+                    continue
+                last_good_read = time.monotonic()
+                elapsed = last_good_read - started
+                if self.health is not None:
+                    self.health.record_frame()
+
+                if self.output_dir is not None:
+                    # Roll over to a new segment on wall-clock boundaries
+                    if writer is not None and last_good_read - segment_started >= self.segment_seconds:
+                        writer.release()
+                        self._finish_segment(segment_index, on_segment)
+                        writer = None
+                        segment_index += 1
+                    if writer is None:
+                        height, width = frame.shape[:2]
+                        writer = cv2.VideoWriter(
+                            self._segment_path(segment_index), self.fourcc, self.fps, (width, height)
+                        )
+                        segment_started = last_good_read
+                    writer.write(frame)
+
+                self.frames_written += 1
+                if on_frame is not None:
+                    on_frame(frame, elapsed)
+                if progress_callback is not None and last_good_read - last_progress >= 1:
+                    last_progress = last_good_read
+                    progress_callback(min(1.0, elapsed / self.duration_seconds))
+        finally:
+            if cap is not None:
+                cap.release()
+            if self.health is not None:
+                self.health.record_disconnect()
+            if writer is not None:
+                writer.release()
+                self._finish_segment(segment_index, on_segment)
+
+        recorded_seconds = time.monotonic() - started
+        return self.summary(recorded_seconds)
+
+    def _finish_segment(self, index, on_segment):
+        path = self._segment_path(index)
+        self.segments.append(path)
+        if on_segment is not None:
+            on_segment(path)
+
+    def summary(self, recorded_seconds):
+        expected_frames = int(self.fps * min(recorded_seconds, self.duration_seconds))
+        return {
+            "segments": list(self.segments),
+            "frames_written": self.frames_written,
+            "failed_reads": self.failed_reads,
+            "dropped_frames": max(0, expected_frames - self.frames_written),
+            "reconnects": self.reconnects,
+            "recorded_seconds": recorded_seconds,
+            "fps": self.fps,
+        }
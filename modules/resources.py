@@ -0,0 +1,62 @@
+import threading
+from collections import Counter
+import boto3
+from botocore.config import Config
+from traffic import API
+
+# Enough pooled connections for several upload pipelines running at once
+s3_max_pool_connections = 32
+
+_lock = threading.Lock()
+_traffic_apis = {}
+_s3_clients = {}
+creation_counts = Counter()
+lookup_counts = Counter()
+
+
+def get_traffic_api(api_key):
+    """
+    Returns the shared NYSDOT API client for an API key, creating it on first use.
+    """
+    with _lock:
+        lookup_counts["traffic_api"] += 1
+        api = _traffic_apis.get(api_key)
+        if api is None:
+            api = API(api_key)
+            _traffic_apis[api_key] = api
+            creation_counts["traffic_api"] += 1
+            print(f"Created NYSDOT API client ({creation_counts['traffic_api']} total)")
+        return api
+
+
+def get_s3_client(region_name=None):
+    """
+    Returns the shared S3 client (boto3 clients are thread-safe), creating it on first use.
+
+    Sharing it keeps credential resolution, endpoint setup and the HTTP connection pool
+    alive across Streamlit reruns and sessions.
+    """
+    with _lock:
+        lookup_counts["s3_client"] += 1
+        client = _s3_clients.get(region_name)
+        if client is None:
+            client = boto3.client(
+                "s3",
+                region_name=region_name,
+                config=Config(max_pool_connections=s3_max_pool_connections),
+            )
+            _s3_clients[region_name] = client
+            creation_counts["s3_client"] += 1
+            print(f"Created S3 client ({creation_counts['s3_client']} total)")
+        return client
+
+
+def resource_stats():
+    """
+    Returns how many clients were created versus requested, per resource type.
+    """
+    with _lock:
+        return {
+            name: {"created": creation_counts[name], "requested": lookup_counts[name]}
+            for name in ("traffic_api", "s3_client")
+        }
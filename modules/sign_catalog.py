@@ -0,0 +1,164 @@
+import threading
+import time
+from modules.spatial_index import GridIndex, haversine_m, to_coordinate
+
+# Sign messages change often, so the list is refreshed more often than the camera list
+default_refresh_interval = 60
+# Signs on other roadways are associated with a camera only within this distance
+default_nearby_radius_m = 2000
+default_signs_per_camera = 10
+
+
+def roadway_key(roadway):
+    return " ".join(str(roadway or "").lower().split())
+
+
+def sign_record(sign):
+    """
+    Plain-dict view of a sign returned by the traffic API.
+    """
+    fields = sign.__dict__
+    messages = fields.get("messages") or []
+    if isinstance(messages, str):
+        messages = [messages]
+    return {
+        "id": fields.get("id", "Unknown"),
+        "name": fields.get("name", "Unknown"),
+        "roadway": fields.get("roadway", ""),
+        "direction": fields.get("direction", ""),
+        "latitude": to_coordinate(fields.get("latitude")),
+        "longitude": to_coordinate(fields.get("longitude")),
+        "messages": [str(message) for message in messages if message],
+    }
+
+
+class SignCatalog:
+    def __init__(self, api, refresh_interval=default_refresh_interval, nearby_radius_m=default_nearby_radius_m):
+        """
+        TTL-cached variable message signs, indexed by roadway and location.
+
+        Each refresh downloads the signs once and builds a roadway -> signs mapping and a
+        spatial index. The signs associated with a camera are computed on first request
+        and kept until the next refresh, so repeated lookups are dictionary hits.
+        """
+        self.api = api
+        self.refresh_interval = refresh_interval
+        self.nearby_radius_m = nearby_radius_m
+        self.fetch_count = 0
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.RLock()
+        self._signs = []
+        self._by_roadway = {}
+        self._spatial_index = GridIndex()
+        self._by_camera = {}
+        self._loaded_at = None
+
+    def refresh(self):
+        """
+        Downloads the sign list and rebuilds the mappings.
+        """
+        with self._refresh_lock:
+            signs = [sign_record(sign) for sign in self.api.get_signs()]
+            self.fetch_count += 1
+            by_roadway = {}
+            spatial_index = GridIndex()
+            for sign in signs:
+                by_roadway.setdefault(roadway_key(sign["roadway"]), []).append(sign)
+                spatial_index.insert(sign["latitude"], sign["longitude"], sign)
+            with self._lock:
+                self._signs = signs
+                self._by_roadway = by_roadway
+                self._spatial_index = spatial_index
+                self._by_camera = {}
+                self._loaded_at = time.monotonic()
+        return len(signs)
+
+    def _is_stale(self):
+        return self._loaded_at is None or time.monotonic() - self._loaded_at >= self.refresh_interval
+
+    def _ensure_fresh(self):
+        if not self._is_stale():
+            return
+        with self._refresh_lock:
+            # Another caller may have refreshed while we waited for the lock
+            if self._is_stale():
+                self.refresh()
+
+    def signs_on_roadway(self, roadway):
+        self._ensure_fresh()
+        with self._lock:
+            return list(self._by_roadway.get(roadway_key(roadway), []))
+
+    def signs_for_camera(self, camera, limit=default_signs_per_camera):
+        """
+        Returns sign records associated with a camera, best matches first.
+
+        Signs on the camera's roadway come first, then signs on other roadways within the
+        nearby radius; each group is ordered by distance. Every record gets "distance_m"
+        (None without coordinates) and "same_roadway".
+        """
+        self._ensure_fresh()
+        fields = camera.__dict__
+        camera_id = str(fields.get("id", ""))
+        with self._lock:
+            associated = self._by_camera.get(camera_id)
+            by_roadway = self._by_roadway
+            spatial_index = self._spatial_index
+        if associated is None:
+            associated = self._associate(fields, by_roadway, spatial_index)
+            with self._lock:
+                self._by_camera[camera_id] = associated
+        return associated[:limit]
+
+    def _associate(self, fields, by_roadway, spatial_index):
+        latitude = to_coordinate(fields.get("latitude"))
+        longitude = to_coordinate(fields.get("longitude"))
+        located = latitude is not None and longitude is not None
+        camera_roadway = roadway_key(fields.get("roadway"))
+
+        records = {}
+        for sign in by_roadway.get(camera_roadway, []):
+            distance = None
+            if located and sign["latitude"] is not None and sign["longitude"] is not None:
+                distance = haversine_m(latitude, longitude, sign["latitude"], sign["longitude"])
+            records[id(sign)] = dict(sign, distance_m=distance, same_roadway=True)
+        if located:
+            for distance, sign in spatial_index.within_radius(latitude, longitude, self.nearby_radius_m):
+                if id(sign) not in records:
+                    records[id(sign)] = dict(sign, distance_m=distance, same_roadway=False)
+
+        return sorted(
+            records.values(),
+            key=lambda record: (
+                not record["same_roadway"],
+                record["distance_m"] is None,
+                record["distance_m"] or 0.0,
+            ),
+        )
+
+    def stats(self):
+        with self._lock:
+            age = None if self._loaded_at is None else time.monotonic() - self._loaded_at
+            return {
+                "signs": len(self._signs),
+                "roadways": len(self._by_roadway),
+                "cached_cameras": len(self._by_camera),
+                "fetch_count": self.fetch_count,
+                "age_seconds": age,
+            }
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_sign_catalog(api_key, api):
+    """
+    Returns the process-wide sign catalog for an API key, creating it with the given client.
+    """
+    with _catalogs_lock:
+        catalog = _catalogs.get(api_key)
+        if catalog is None:
+            catalog = SignCatalog(api)
+            _catalogs[api_key] = catalog
+        return catalog
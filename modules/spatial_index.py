@@ -0,0 +1,189 @@
+import heapq
+import math
+
+earth_radius_m = 6371008.8
+metres_per_degree_lat = 111320.0
+# Grid cell size in degrees (~1.1 km north-south)
+default_cell_size_degrees = 0.01
+# A ring search visiting more than this many cells per indexed item switches to a linear scan
+max_cell_visits_per_item = 4
+
+
+def haversine_m(lat1, lon1, lat2, lon2):
+    """
+    Great-circle distance in metres between two lat/long points.
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * earth_radius_m * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_coordinate(value):
+    """
+    Converts a latitude/longitude value to float, returning None if it is missing or invalid.
+    """
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    if math.isnan(value):
+        return None
+    return value
+
+
+class GridIndex:
+    def __init__(self, cell_size_degrees=default_cell_size_degrees):
+        """
+        Uniform lat/long grid over point items for radius, nearest-neighbour and bounding-box queries.
+        """
+        self.cell_size = cell_size_degrees
+        self._cells = {}
+        self._points = []
+        self._min_cell = None
+        self._max_cell = None
+
+    def __len__(self):
+        return len(self._points)
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(lon / self.cell_size)))
+
+    def insert(self, lat, lon, item):
+        """
+        Adds an item at the given position. Items without valid coordinates are ignored.
+        """
+        lat = to_coordinate(lat)
+        lon = to_coordinate(lon)
+        if lat is None or lon is None:
+            return False
+
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, []).append(len(self._points))
+        self._points.append((lat, lon, item))
+        if self._min_cell is None:
+            self._min_cell = cell
+            self._max_cell = cell
+        else:
+            self._min_cell = (min(self._min_cell[0], cell[0]), min(self._min_cell[1], cell[1]))
+            self._max_cell = (max(self._max_cell[0], cell[0]), max(self._max_cell[1], cell[1]))
+        return True
+
+    def _candidates_in_cells(self, row_start, row_end, col_start, col_end):
+        cells = self._cells
+        for row in range(row_start, row_end + 1):
+            for col in range(col_start, col_end + 1):
+                for position in cells.get((row, col), ()):
+                    yield self._points[position]
+
+    def in_bbox(self, min_lat, min_lon, max_lat, max_lon):
+        """
+        Returns items inside the bounding box (inclusive).
+        """
+        if not self._points:
+            return []
+        row_start, col_start = self._cell(min_lat, min_lon)
+        row_end, col_end = self._cell(max_lat, max_lon)
+        row_start = max(row_start, self._min_cell[0])
+        col_start = max(col_start, self._min_cell[1])
+        row_end = min(row_end, self._max_cell[0])
+        col_end = min(col_end, self._max_cell[1])
+        return [
+            item
+            for lat, lon, item in self._candidates_in_cells(row_start, row_end, col_start, col_end)
+            if min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+        ]
+
+    def within_radius(self, lat, lon, radius_m):
+        """
+        Returns (distance_m, item) pairs within radius_m of the point, nearest first.
+        """
+        if not self._points:
+            return []
+        lat_span = radius_m / metres_per_degree_lat
+        lon_span = radius_m / (metres_per_degree_lat * max(math.cos(math.radians(lat)), 1e-6))
+        row_start, col_start = self._cell(lat - lat_span, lon - lon_span)
+        row_end, col_end = self._cell(lat + lat_span, lon + lon_span)
+        row_start = max(row_start, self._min_cell[0])
+        col_start = max(col_start, self._min_cell[1])
+        row_end = min(row_end, self._max_cell[0])
+        col_end = min(col_end, self._max_cell[1])
+
+        results = []
+        for item_lat, item_lon, item in self._candidates_in_cells(row_start, row_end, col_start, col_end):
+            distance = haversine_m(lat, lon, item_lat, item_lon)
+            if distance <= radius_m:
+                results.append((distance, item))
+        results.sort(key=lambda pair: pair[0])
+        return results
+
+    def nearest(self, lat, lon, k=1, max_distance_m=None):
+        """
+        Returns up to k (distance_m, item) pairs nearest to the point, nearest first.
+
+        Searches rings of grid cells outward from the point until no unvisited cell can hold a closer item.
+        Points outside the occupied cells, or searches that would visit more cells than there are
+        items, fall back to a linear scan so a distant or sparse query costs at most O(n).
+        """
+        if not self._points or k <= 0:
+            return []
+        center_row, center_col = self._cell(lat, lon)
+        if not (self._min_cell[0] <= center_row <= self._max_cell[0]
+                and self._min_cell[1] <= center_col <= self._max_cell[1]):
+            return self._nearest_linear(lat, lon, k, max_distance_m)
+        # Smallest distance covered by one ring of cells at this latitude
+        ring_width_m = self.cell_size * metres_per_degree_lat * min(1.0, max(math.cos(math.radians(lat)), 1e-6))
+        max_ring = max(
+            abs(center_row - self._min_cell[0]), abs(center_row - self._max_cell[0]),
+            abs(center_col - self._min_cell[1]), abs(center_col - self._max_cell[1]),
+        )
+        cell_budget = max_cell_visits_per_item * len(self._points)
+
+        best = []  # max-heap of (-distance, position)
+        visited_cells = 0
+        for ring in range(max_ring + 1):
+            if len(best) >= k and -best[0][0] <= (ring - 1) * ring_width_m:
+                break
+            if max_distance_m is not None and (ring - 1) * ring_width_m > max_distance_m:
+                break
+            visited_cells += max(1, 8 * ring)
+            if visited_cells > cell_budget:
+                return self._nearest_linear(lat, lon, k, max_distance_m)
+            for row, col in self._ring_cells(center_row, center_col, ring):
+                for position in self._cells.get((row, col), ()):
+                    item_lat, item_lon, _ = self._points[position]
+                    distance = haversine_m(lat, lon, item_lat, item_lon)
+                    if max_distance_m is not None and distance > max_distance_m:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, position))
+                    elif distance < -best[0][0]:
+                        heapq.heapreplace(best, (-distance, position))
+
+        return [
+            (-neg_distance, self._points[position][2])
+            for neg_distance, position in sorted(best, reverse=True)
+        ]
+
+    def _nearest_linear(self, lat, lon, k, max_distance_m):
+        pairs = (
+            (haversine_m(lat, lon, item_lat, item_lon), position)
+            for position, (item_lat, item_lon, _) in enumerate(self._points)
+        )
+        if max_distance_m is not None:
+            pairs = (pair for pair in pairs if pair[0] <= max_distance_m)
+        return [(distance, self._points[position][2]) for distance, position in heapq.nsmallest(k, pairs)]
+
+    @staticmethod
+    def _ring_cells(center_row, center_col, ring):
+        if ring == 0:
+            yield (center_row, center_col)
+            return
+        for col in range(center_col - ring, center_col + ring + 1):
+            yield (center_row - ring, col)
+            yield (center_row + ring, col)
+        for row in range(center_row - ring + 1, center_row + ring):
+            yield (row, center_col - ring)
+            yield (row, center_col + ring)
@@ -0,0 +1,291 @@
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Decode fps is measured over this trailing window
+fps_window_seconds = 10
+# No frame for this long marks a connected stream as stale
+stale_after_seconds = 5
+# Reconnects within the flap window above this count mark a stream as flapping
+flap_window_seconds = 300
+flap_reconnects = 3
+# Decoding below this share of the stream's nominal fps marks it as degraded
+degraded_fps_ratio = 0.5
+# The /metrics endpoint listens on EMERGEYE_METRICS_HOST:EMERGEYE_METRICS_PORT;
+# set the port to "off" to disable it
+metrics_host_variable = "EMERGEYE_METRICS_HOST"
+metrics_port_variable = "EMERGEYE_METRICS_PORT"
+default_metrics_host = "127.0.0.1"
+default_metrics_port = 9108
+
+
+class StreamHealth:
+    def __init__(self, camera_id, consumer):
+        """
+        Health counters for one camera stream as read by one consumer (e.g. ingestion or recording).
+
+        The record_* methods are called from the reading thread and only update counters;
+        rates, staleness and the overall state are derived when snapshot() is called.
+        """
+        self.camera_id = camera_id
+        self.consumer = consumer
+        self._lock = threading.Lock()
+        self._frame_times = deque(maxlen=1024)
+        self._reconnect_times = deque(maxlen=64)
+        self.connected = False
+        self.stopped = False
+        self.connected_since = None
+        self.connect_attempts = 0
+        self.failed_connects = 0
+        self.connect_latency_seconds = None
+        self.nominal_fps = None
+        self.bitrate_kbps = None
+        self.frames = 0
+        self.failed_reads = 0
+        self.frames_at_connect = 0
+        self.dropped_frames = 0
+        self.reconnects = 0
+        self.last_frame_time = None
+        self.last_error = None
+
+    def record_connect(self, latency_seconds, success, nominal_fps=None, bitrate_kbps=None):
+        with self._lock:
+            self.connect_attempts += 1
+            self.connect_latency_seconds = latency_seconds
+            self.stopped = False
+            if not success:
+                self.failed_connects += 1
+                self.last_error = "Failed to open video stream."
+                return
+            self.connected = True
+            self.connected_since = time.time()
+            self.frames_at_connect = self.frames
+            self.nominal_fps = nominal_fps
+            self.bitrate_kbps = bitrate_kbps or None
+            self.last_error = None
+
+    def record_disconnect(self, error=None):
+        """
+        Records a closed stream; without an error it was closed on purpose and reports as stopped.
+        """
+        with self._lock:
+            if self.connected:
+                self._count_dropped(time.time())
+            self.connected = False
+            self.connected_since = None
+            self.stopped = not error
+            if error:
+                self.last_error = error
+
+    def record_frame(self, timestamp=None):
+        timestamp = timestamp or time.time()
+        with self._lock:
+            self.frames += 1
+            self.last_frame_time = timestamp
+            self._frame_times.append(timestamp)
+
+    def record_failed_read(self, error=None):
+        with self._lock:
+            self.failed_reads += 1
+            if error:
+                self.last_error = error
+
+    def record_reconnect(self):
+        with self._lock:
+            self.reconnects += 1
+            self._reconnect_times.append(time.time())
+
+    def _count_dropped(self, now):
+        # Frames the stream should have delivered since connecting, minus those decoded
+        if self.nominal_fps and self.connected_since is not None:
+            expected = int((now - self.connected_since) * self.nominal_fps)
+            self.dropped_frames += max(0, expected - (self.frames - self.frames_at_connect))
+            self.connected_since = now
+            self.frames_at_connect = self.frames
+
+    def snapshot(self):
+        now = time.time()
+        with self._lock:
+            recent = [t for t in self._frame_times if now - t <= fps_window_seconds]
+            recent_reconnects = sum(1 for t in self._reconnect_times if now - t <= flap_window_seconds)
+            if len(recent) > 1 and recent[-1] > recent[0]:
+                decode_fps = (len(recent) - 1) / (recent[-1] - recent[0])
+            else:
+                decode_fps = 0.0
+            frame_age = None if self.last_frame_time is None else now - self.last_frame_time
+
+            if self.stopped:
+                state = "stopped"
+            elif not self.connected:
+                state = "down"
+            elif frame_age is None or frame_age > stale_after_seconds:
+                state = "stale"
+            elif recent_reconnects > flap_reconnects:
+                state = "flapping"
+            elif self.nominal_fps and decode_fps < self.nominal_fps * degraded_fps_ratio:
+                state = "degraded"
+            else:
+                state = "healthy"
+
+            dropped = self.dropped_frames
+            if self.connected and self.nominal_fps and self.connected_since is not None:
+                expected = int((now - self.connected_since) * self.nominal_fps)
+                dropped += max(0, expected - (self.frames - self.frames_at_connect))
+            return {
+                "camera_id": self.camera_id,
+                "consumer": self.consumer,
+                "state": state,
+                "connected": self.connected,
+                "connect_attempts": self.connect_attempts,
+                "failed_connects": self.failed_connects,
+                "connect_latency_seconds": self.connect_latency_seconds,
+                "nominal_fps": self.nominal_fps,
+                "decode_fps": decode_fps,
+                "bitrate_kbps": self.bitrate_kbps,
+                "frames": self.frames,
+                "failed_reads": self.failed_reads,
+                "dropped_frames": dropped,
+                "reconnects": self.reconnects,
+                "recent_reconnects": recent_reconnects,
+                "frame_age_seconds": frame_age,
+                "last_error": self.last_error,
+            }
+
+
+# (metric name, type, help, snapshot key)
+_metrics = (
+    ("emergeye_stream_up", "gauge", "1 if the stream is connected.", "connected"),
+    ("emergeye_stream_connect_latency_seconds", "gauge", "Duration of the last connection attempt.", "connect_latency_seconds"),
+    ("emergeye_stream_decode_fps", "gauge", "Frames decoded per second over the last 10 s.", "decode_fps"),
+    ("emergeye_stream_bitrate_kbps", "gauge", "Stream bitrate reported by the decoder.", "bitrate_kbps"),
+    ("emergeye_stream_frame_age_seconds", "gauge", "Seconds since the last decoded frame.", "frame_age_seconds"),
+    ("emergeye_stream_frames_total", "counter", "Frames decoded.", "frames"),
+    ("emergeye_stream_failed_reads_total", "counter", "Reads that returned no frame.", "failed_reads"),
+    ("emergeye_stream_dropped_frames_total", "counter", "Frames the stream should have delivered but did not.", "dropped_frames"),
+    ("emergeye_stream_reconnects_total", "counter", "Reconnections after a lost or failed stream.", "reconnects"),
+    ("emergeye_stream_failed_connects_total", "counter", "Connection attempts that failed.", "failed_connects"),
+)
+
+
+def _label_value(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+class StreamHealthRegistry:
+    def __init__(self):
+        """
+        All StreamHealth records of the process, keyed by camera and consumer.
+        """
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def for_stream(self, camera_id, consumer="ingestion"):
+        key = (str(camera_id), consumer)
+        with self._lock:
+            health = self._health.get(key)
+            if health is None:
+                health = StreamHealth(str(camera_id), consumer)
+                self._health[key] = health
+            return health
+
+    def snapshot(self):
+        """
+        Returns one health dict per camera stream, sorted by camera and consumer.
+        """
+        with self._lock:
+            records = [self._health[key] for key in sorted(self._health)]
+        return [health.snapshot() for health in records]
+
+    def prometheus_text(self):
+        """
+        Renders the current snapshot in the Prometheus text exposition format.
+        """
+        snapshots = self.snapshot()
+        lines = []
+        for name, metric_type, help_text, key in _metrics:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {metric_type}")
+            for snapshot in snapshots:
+                value = snapshot[key]
+                if value is None:
+                    continue
+                labels = f'camera_id="{_label_value(snapshot["camera_id"])}",consumer="{_label_value(snapshot["consumer"])}"'
+                lines.append(f"{name}{{{labels}}} {float(value)}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = StreamHealthRegistry()
+
+
+def get_stream_health_registry():
+    return _registry
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = _registry.prometheus_text().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def metrics_address():
+    """
+    Returns the (host, port) the metrics endpoint should listen on, or None if it is disabled.
+    """
+    host = os.environ.get(metrics_host_variable, default_metrics_host)
+    port = os.environ.get(metrics_port_variable, str(default_metrics_port)).strip().lower()
+    if port in ("", "off", "none"):
+        return None
+    try:
+        return host, int(port)
+    except ValueError:
+        print(f"Ignoring invalid {metrics_port_variable}={port!r}; using port {default_metrics_port}.")
+        return host, default_metrics_port
+
+
+def start_metrics_server(address=None):
+    """
+    Serves the registry at http://host:port/metrics for Prometheus, once per process.
+
+    address defaults to metrics_address(). Returns the bound (host, port), or None if the
+    endpoint is disabled or could not be bound.
+    """
+    global _metrics_server
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            address = address or metrics_address()
+            if address is None:
+                return None
+            try:
+                _metrics_server = ThreadingHTTPServer(address, _MetricsHandler)
+            except OSError as e:
+                print(f"Metrics server could not listen on {address[0]}:{address[1]}: {e}")
+                return None
+            threading.Thread(target=_metrics_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _metrics_server.server_address[:2]
+
+
+def metrics_url():
+    """
+    Returns the scrape URL of the running metrics endpoint, or None if it is not running.
+    """
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            return None
+        host, port = _metrics_server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
@@ -0,0 +1,129 @@
+import queue
+import threading
+import time
+
+# Default pipeline sizing
+default_queue_size = 64
+default_workers = 8
+default_max_retries = 3
+retry_base_delay = 0.5
+
+_stop = object()
+
+
+class UploadPipeline:
+    def __init__(self, s3_client, bucket, queue_size=default_queue_size, workers=default_workers, max_retries=default_max_retries):
+        """
+        Uploads in-memory objects to S3 on a pool of worker threads.
+
+        submit() blocks once queue_size uploads are pending, so a fast producer is slowed
+        to the pace of the network instead of buffering without bound. Each object is
+        PUT once; extra destinations are filled with server-side copies.
+        """
+        self.s3_client = s3_client
+        self.bucket = bucket
+        self.max_retries = max_retries
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stats_lock = threading.Lock()
+        self.uploaded = 0
+        self.copied = 0
+        self.retries = 0
+        self.failed = []
+        self._workers = [
+            threading.Thread(target=self._work, name=f"s3-upload-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def submit(self, body, key, copy_keys=(), content_type="image/jpeg", timeout=None):
+        """
+        Queues bytes for upload to key, then server-side copies to each of copy_keys.
+
+        Blocks while the queue is full; raises queue.Full if timeout expires first.
+        """
+        self._queue.put((body, key, tuple(copy_keys), content_type), timeout=timeout)
+
+    def flush(self):
+        """
+        Waits until every submitted upload has finished or failed.
+        """
+        self._queue.join()
+
+    def close(self):
+        """
+        Finishes pending uploads and stops the workers.
+        """
+        for _ in self._workers:
+            self._queue.put(_stop)
+        for worker in self._workers:
+            worker.join()
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                if job is _stop:
+                    return
+                self._upload(*job)
+            finally:
+                self._queue.task_done()
+
+    def _upload(self, body, key, copy_keys, content_type):
+        try:
+            self._with_retries(
+                self.s3_client.put_object,
+                Bucket=self.bucket, Key=key, Body=body, ContentType=content_type,
+            )
+        except Exception as e:
+            self._record_failure(key, e)
+            return
+        with self._stats_lock:
+            self.uploaded += 1
+
+        for copy_key in copy_keys:
+            try:
+                self._with_retries(
+                    self.s3_client.copy_object,
+                    Bucket=self.bucket, Key=copy_key,
+                    CopySource={"Bucket": self.bucket, "Key": key},
+                )
+            except Exception as e:
+                self._record_failure(copy_key, e)
+                continue
+            with self._stats_lock:
+                self.copied += 1
+
+    def _with_retries(self, call, **kwargs):
+        delay = retry_base_delay
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call(**kwargs)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                with self._stats_lock:
+                    self.retries += 1
+                time.sleep(delay)
+                delay *= 2
+
+    def _record_failure(self, key, error):
+        print(f"Error uploading s3://{self.bucket}/{key}: {error}")
+        with self._stats_lock:
+            self.failed.append((key, str(error)))
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                "uploaded": self.uploaded,
+                "copied": self.copied,
+                "retries": self.retries,
+                "failed": len(self.failed),
+                "pending": self._queue.qsize(),
+            }
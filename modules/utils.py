@@ -1,46 +1,92 @@
 import os
-import cv2
 import time
 import datetime
+import warnings
 import pytz
-import boto3
-import csv
-from PIL import Image
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 import streamlit as st
-from traffic import API
+from modules.resources import get_traffic_api, get_s3_client
+from modules.camera_catalog import get_camera_catalog
+from modules.sign_catalog import get_sign_catalog
+from modules.ingestion import get_ingestion_engine
+from modules.frame_sampler import FrameSampler, FixedRatePolicy
+from modules.upload_pipeline import UploadPipeline
+from modules.frame_encoder import FrameEncoder, default_jpeg_quality
+from modules.motion_gate import MotionGate
+from modules.recorder import StreamRecorder, default_segment_seconds
+from modules.multipart_upload import upload_file_resumable, resume_pending_uploads_in_background
+from modules.workspace import JobWorkspace, has_workspace_capacity
+from modules.metadata_sink import MetadataSink
+from modules.live_preview import AdaptivePreview, default_preview_jpeg_quality, default_preview_width
+from modules.decode_config import open_capture, full_decode
+from modules.stream_health import get_stream_health_registry
+from modules.incident_store import local_timezone_name
 
 bucket_name = "capstone-mids-datasets"
 bucket_buffer_directory = "capstone-inference/buffer/"
 bucket_inference_directory = "capstone-inference/inference/"
+# Per-frame metadata as JSON Lines, partitioned by camera and date
+bucket_metadata_directory = "capstone-inference/metadata/"
 cache_directory = "capstone-cache/"
 video_recording_output_path = "./temp/"
 if not os.path.exists(video_recording_output_path):
     os.makedirs(video_recording_output_path)
 
 
+def upload_file_to_s3(s3_client, file_path, s3_bucket, s3_key):
+    """
+    Uploads a file to an S3 bucket and returns a status message.
+    Large files use a resumable multipart upload with per-part checksums.
+    """
+    if not os.path.exists(file_path):
+        return f"Error: {file_path} does not exist."
+
+    try:
+        upload_file_resumable(s3_client, file_path, s3_bucket, s3_key)
+        return f"File uploaded successfully to s3://{s3_bucket}/{s3_key}"
+    except Exception as e:
+        return f"Error uploading file to S3: {str(e)}"
+
+
 class StreamProcess:
-    def __init__(self, api_key, local_timezone="America/New_York"):
+    def __init__(self, api_key, local_timezone=local_timezone_name, jpeg_quality=default_jpeg_quality, frame_target_width=None, motion_gating=True,
+                 preview_jpeg_quality=default_preview_jpeg_quality, preview_width=default_preview_width):
         """
         Initializes the CameraStreamer class with API key and timezone.
+        Uploaded frames are encoded at jpeg_quality and downscaled to frame_target_width if set.
+        With motion_gating, sampled frames that barely differ from the previous one are not uploaded.
+        Live previews are downscaled to preview_width and encoded at preview_jpeg_quality.
         """
         self.local_timezone = pytz.timezone(local_timezone)
-        self.api = API(api_key)
-        self.s3_client = boto3.client("s3")
+        self.jpeg_quality = jpeg_quality
+        self.preview_jpeg_quality = preview_jpeg_quality
+        self.preview_width = preview_width
+        self.frame_target_width = frame_target_width
+        self.motion_gating = motion_gating
+        # Clients are shared across reruns and sessions
+        self.api = get_traffic_api(api_key)
+        self.s3_client = get_s3_client()
+        # Finish uploads interrupted by an earlier crash
+        resume_pending_uploads_in_background(self.s3_client)
+        self.camera_catalog = get_camera_catalog(api_key, self.api)
+        self.sign_catalog = get_sign_catalog(api_key, self.api)
+        self.ingestion_engine = get_ingestion_engine()
         self.selected_camera = None
 
     def search_camera_by_road(self, road_name):
         """
-        Searches for cameras by road name.
+        Searches for cameras by road name, roadway, direction or camera ID using the shared cached catalog.
         """
-        cameras = self.api.get_cameras()
-        available_cameras = [
-            cam for cam in cameras if road_name in cam.__dict__.get("name", "")
-        ]
+        return self.camera_catalog.search(road_name)
 
-        if available_cameras:
-            return available_cameras
-        else:
-            return []
+    def search_cameras_near(self, latitude, longitude, radius_m=1000):
+        """
+        Returns cameras within radius_m metres of a point, nearest first.
+        """
+        return [
+            cam for _, cam in self.camera_catalog.cameras_within_radius(latitude, longitude, radius_m)
+        ]
 
     def select_camera(self, available_cameras, camera_choice):
         """
@@ -60,149 +106,192 @@ class StreamProcess:
         else:
             return "Invalid selection. Please try again."
 
-    def list_associated_signs(self):
+    def list_associated_signs(self, limit=10):
         """
-        Lists the associated signs for the selected camera's roadway.
+        Returns sign records associated with the selected camera: signs on its roadway, then nearby signs.
+
+        Uses the shared cached sign catalog, so the sign list is downloaded once per refresh.
+        Each record has id, name, roadway, direction, latitude, longitude, messages,
+        distance_m and same_roadway.
         """
         if not self.selected_camera:
-            return "No camera selected."
-
-        signs = self.api.get_signs()
-        camera_roadway = self.selected_camera.__dict__.get("roadway", "")
-        associated_signs = [
-            sign for sign in signs if sign.__dict__.get("roadway", "") == camera_roadway
-        ]
-
-        if associated_signs:
-            signs_info = f"Camera on {camera_roadway} has the following associated signs:\n"
-            for sign in associated_signs:
-                signs_info += f"  Sign ID: {sign.__dict__.get('id', 'Unknown')}\n"
-                signs_info += f"  Name: {sign.__dict__.get('name', 'Unknown')}\n"
-                signs_info += f"  Messages: {sign.__dict__.get('messages', 'No messages')}\n"
-                signs_info += "-" * 40 + "\n"
-            return signs_info
-        else:
-            return f"No signs associated with {camera_roadway}"
+            return []
+        return self.sign_catalog.signs_for_camera(self.selected_camera, limit)
 
-    def preview_live_stream(self, duration_seconds=5, fps=10):
+    def preview_live_stream(self, duration_seconds=5, progress_callback=None, is_cancelled=None):
         """
-        Captures a preview of the video stream by extracting frames for a few seconds.
+        Keeps the selected camera's stream open for a live preview of duration_seconds.
+
+        Meant to run as a background job: the preview holds its own ingestion engine
+        reference for the duration (so a reader started just for it stops afterwards), while
+        the page shows the newest frames with preview_frame(). Stops early once is_cancelled()
+        returns True; progress_callback, if given, is called with the elapsed fraction (0-1).
         """
         if not self.selected_camera:
             return "No camera selected."
 
-        video_url = self.selected_camera.__dict__["video_url"]
-        cap = cv2.VideoCapture(video_url)
-
-        if not cap.isOpened():
-            return "Failed to open video stream."
-
-        frame_display = st.empty()  # Placeholder for displaying frames
-        max_frames = int(fps * duration_seconds)
-        frame_count = 0
-
-        while frame_count < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                break
-
-            # Convert the frame to RGB (since OpenCV loads images in BGR format)
-            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # Convert frame to a PIL image
-            pil_img = Image.fromarray(frame_rgb)
-
-            # Display the frame using Streamlit
-            frame_display.image(pil_img, caption=f"Frame {frame_count + 1}", use_column_width=True)
-
-            frame_count += 1
-            time.sleep(1 / fps)  # Delay to simulate frame rate
-
-        cap.release()
-        # return "Video preview complete."
-        return ""
+        camera_id = self.selected_camera.__dict__["id"]
+        reader = self.ingestion_engine.start_camera(self.selected_camera)
+        started = time.monotonic()
+        try:
+            while time.monotonic() - started < duration_seconds:
+                if (is_cancelled is not None and is_cancelled()) or not reader.is_running():
+                    break
+                if progress_callback is not None:
+                    progress_callback((time.monotonic() - started) / duration_seconds)
+                time.sleep(0.2)
+            with reader.lease_ring() as ring:
+                if ring is None or ring.latest() is None:
+                    return "Failed to open video stream."
+            return ""
+        finally:
+            self.ingestion_engine.stop_camera(camera_id)
+
+    def create_preview(self, max_fps=10):
+        return AdaptivePreview(self.preview_width, self.preview_jpeg_quality, max_fps=max_fps)
+
+    def preview_frame(self, preview, camera_id, last_sequence=0):
+        """
+        Encodes the newest frame of a camera's ingestion buffer for display.
 
-    def save_video_from_stream(self, duration_seconds=20):
+        Returns (sequence, jpeg), or None if no frame newer than last_sequence is buffered.
+        Frames that arrived since last_sequence are skipped, so the preview never falls behind.
+        """
+        reader = self.ingestion_engine.get_reader(camera_id)
+        if reader is None:
+            return None
+        with reader.lease_ring() as ring:
+            entry = None if ring is None else ring.latest()
+            if entry is None or entry[0] <= last_sequence:
+                return None
+            encode_started = time.monotonic()
+            sequence, _, frame = entry
+            jpeg = preview.encode(frame)
+            # The decoder may have reused the slot while we were encoding
+            if jpeg is None or not ring.is_current(sequence):
+                return None
+        preview.frame_shown(sequence, jpeg, time.monotonic() - encode_started)
+        return sequence, jpeg
+
+    def save_video_from_stream(self, duration_seconds=20, frames_per_second=4, sampling_policy=None, save_video=True, progress_callback=None, segment_seconds=default_segment_seconds):
         """
         Saves a video stream from the selected camera for the specified duration and extracts frames.
+
+        Recording is bounded by wall-clock time and split into segment_seconds-long files,
+        each uploaded as soon as it is finished.
+        Frames are sampled from the live stream while recording, so the recording is decoded once.
+        With save_video=False no clip is written or uploaded; only the sampled frames are.
+        progress_callback, if given, is called with the recorded fraction (0-1) about once per second.
         """
         if not self.selected_camera:
             return "No camera selected."
 
         timezone = self.local_timezone
         video_url = self.selected_camera.__dict__["video_url"]
-        cap = cv2.VideoCapture(video_url)
-
-        if not cap.isOpened():
-            return "Failed to open video stream."
-
-        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        if fps == 0:
-            fps = 20.0  # Default FPS
-        max_frames = int(fps * duration_seconds)
         current_time = datetime.datetime.now(timezone).strftime("%Y-%m-%d_%H-%M-%S")
         camera_id = self.selected_camera.__dict__["id"]
         output_filename = f"{camera_id}_{current_time}.mp4"
-        output_file_path = f"{video_recording_output_path}{output_filename}"
-
-        fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-        out = cv2.VideoWriter(
-            output_file_path, fourcc, fps, (frame_width, frame_height)
-        )
 
-        frame_count = 0
-        while frame_count < max_frames:
-            ret, frame = cap.read()
-            if not ret:
-                continue
-            out.write(frame)
-            frame_count += 1
+        if not has_workspace_capacity():
+            return "Not enough temporary disk space to record; try again later."
+        with JobWorkspace(f"{camera_id}_{current_time}") as workspace:
+            return self._record_into_workspace(
+                workspace, video_url, camera_id, current_time, output_filename, duration_seconds,
+                frames_per_second, sampling_policy, save_video, progress_callback, segment_seconds,
+            )
 
-        cap.release()
-        out.release()
+    def _record_into_workspace(self, workspace, video_url, camera_id, current_time, output_filename, duration_seconds,
+                               frames_per_second, sampling_policy, save_video, progress_callback, segment_seconds):
+        """
+        Records into a private job workspace; save_video_from_stream removes it afterwards.
+        """
+        recorder = StreamRecorder(
+            video_url,
+            workspace.path if save_video else None,
+            f"{camera_id}_{current_time}",
+            duration_seconds,
+            segment_seconds=segment_seconds,
+            # Without a saved clip only the sampled frames are needed, at upload resolution
+            decode_config=full_decode if save_video else self.frame_decode_config(),
+            health=get_stream_health_registry().for_stream(camera_id, "recording"),
+        )
 
-        self.upload_video_to_s3(output_file_path, bucket_name, f"{cache_directory}{output_filename}")
+        sampler = FrameSampler(sampling_policy or FixedRatePolicy(frames_per_second, duration_seconds))
+        # Sampled frames are encoded on the pool while recording continues
+        encoder = self.create_frame_encoder()
+        motion_gate = self.create_motion_gate()
+        encoded_frames = []
+        sampler_started = False
+
+        def on_frame(frame, elapsed_seconds):
+            nonlocal sampler_started
+            if not sampler_started:
+                sampler.start(recorder.fps)
+                sampler_started = True
+            if sampler.offer(frame, elapsed_seconds) and self._passes_motion_gate(motion_gate, frame, elapsed_seconds):
+                encoded_frames.append((encoder.submit(frame), self._frame_info(motion_gate, elapsed_seconds)))
+
+        # Finished segments upload while the next one is being recorded
+        segment_uploader = ThreadPoolExecutor(max_workers=2, thread_name_prefix="segment-upload")
+        segment_uploads = []
+
+        def on_segment(segment_path):
+            segment_key = f"{cache_directory}{os.path.basename(segment_path)}"
+            segment_uploads.append(
+                segment_uploader.submit(self.upload_video_to_s3, segment_path, bucket_name, segment_key)
+            )
 
-        # After video is saved, extract frames and upload them
-        csv_filename = f"{camera_id}_{current_time}_frames_metadata.csv"
-        output_csv_path = f"{video_recording_output_path}{csv_filename}"
-        self.extract_frames_and_upload(
-            output_file_path, output_csv_path, frames_per_second=4
+        recording = recorder.record(
+            on_frame=on_frame, on_segment=on_segment, progress_callback=progress_callback,
+            should_stop=workspace.over_quota,
+        )
+        segment_uploader.shutdown(wait=True)
+        if recording is None:
+            encoder.close()
+            return "Failed to open video stream."
+        for upload in segment_uploads:
+            message = upload.result()
+            print(message)
+            if message.startswith("Error"):
+                # Keep the segments so the interrupted upload can resume
+                workspace.retain()
+        print(
+            f"Recorded {recording['frames_written']} frames in {recording['recorded_seconds']:.1f} s: "
+            f"{recording['failed_reads']} failed reads, {recording['dropped_frames']} dropped frames, "
+            f"{recording['reconnects']} reconnects, {len(recording['segments'])} segments"
         )
 
-        self.remove_temp_files()
+        # Upload the frames sampled during recording
+        self.upload_frames(((future.result(), info) for future, info in encoded_frames), current_time)
+        encoder.close()
+        self._report_motion_gate(motion_gate)
 
+        if not save_video:
+            return f"Recording complete. {len(encoded_frames)} frames uploaded."
         return f"Recording complete. Video saved as {output_filename}"
         # return " "
 
-    def extract_frames_and_upload(self, video_file_path, output_csv_path, frames_per_second=4, duration_seconds=20):
+    def extract_frames_and_upload(self, video_file_path, output_csv_path=None, frames_per_second=4, duration_seconds=20,
+                                  sampling_policy=None):
         """
         Extracts frames from the video at a specific frame rate and uploads both frames and metadata to S3.
+
+        The video is decoded once, sequentially; sampling_policy overrides the fixed frame rate
+        (e.g. EveryNthPolicy or SceneChangePolicy).
+        output_csv_path is deprecated and ignored: metadata goes to S3 through MetadataSink.
+        It is kept so existing positional calls still pass the frame rate and duration correctly.
         """
-        video_capture = cv2.VideoCapture(video_file_path)
+        if output_csv_path is not None:
+            warnings.warn(
+                "extract_frames_and_upload no longer writes a CSV; output_csv_path is ignored.",
+                DeprecationWarning, stacklevel=2,
+            )
+        video_capture = open_capture(video_file_path, self.frame_decode_config())
 
         if not video_capture.isOpened():
             print(f"Failed to open video file: {video_file_path}")
             return
 
-        # Get video properties
-        fps = video_capture.get(cv2.CAP_PROP_FPS)
-        total_frames = int(video_capture.get(cv2.CAP_PROP_FRAME_COUNT))
-        video_duration = total_frames / fps
-
-        # Calculate the time intervals where we want to extract frames
-        target_times = [
-            i / frames_per_second for i in range(frames_per_second * duration_seconds)
-        ]
-
-        # Metadata from camera
-        camera_id = self.selected_camera.__dict__["id"]
-        latitude = self.selected_camera.__dict__["latitude"]
-        longitude = self.selected_camera.__dict__["longitude"]
-        name = self.selected_camera.__dict__["name"]
-
         # Extract timestamp from video filename
         video_filename = os.path.basename(video_file_path)
         timestamp = (
@@ -211,76 +300,123 @@ class StreamProcess:
             + video_filename.split(".")[0].split("_")[2]
         )
 
-        frame_count = 0
-        image_count = 0
-        csv_data = []
-
-        for time_sec in target_times:
-            video_capture.set(cv2.CAP_PROP_POS_MSEC, time_sec * 1000)
-            ret, frame = video_capture.read()
-            if not ret:
-                print(f"Warning: Failed to grab frame at {time_sec} seconds, skipping...")
-                continue
-
-            image_count += 1
-            image_filename = f"{camera_id}_{timestamp}_im{image_count}.jpg"
-            image_filepath = f"{video_recording_output_path}{image_filename}"
-
-            # Save frame as a .jpg image
-            cv2.imwrite(image_filepath, frame)
-
-            # Upload frame to S3
-            self.s3_client.upload_file(
-                image_filepath,
-                bucket_name,
-                f"{bucket_buffer_directory}{image_filename}",
-            )
-            self.s3_client.upload_file(
-                image_filepath,
-                bucket_name,
-                f"{bucket_inference_directory}{image_filename}",
-            )
-            print(f"Frame {image_count} uploaded: {image_filename}")
+        sampler = FrameSampler(sampling_policy or FixedRatePolicy(frames_per_second, duration_seconds))
+        motion_gate = self.create_motion_gate()
+        # encode_many yields in input order, so frame info is matched up first in, first out
+        frame_infos = deque()
 
-            # Save metadata for the CSV
-            # csv_data.append([image_filename.split(".")[0], name, latitude, longitude, timestamp])
+        def gated_frames():
+            for _, time_sec, frame in sampler.sample_capture(video_capture):
+                if self._passes_motion_gate(motion_gate, frame, time_sec):
+                    frame_infos.append(self._frame_info(motion_gate, time_sec))
+                    yield frame
 
-        video_capture.release()
+        try:
+            with self.create_frame_encoder() as encoder:
+                jpeg_frames = encoder.encode_many(gated_frames())
+                self.upload_frames(((jpeg, frame_infos.popleft()) for jpeg in jpeg_frames), timestamp)
+        finally:
+            video_capture.release()
+        self._report_motion_gate(motion_gate)
+
+    def create_motion_gate(self):
+        """
+        Returns a fresh motion gate for one recording, or None if motion gating is off.
+        """
+        return MotionGate() if self.motion_gating else None
 
-        # Write CSV file with metadata
-        with open(output_csv_path, "w", newline="") as csvfile:
-            csvwriter = csv.writer(csvfile)
-            csvwriter.writerow(
-                ["Frame Name", "Camera Name", "Latitude", "Longitude", "Timestamp"]
-            )
-            csvwriter.writerows(csv_data)
+    def _passes_motion_gate(self, motion_gate, frame, time_sec):
+        return motion_gate is None or motion_gate.should_forward(frame, time_sec)
 
-        # Upload CSV to S3
-        self.s3_client.upload_file(
-            output_csv_path,
-            bucket_name,
-            f"{bucket_inference_directory}frames_metadata.csv",
-        )
-        print(f"CSV file uploaded to s3://{bucket_name}/{bucket_inference_directory}frames_metadata.csv")
+    def _frame_info(self, motion_gate, time_sec):
+        return {
+            "offset_seconds": round(time_sec, 3),
+            "motion_score": None if motion_gate is None else round(motion_gate.last_score, 2),
+        }
 
+    def _report_motion_gate(self, motion_gate):
+        if motion_gate is not None:
+            print(f"Motion gate skipped {motion_gate.skipped} of {motion_gate.frames} sampled frames ({motion_gate.skip_ratio:.0%})")
 
-    def upload_video_to_s3(self, file_path, s3_bucket, s3_key):
+    def frame_decode_config(self):
         """
-        Uploads a file to an S3 bucket.
+        Decode settings for paths that only produce uploaded frames: decoded straight to the upload width.
+        """
+        return full_decode.with_options(target_width=self.frame_target_width)
+
+    def create_frame_encoder(self):
+        """
+        Returns a JPEG encoder pool configured with this processor's quality and target width.
         """
-        if not os.path.exists(file_path):
-            return f"Error: {file_path} does not exist."
+        return FrameEncoder(quality=self.jpeg_quality, target_width=self.frame_target_width)
 
+    def upload_frames(self, frames, timestamp):
+        """
+        Uploads JPEG-encoded frames of the selected camera and streams one metadata record per frame.
+
+        frames yields (jpeg bytes, info) pairs, where info holds the frame's offset and motion score.
+        Records go to JSON Lines parts under the camera/date partition in S3 as frames are uploaded.
+        """
+        # Metadata from camera
+        camera_id = self.selected_camera.__dict__["id"]
+        latitude = self.selected_camera.__dict__["latitude"]
+        longitude = self.selected_camera.__dict__["longitude"]
+        name = self.selected_camera.__dict__["name"]
         try:
-            self.s3_client.upload_file(file_path, s3_bucket, s3_key)
-            return f"File uploaded successfully to s3://{s3_bucket}/{s3_key}"
-        except Exception as e:
-            return f"Error uploading file to S3: {str(e)}"
+            recording_start = self.local_timezone.localize(datetime.datetime.strptime(timestamp, "%Y-%m-%d_%H-%M-%S"))
+        except ValueError:
+            recording_start = datetime.datetime.now(self.local_timezone)
+
+        image_count = 0
+
+        with UploadPipeline(self.s3_client, bucket_name) as upload_pipeline, \
+                MetadataSink(self.s3_client, bucket_name, bucket_metadata_directory) as metadata_sink:
+            for jpeg, info in frames:
+                image_count += 1
+                image_filename = f"{camera_id}_{timestamp}_im{image_count}.jpg"
+                if jpeg is None:
+                    print(f"Warning: Failed to encode frame {image_count}, skipping...")
+                    continue
+
+                # Upload frame to the buffer; the inference copy is made server-side
+                upload_pipeline.submit(
+                    jpeg,
+                    f"{bucket_buffer_directory}{image_filename}",
+                    copy_keys=[f"{bucket_inference_directory}{image_filename}"],
+                )
+                print(f"Frame {image_count} queued for upload: {image_filename}")
+
+                frame_time = recording_start + datetime.timedelta(seconds=info["offset_seconds"])
+                metadata_sink.add(
+                    {
+                        "frame_name": image_filename.split(".")[0],
+                        "camera_id": camera_id,
+                        "camera_name": name,
+                        "latitude": latitude,
+                        "longitude": longitude,
+                        "timestamp": timestamp,
+                        "frame_time": frame_time.isoformat(),
+                        "offset_seconds": info["offset_seconds"],
+                        "motion_score": info["motion_score"],
+                        "accident_score": None,
+                    },
+                    frame_time,
+                )
+
+        print(f"Frame uploads finished: {upload_pipeline.stats()}")
+        print(f"Frame metadata written to s3://{bucket_name}/{bucket_metadata_directory}: {metadata_sink.stats()}")
+
+    def upload_video_to_s3(self, file_path, s3_bucket, s3_key):
+        """
+        Uploads a file to an S3 bucket.
+        """
+        return upload_file_to_s3(self.s3_client, file_path, s3_bucket, s3_key)
 
 
     def remove_temp_files(self, directory="./temp/"):
         """
         Removes all files in the specified directory (defaults to ./temp/).
+        Recordings clean up their own JobWorkspace; this is only for manual cleanup of loose files.
         """
         if not os.path.exists(directory):
             print(f"Directory {directory} does not exist.")
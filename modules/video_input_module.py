@@ -1,11 +1,113 @@
 import streamlit as st
 from modules.utils import StreamProcess
+from modules.accident_monitor import get_accident_monitor
+from modules.job_manager import get_job_manager, get_session_id
 import time
 
+# Recording is simulated for the demo; set to False to record and upload from the real stream
+use_simulated_recording = True
+recording_duration_seconds = 10
+preview_duration_seconds = 5
+# The preview shows at most 1 / preview_refresh_seconds frames per second
+preview_refresh_seconds = 0.1
+
+
+def record_video_job(job, stream_process, duration_seconds):
+    """
+    Background job that records (or simulates recording) the selected camera.
+    """
+    job.update(message="Recording")
+    if use_simulated_recording:
+        return fake_save_video_stream(duration_seconds, progress_callback=lambda p: job.update(progress=p))
+    return stream_process.save_video_from_stream(
+        duration_seconds=duration_seconds, progress_callback=lambda p: job.update(progress=p)
+    )
+
+
+def preview_stream_job(job, stream_process, duration_seconds):
+    """
+    Background job that keeps the selected camera's stream open while its preview is shown.
+    """
+    job.update(message="Previewing")
+    return stream_process.preview_live_stream(
+        duration_seconds,
+        progress_callback=lambda p: job.update(progress=p),
+        is_cancelled=lambda: job.cancel_requested,
+    )
+
+
+@st.fragment(run_every=preview_refresh_seconds)
+def display_live_preview(job_id, stream_process):
+    """
+    Shows the newest frame of a running preview job, refreshing only this part of the page.
+    """
+    job = get_job_manager().get(job_id)
+    previews = st.session_state.setdefault('live_previews', {})
+    if job is None or job.is_finished():
+        previews.pop(job_id, None)
+        # Rerun the whole page so the finished preview stops refreshing
+        st.rerun()
+    state = previews.setdefault(
+        job_id, {"preview": stream_process.create_preview(), "sequence": 0, "shown_at": 0.0, "jpeg": None}
+    )
+    preview = state["preview"]
+    # The adaptive interval may be longer than the refresh period on a slow client
+    if time.monotonic() - state["shown_at"] >= preview.interval:
+        shown = stream_process.preview_frame(preview, job.camera_id, state["sequence"])
+        if shown is not None:
+            state["sequence"], state["jpeg"] = shown
+            state["shown_at"] = time.monotonic()
+    if state["jpeg"] is None:
+        st.caption("Connecting to the live stream...")
+    else:
+        st.image(state["jpeg"], caption=f"Live preview ({preview.fps:.0f} fps)", use_column_width=True)
+
+
+@st.fragment(run_every=1)
+def display_job_progress(job_id):
+    """
+    Polls a background job and shows its progress without blocking the rest of the app.
+    """
+    job = get_job_manager().get(job_id)
+    if job is None:
+        return
+    snapshot = job.snapshot()
+    if not job.is_finished():
+        st.progress(snapshot['progress'], text=snapshot['message'] or snapshot['status'])
+    elif snapshot['status'] == "done":
+        st.write(job.result)
+        st.success("Frames extracted and Metadata saved" + (" (simulated)" if use_simulated_recording else ""))
+    elif snapshot['status'] == "failed":
+        st.error(f"Recording failed: {snapshot['error']}")
+
+def display_associated_signs(signs, camera):
+    """
+    Shows the sign records associated with a camera as a table.
+    """
+    roadway = camera.__dict__.get('roadway', 'Unknown Roadway')
+    if not signs:
+        st.write(f"No signs associated with {roadway}")
+        return
+    st.write(f"Camera on {roadway} has the following associated signs:")
+    st.dataframe(
+        [
+            {
+                "Sign ID": sign['id'],
+                "Name": sign['name'],
+                "Roadway": sign['roadway'],
+                "Distance (km)": None if sign['distance_m'] is None else round(sign['distance_m'] / 1000, 2),
+                "Messages": " / ".join(sign['messages']) or "No messages",
+            }
+            for sign in signs
+        ],
+        hide_index=True,
+        use_container_width=True,
+    )
+
 def display_video_input():
     # Check if the NYSDOT API Key is available before proceeding
     if 'nysdot_api_key' in st.session_state['api_keys'] and st.session_state['api_keys']['nysdot_api_key']:
-        # Use the stored API key to initialize StreamProcess
+        # Use the stored API key to initialize StreamProcess (its API and S3 clients are shared, not rebuilt per rerun)
         stream_process = StreamProcess(api_key=st.session_state['api_keys']['nysdot_api_key'])
 
         # Initialize session state variables
@@ -65,48 +167,80 @@ def display_video_input():
         with col3:
             if 'selected_camera' in st.session_state and st.session_state['selected_camera']:
                 st.subheader("Actions")
+                job_manager = get_job_manager()
+                session_id = get_session_id(st.session_state)
 
-                # Button to preview the live stream
+                # Button to preview the live stream; the stream is held by a background job and
+                # the frames are shown by a fragment, so the rest of the page stays responsive
                 if st.button("Preview Live Stream"):
-                    # Clear the live camera image
-                    image_placeholder.empty()
-
-                    # Preview live stream
-                    preview_result = stream_process.preview_live_stream()
-                    st.write(preview_result)
+                    st.session_state['preview_job_id'] = job_manager.submit(
+                        session_id, selected_camera.__dict__['id'], "preview",
+                        preview_stream_job, stream_process, preview_duration_seconds,
+                    ).id
+
+                preview_job = job_manager.get(st.session_state.get('preview_job_id'))
+                if preview_job is not None and preview_job.camera_id == selected_camera.__dict__['id']:
+                    if not preview_job.is_finished():
+                        # Clear the live camera image
+                        image_placeholder.empty()
+                        display_live_preview(preview_job.id, stream_process)
+                    elif preview_job.status == "failed":
+                        st.error(f"Preview failed: {preview_job.error}")
+                    elif preview_job.result:
+                        st.write(preview_job.result)
 
                 # Button to list associated signs (if any)
                 if st.button("List Associated Signs"):
-                    signs_info = stream_process.list_associated_signs()
-                    st.write(signs_info)
+                    display_associated_signs(stream_process.list_associated_signs(), selected_camera)
 
-                # Button to start video stream and save the video
+                # Button to start video stream and save the video in the background
                 if st.button("Start Video Stream and Save"):
-                    # recording_info = stream_process.save_video_from_stream(duration_seconds=20)
-                    recording_info = fake_save_video_stream(duration_seconds=10)  # for the demo purpose
-                    st.write(recording_info)
-                    st.success("Frames extracted and Metadata saved (simulated)")
+                    job_manager.submit(
+                        session_id, selected_camera.__dict__['id'], "recording",
+                        record_video_job, stream_process, recording_duration_seconds,
+                    )
+
+                recording_jobs = [
+                    job for job in job_manager.jobs_for(session_id, selected_camera.__dict__['id'])
+                    if job.name == "recording"
+                ]
+                if recording_jobs:
+                    display_job_progress(recording_jobs[0].id)
                     
+                # Accident monitoring keeps the camera stream open and batches its frames through the detector
+                accident_monitor = get_accident_monitor()
+                camera_id = selected_camera.__dict__['id']
+
                 # Button to start accident monitoring
                 if st.button("Start Accident Monitoring"):
+                    accident_monitor.start_camera(selected_camera)
                     st.write("Accident monitoring started.")
                 
                 # Button to stop accident monitoring
                 if st.button("Stop Accident Monitoring"):
+                    accident_monitor.stop_camera(camera_id)
                     st.write("Accident monitoring stopped.")
 
+                reader = accident_monitor.ingestion_engine.get_reader(camera_id)
+                if reader is not None:
+                    status = reader.status()
+                    state = "connected" if status['connected'] else "reconnecting"
+                    st.caption(f"Monitoring: {state}, {status['buffered_frames']} frames buffered, {status['reconnects']} reconnects")
+                    latest = accident_monitor.latest_results.get(camera_id)
+                    if latest is not None:
+                        st.caption(f"Latest accident score: {latest[1]['accident_score']:.2f}")
+
     # Handle case where the API key is missing
     else:
         st.warning("Please submit the NYSDoT API Key first in the 'API Keys' section.")
 
 # A fake function to simulate saving the video stream
-def fake_save_video_stream(duration_seconds=10):
-    # Simulate some time delay with a progress bar for the demo
-    progress_bar = st.progress(0)
-    
+def fake_save_video_stream(duration_seconds=10, progress_callback=None):
+    # Simulate some time delay with progress reports for the demo
     for i in range(100):
         time.sleep(duration_seconds / 100)  # Simulate progress over the duration
-        progress_bar.progress(i + 1)
+        if progress_callback is not None:
+            progress_callback((i + 1) / 100)
     
     # Simulate a successful operation after the delay
     return " "
\ No newline at end of file
@@ -0,0 +1,174 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+from modules.multipart_upload import pending_upload_sources
+
+workspace_root = "./temp/"
+# RAM-backed alternative for short-lived scratch data
+memory_workspace_root = "/dev/shm/emergeye/"
+# Per-job disk budget, and the budget for all workspaces on this host
+default_job_quota_bytes = 2 * 1024 ** 3
+default_total_quota_bytes = 20 * 1024 ** 3
+# Workspaces whose lease has not been renewed for this long are removed by the janitor,
+# unless they hold the source of an unfinished upload (those expire with the upload)
+default_max_age_seconds = 6 * 3600
+janitor_interval_seconds = 600
+# How long a measured disk usage is reused before walking the directory again
+usage_cache_seconds = 1.0
+
+_lease_filename = ".lease"
+_active = {}
+_active_lock = threading.Lock()
+
+
+def directory_usage(path):
+    """
+    Returns the total size in bytes of the files under path.
+    """
+    total = 0
+    for directory, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.path.getsize(os.path.join(directory, filename))
+            except OSError:
+                pass
+    return total
+
+
+class JobWorkspace:
+    def __init__(self, job_name, quota_bytes=default_job_quota_bytes, in_memory=False, root=None):
+        """
+        Private scratch directory for one recording/extraction job.
+
+        Files are created under a unique directory, so concurrent jobs never touch each
+        other's files, and cleanup() removes only this directory. With in_memory the
+        directory lives on tmpfs (/dev/shm) when available. The directory holds a lease
+        file; if the job dies without cleaning up, the janitor removes it once the lease
+        is older than the maximum age.
+        """
+        if root is None:
+            root = memory_workspace_root if in_memory and os.path.isdir("/dev/shm") else workspace_root
+        os.makedirs(root, exist_ok=True)
+        self.job_name = job_name
+        self.quota_bytes = quota_bytes
+        self.path = tempfile.mkdtemp(prefix=f"{job_name}_", dir=root)
+        self.retained = False
+        self._usage = 0
+        self._usage_checked_at = 0.0
+        self.touch()
+        with _active_lock:
+            _active[os.path.abspath(self.path)] = self
+        start_workspace_janitor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.cleanup()
+
+    def file_path(self, filename):
+        return os.path.join(self.path, filename)
+
+    def touch(self):
+        """
+        Renews the lease so the janitor leaves the workspace alone.
+        """
+        with open(os.path.join(self.path, _lease_filename), "w") as lease:
+            lease.write(str(time.time()))
+
+    def usage_bytes(self, max_age_seconds=usage_cache_seconds):
+        now = time.monotonic()
+        if now - self._usage_checked_at >= max_age_seconds:
+            self._usage = directory_usage(self.path)
+            self._usage_checked_at = now
+        return self._usage
+
+    def over_quota(self):
+        """
+        True once the workspace uses more than its quota (checked at most once per second).
+        """
+        return self.quota_bytes is not None and self.usage_bytes() > self.quota_bytes
+
+    def retain(self):
+        """
+        Keeps the files after the job ends (e.g. for a failed upload to resume); the janitor expires them later.
+        """
+        self.retained = True
+
+    def cleanup(self):
+        with _active_lock:
+            _active.pop(os.path.abspath(self.path), None)
+        if self.retained:
+            return
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+def total_workspace_usage(roots=(workspace_root, memory_workspace_root)):
+    """
+    Returns the bytes used by all workspaces on this host.
+    """
+    return sum(directory_usage(root) for root in roots if os.path.isdir(root))
+
+
+def has_workspace_capacity(total_quota_bytes=default_total_quota_bytes):
+    """
+    True if the host's workspaces are below the total quota, so a new job may start.
+    """
+    return total_workspace_usage() < total_quota_bytes
+
+
+def sweep_expired_workspaces(max_age_seconds=default_max_age_seconds, roots=(workspace_root, memory_workspace_root)):
+    """
+    Removes workspaces whose lease is older than max_age_seconds and that no live job owns.
+
+    Workspaces holding the source file of an unfinished resumable upload are kept; the
+    upload sweep finishes or aborts those uploads, after which they expire normally.
+    """
+    removed = 0
+    cutoff = time.time() - max_age_seconds
+    with _active_lock:
+        active = set(_active)
+    pending_directories = {os.path.dirname(os.path.abspath(path)) for path in pending_upload_sources()}
+    for root in roots:
+        if not os.path.isdir(root):
+            continue
+        for entry in os.scandir(root):
+            directory = os.path.abspath(entry.path)
+            if not entry.is_dir() or directory in active:
+                continue
+            if any(pending == directory or pending.startswith(directory + os.sep) for pending in pending_directories):
+                continue
+            lease_path = os.path.join(entry.path, _lease_filename)
+            if not os.path.exists(lease_path):
+                continue
+            if os.path.getmtime(lease_path) < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+                print(f"Janitor removed expired workspace: {entry.path}")
+    return removed
+
+
+_janitor = None
+_janitor_lock = threading.Lock()
+
+
+def _janitor_loop():
+    while True:
+        try:
+            sweep_expired_workspaces()
+        except Exception as e:
+            print(f"Workspace janitor failed: {e}")
+        time.sleep(janitor_interval_seconds)
+
+
+def start_workspace_janitor():
+    """
+    Starts the background janitor once per process.
+    """
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            _janitor = threading.Thread(target=_janitor_loop, name="workspace-janitor", daemon=True)
+            _janitor.start()
@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import itertools
+
+
+class StubS3Error(Exception):
+    pass
+
+
+class StubS3Client:
+    """
+    In-memory stand-in for the parts of the boto3 S3 client the app uses.
+
+    fail_parts maps a part number to how many upload_part calls for it should fail;
+    fail_puts does the same for put_object keys.
+    """
+
+    def __init__(self, fail_parts=None, fail_puts=None):
+        self.objects = {}
+        self.uploads = {}
+        self.aborted = []
+        self.calls = []
+        self.fail_parts = dict(fail_parts or {})
+        self.fail_puts = dict(fail_puts or {})
+        self._ids = itertools.count(1)
+
+    def _fail(self, failures, name):
+        if failures.get(name, 0) > 0:
+            failures[name] -= 1
+            raise StubS3Error(f"Injected failure for {name}")
+
+    def put_object(self, Bucket, Key, Body, **kwargs):
+        self.calls.append(("put_object", Key))
+        self._fail(self.fail_puts, Key)
+        self.objects[(Bucket, Key)] = Body if isinstance(Body, bytes) else Body.read()
+        return {"ETag": f'"{hashlib.md5(self.objects[(Bucket, Key)]).hexdigest()}"'}
+
+    def copy_object(self, Bucket, Key, CopySource, **kwargs):
+        self.calls.append(("copy_object", Key))
+        self.objects[(Bucket, Key)] = self.objects[(CopySource["Bucket"], CopySource["Key"])]
+        return {}
+
+    def upload_file(self, Filename, Bucket, Key, **kwargs):
+        self.calls.append(("upload_file", Key))
+        with open(Filename, "rb") as source:
+            self.objects[(Bucket, Key)] = source.read()
+
+    def create_multipart_upload(self, Bucket, Key, **kwargs):
+        upload_id = f"upload-{next(self._ids)}"
+        self.uploads[upload_id] = {"bucket": Bucket, "key": Key, "parts": {}}
+        return {"UploadId": upload_id}
+
+    def upload_part(self, Bucket, Key, UploadId, PartNumber, Body, ContentMD5=None, **kwargs):
+        self.calls.append(("upload_part", PartNumber))
+        self._fail(self.fail_parts, PartNumber)
+        digest = hashlib.md5(Body).digest()
+        if ContentMD5 is not None and base64.b64decode(ContentMD5) != digest:
+            raise StubS3Error("BadDigest")
+        self.uploads[UploadId]["parts"][PartNumber] = (Body, digest)
+        return {"ETag": f'"{digest.hex()}"'}
+
+    def list_parts(self, Bucket, Key, UploadId, **kwargs):
+        if UploadId not in self.uploads:
+            raise StubS3Error("NoSuchUpload")
+        parts = self.uploads[UploadId]["parts"]
+        return {"Parts": [{"PartNumber": number, "ETag": f'"{digest.hex()}"'} for number, (_, digest) in sorted(parts.items())]}
+
+    def complete_multipart_upload(self, Bucket, Key, UploadId, MultipartUpload, **kwargs):
+        parts = self.uploads.pop(UploadId)["parts"]
+        numbers = [part["PartNumber"] for part in MultipartUpload["Parts"]]
+        self.objects[(Bucket, Key)] = b"".join(parts[number][0] for number in numbers)
+        combined = hashlib.md5(b"".join(parts[number][1] for number in numbers)).hexdigest()
+        return {"ETag": f'"{combined}-{len(numbers)}"'}
+
+    def abort_multipart_upload(self, Bucket, Key, UploadId, **kwargs):
+        self.aborted.append(UploadId)
+        self.uploads.pop(UploadId, None)
@@ -0,0 +1,102 @@
+import threading
+import pytest
+from modules.batch_scheduler import MicroBatchScheduler
+
+
+class FakeDetector:
+    def __init__(self, batch_size=4, fail=False):
+        self.batch_size = batch_size
+        self.fail = fail
+        self.batches = []
+        # Blocks detect_batch until released, so frames pile up behind a running batch
+        self.gate = threading.Event()
+        self.gate.set()
+        self.started = threading.Event()
+
+    def detect_batch(self, frames):
+        self.started.set()
+        self.gate.wait(5)
+        if self.fail:
+            raise RuntimeError("model failed")
+        self.batches.append(list(frames))
+        return [{"accident_score": frame / 100} for frame in frames]
+
+
+@pytest.fixture
+def make_scheduler():
+    schedulers = []
+
+    def make(detector, **kwargs):
+        scheduler = MicroBatchScheduler(detector, **kwargs)
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield make
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+def test_full_batch_is_dispatched_without_waiting(make_scheduler):
+    detector = FakeDetector(batch_size=4)
+    scheduler = make_scheduler(detector, max_wait_ms=10000)
+    futures = [scheduler.submit(f"cam-{i}", i) for i in range(4)]
+    assert [future.result(timeout=2)["accident_score"] for future in futures] == [0.0, 0.01, 0.02, 0.03]
+    assert detector.batches == [[0, 1, 2, 3]]
+
+
+def test_partial_batch_is_dispatched_after_the_wait(make_scheduler):
+    detector = FakeDetector(batch_size=8)
+    scheduler = make_scheduler(detector, max_wait_ms=200)
+    futures = [scheduler.submit("cam-1", 1), scheduler.submit("cam-2", 2)]
+    assert [future.result(timeout=2)["accident_score"] for future in futures] == [0.01, 0.02]
+    assert scheduler.stats()["mean_batch_size"] == 2
+
+
+def test_batches_take_cameras_round_robin(make_scheduler):
+    detector = FakeDetector(batch_size=2)
+    detector.gate.clear()
+    scheduler = make_scheduler(detector, max_wait_ms=0, max_pending_per_camera=10)
+    # The first frame occupies the detector while the others queue up
+    scheduler.submit("busy", 0)
+    assert detector.started.wait(2)
+    futures = [scheduler.submit("busy", frame) for frame in (1, 2, 3)] + [scheduler.submit("quiet", 10)]
+    detector.gate.set()
+    for future in futures:
+        future.result(timeout=2)
+    # The quiet camera's frame goes out with the busy camera's next frame, not after all of them
+    assert detector.batches[1:] == [[1, 10], [2, 3]]
+
+
+def test_stale_frames_are_dropped_per_camera(make_scheduler):
+    detector = FakeDetector(batch_size=1)
+    detector.gate.clear()
+    scheduler = make_scheduler(detector, max_wait_ms=0, max_pending_per_camera=2)
+    first = scheduler.submit("cam-1", 0)
+    assert detector.started.wait(2)
+    futures = [scheduler.submit("cam-1", frame) for frame in (1, 2, 3, 4)]
+    detector.gate.set()
+    first.result(timeout=2)
+    assert [future.cancelled() for future in futures] == [True, True, False, False]
+    assert [future.result(timeout=2)["accident_score"] for future in futures[2:]] == [0.03, 0.04]
+    assert scheduler.stats()["dropped"] == 2
+
+
+def test_detector_errors_reach_every_future(make_scheduler):
+    scheduler = make_scheduler(FakeDetector(batch_size=2, fail=True), max_wait_ms=0)
+    future = scheduler.submit("cam-1", 1)
+    with pytest.raises(RuntimeError, match="model failed"):
+        future.result(timeout=2)
+
+
+def test_stop_cancels_queued_frames(make_scheduler):
+    detector = FakeDetector(batch_size=1)
+    detector.gate.clear()
+    scheduler = make_scheduler(detector, max_wait_ms=0)
+    scheduler.submit("cam-1", 0)
+    assert detector.started.wait(2)
+    queued = scheduler.submit("cam-2", 1)
+    threading.Timer(0.2, detector.gate.set).start()
+    scheduler.stop()
+    assert queued.cancelled()
+    with pytest.raises(RuntimeError):
+        scheduler.submit("cam-1", 2)
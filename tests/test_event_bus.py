@@ -0,0 +1,46 @@
+from modules.event_bus import EventBus
+
+
+def test_delivers_to_every_subscriber_of_the_topic():
+    bus = EventBus()
+    first = bus.subscribe("detections")
+    second = bus.subscribe("detections")
+    other = bus.subscribe("incidents")
+    assert bus.publish("detections", {"camera_id": "cam-1"}) == 2
+    for subscription in (first, second):
+        (event,) = subscription.poll()
+        assert event["camera_id"] == "cam-1" and "published_at" in event
+    assert other.poll() == []
+    assert other.get(timeout=0.01) is None
+
+
+def test_published_events_are_copies():
+    bus = EventBus()
+    subscription = bus.subscribe("detections")
+    event = {"camera_id": "cam-1"}
+    bus.publish("detections", event)
+    assert "published_at" not in event
+    assert subscription.get(timeout=1) is not event
+
+
+def test_full_subscription_drops_the_oldest_events():
+    bus = EventBus()
+    subscription = bus.subscribe("detections", maxsize=3)
+    for sequence in range(5):
+        bus.publish("detections", {"sequence": sequence})
+    assert [event["sequence"] for event in subscription.poll()] == [2, 3, 4]
+    assert subscription.dropped == 2
+
+
+def test_idle_and_closed_subscriptions_are_dropped():
+    bus = EventBus(idle_timeout_seconds=0)
+    idle = bus.subscribe("incidents")
+    assert bus.publish("incidents", {}) == 0
+    assert idle.closed
+
+    bus = EventBus()
+    closed = bus.subscribe("incidents")
+    closed.close()
+    assert closed.closed
+    assert bus.publish("incidents", {}) == 0
+    assert bus.stats()["subscribers"] == {"incidents": 0}
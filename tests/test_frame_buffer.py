@@ -0,0 +1,74 @@
+import threading
+import numpy as np
+import pytest
+from modules.frame_buffer import SharedFrameRing
+
+frame_shape = (4, 6, 3)
+
+
+@pytest.fixture
+def ring():
+    ring = SharedFrameRing(frame_shape, capacity=3)
+    yield ring
+    ring.close()
+
+
+def frame(value):
+    return np.full(frame_shape, value, dtype=np.uint8)
+
+
+def test_views_stay_current_until_the_writer_wraps_around(ring):
+    sequences = [ring.append(frame(value), timestamp=float(value)) for value in range(1, 4)]
+    assert sequences == [1, 2, 3]
+    sequence, timestamp, view = ring.get(1)
+    assert (sequence, timestamp, int(view[0, 0, 0])) == (1, 1.0, 1)
+
+    ring.append(frame(4), timestamp=4.0)
+    assert not ring.is_current(1)
+    assert ring.is_current(2)
+    assert [entry[0] for entry in ring.clip()] == [2, 3, 4]
+    assert [entry[0] for entry in ring.clip(seconds=1)] == [3, 4]
+
+
+def test_slot_being_written_is_not_readable(ring):
+    for value in range(1, 4):
+        ring.append(frame(value))
+    slot_index, slot = ring.acquire_slot()
+    # The slot of sequence 1 is reused; it must not be served while the decoder writes into it
+    assert ring.get(1) is None
+    slot[:] = 9
+    sequence = ring.commit(slot_index)
+    assert int(ring.get(sequence)[2][0, 0, 0]) == 9
+
+
+def test_close_waits_for_leases(ring):
+    ring.append(frame(1))
+    assert ring.acquire()
+    ring.close()
+    # Retired: no new leases, but the holder's view is still mapped
+    assert ring.retired and not ring.closed
+    assert not ring.acquire()
+    assert int(ring.get(1)[2][0, 0, 0]) == 1
+    ring.release()
+    assert ring.closed
+    assert ring.get(1) is None
+    assert ring.latest_sequence() == 0
+
+
+def test_close_wakes_waiting_consumers(ring):
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(ring.wait_for_frame(0, timeout=5)))
+    waiter.start()
+    ring.close()
+    waiter.join(timeout=5)
+    assert results == [None]
+
+
+def test_other_process_attaches_by_descriptor(ring):
+    ring.append(frame(7))
+    attached = SharedFrameRing.attach(ring.descriptor())
+    try:
+        sequence, _, view = attached.latest()
+        assert sequence == 1 and int(view[0, 0, 0]) == 7
+    finally:
+        attached.close()
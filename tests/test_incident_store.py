@@ -0,0 +1,79 @@
+import pytest
+from modules.incident_store import IncidentStore, local_time, parse_timestamp
+
+
+@pytest.fixture
+def store():
+    store = IncidentStore(":memory:")
+    yield store
+    store.close()
+
+
+def detection(detected_at, score=0.6, severity="moderate", camera_id="cam-1"):
+    return {
+        "camera_id": camera_id, "camera_area": "Main St", "latitude": 40.7, "longitude": -74.0,
+        "detected_at": detected_at, "accident_score": score, "severity": severity,
+    }
+
+
+def test_groups_detections_of_one_crash_into_one_incident(store):
+    first = store.record_detection(**detection(1000.0))
+    repeats = [store.record_detection(**detection(1000.0 + 5 * i)) for i in range(1, 20)]
+    assert first["status"] == "new"
+    assert {incident["status"] for incident in repeats} == {"repeat"}
+    assert {incident["incident_id"] for incident in repeats} == {first["incident_id"]}
+    assert store.count() == 1
+    incident = store.latest(1)[0]
+    assert incident["detections"] == 20
+    assert incident["last_seen"] == 1095.0
+
+
+def test_escalates_and_keeps_the_highest_score(store):
+    store.record_detection(**detection(1000.0))
+    escalated = store.record_detection(**detection(1010.0, score=0.9, severity="severe"))
+    lower = store.record_detection(**detection(1020.0, score=0.55, severity="moderate"))
+    assert escalated["status"] == "escalated"
+    assert lower["status"] == "repeat"
+    assert (lower["severity"], lower["accident_score"]) == ("severe", 0.9)
+
+
+def test_opens_a_new_incident_after_the_window(store):
+    first = store.record_detection(window_seconds=60, **detection(1000.0))
+    # Measured from the last detection, not the first
+    store.record_detection(window_seconds=60, **detection(1050.0))
+    same = store.record_detection(window_seconds=60, **detection(1100.0))
+    later = store.record_detection(window_seconds=60, **detection(1200.0))
+    other_camera = store.record_detection(window_seconds=60, **detection(1200.0, camera_id="cam-2"))
+    assert same["incident_id"] == first["incident_id"]
+    assert later["status"] == other_camera["status"] == "new"
+    assert len({first["incident_id"], later["incident_id"], other_camera["incident_id"]}) == 3
+
+
+def test_duplicate_detection_returns_the_stored_incident(store):
+    first = store.record_detection(**detection(1000.0))
+    store.record_detection(**detection(2000.0))
+    duplicate = store.record_detection(window_seconds=-1, **detection(1000.0))
+    assert duplicate["incident_id"] == first["incident_id"]
+    assert duplicate["status"] == "repeat"
+
+
+def test_ingests_only_rows_appended_since_the_last_call(store, tmp_path):
+    path = tmp_path / "detections.csv"
+    path.write_text(
+        "Frame Name,Camera Area,Latitude,Longitude,Timestamp\n"
+        "cam-1_2024-10-13_04-36-59,Main St,40.7,-74.0,2024-10-13_04-36-59\n"
+    )
+    assert store.ingest_csv(str(path)) == 1
+    with open(path, "a") as csv_file:
+        csv_file.write("cam-2_2024-10-13_04-40-00,Side St,40.8,-74.1,2024-10-13_04-40-00\n")
+        # A partially written line waits for the next ingestion
+        csv_file.write("cam-3_2024-10-13")
+    assert store.ingest_csv(str(path)) == 1
+    assert store.ingest_csv(str(path)) == 0
+    assert [incident["camera_id"] for incident in store.latest(10, source=str(path))] == ["cam-2", "cam-1"]
+
+
+def test_timestamps_without_offset_are_local_time():
+    detected_at = parse_timestamp("2024-10-13_04-36-59")
+    assert local_time(detected_at).strftime("%Y-%m-%d %H:%M:%S") == "2024-10-13 04:36:59"
+    assert parse_timestamp("2024-10-13T08:36:59+00:00") == detected_at
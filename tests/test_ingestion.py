@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+import pytest
+from modules.ingestion import FrameRing, IngestionEngine, StreamReader
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    # Readers are counted instead of opening streams
+    calls = []
+    monkeypatch.setattr(StreamReader, "start", lambda reader: calls.append(("start", reader.camera_id)))
+    monkeypatch.setattr(StreamReader, "stop", lambda reader, timeout=5: calls.append(("stop", reader.camera_id)))
+    engine = IngestionEngine(shared_memory=False)
+    engine.calls = calls
+    return engine
+
+
+def camera(camera_id):
+    return SimpleNamespace(id=camera_id, video_url=f"rtsp://cameras/{camera_id}")
+
+
+def test_reader_is_shared_until_the_last_user_stops(engine):
+    first = engine.start_camera(camera("a"))
+    second = engine.start_camera(camera("a"))
+    assert first is second
+    assert engine.users("a") == 2
+
+    assert engine.stop_camera("a")
+    assert engine.get_reader("a") is first
+    assert ("stop", "a") not in engine.calls
+
+    assert engine.stop_camera("a")
+    assert engine.get_reader("a") is None
+    assert engine.users("a") == 0
+    assert engine.calls.count(("stop", "a")) == 1
+
+
+def test_stopping_an_unknown_camera_does_not_touch_others(engine):
+    engine.start_camera(camera("a"))
+    assert not engine.stop_camera("b")
+    assert engine.users("a") == 1
+    assert engine.stop_camera("a")
+    # Releasing more often than acquiring must not go negative
+    assert not engine.stop_camera("a")
+    assert engine.users("a") == 0
+
+
+def test_stop_all_releases_every_reader(engine):
+    engine.start_camera(camera("a"))
+    engine.start_camera(camera("a"))
+    engine.start_camera(camera("b"))
+    engine.stop_all()
+    assert engine.status() == []
+    assert sorted(call for call in engine.calls if call[0] == "stop") == [("stop", "a"), ("stop", "b")]
+    # A camera started again gets a fresh reference count
+    engine.start_camera(camera("a"))
+    assert engine.users("a") == 1
+
+
+def test_lease_yields_none_without_a_ring(engine):
+    with engine.lease_ring("missing") as ring:
+        assert ring is None
+    engine.start_camera(camera("a"))
+    with engine.lease_ring("a") as ring:
+        assert isinstance(ring, FrameRing)
+
+
+def test_frame_ring_keeps_the_newest_frames():
+    ring = FrameRing(capacity=2)
+    for value in range(3):
+        ring.append(value, timestamp=float(value))
+    assert [entry[0] for entry in ring.clip()] == [2, 3]
+    assert ring.latest() == (3, 2.0, 2)
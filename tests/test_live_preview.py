@@ -0,0 +1,38 @@
+import cv2
+import numpy as np
+import pytest
+from modules.live_preview import AdaptivePreview
+
+
+def test_encodes_a_downscaled_jpeg():
+    preview = AdaptivePreview(display_width=320, jpeg_quality=60)
+    jpeg = preview.encode(np.zeros((720, 1280, 3), dtype=np.uint8))
+    decoded = cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+    assert decoded.shape == (180, 320, 3)
+    # Frames narrower than the display width are not upscaled
+    small = cv2.imdecode(np.frombuffer(preview.encode(np.zeros((90, 160, 3), dtype=np.uint8)), np.uint8), cv2.IMREAD_COLOR)
+    assert small.shape == (90, 160, 3)
+
+
+def test_interval_follows_the_round_trip_within_bounds():
+    preview = AdaptivePreview(min_fps=1, max_fps=10)
+    assert preview.interval == pytest.approx(0.1)
+    preview.frame_shown(1, b"x", 0.01)
+    # A fast client is capped at max_fps
+    assert preview.interval == pytest.approx(0.1)
+    for sequence in range(2, 40):
+        preview.frame_shown(sequence, b"x", 0.4)
+    assert preview.interval == pytest.approx(0.6, rel=0.01)
+    for sequence in range(40, 80):
+        preview.frame_shown(sequence, b"x", 5.0)
+    # A very slow client still gets min_fps
+    assert preview.interval == pytest.approx(1.0)
+
+
+def test_counts_frames_skipped_between_shown_frames():
+    preview = AdaptivePreview()
+    for sequence in (3, 4, 10):
+        preview.frame_shown(sequence, b"jpeg", 0.01)
+    stats = preview.stats()
+    assert (stats["frames_shown"], stats["frames_skipped"]) == (3, 5)
+    assert stats["average_jpeg_bytes"] == 4
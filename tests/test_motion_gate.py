@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from modules.motion_gate import MotionGate, MotionGateBank
+
+
+def scene(moving_box_at=None):
+    frame = np.full((240, 320, 3), 90, dtype=np.uint8)
+    if moving_box_at is not None:
+        frame[60:180, moving_box_at:moving_box_at + 80] = 250
+    return frame
+
+
+@pytest.mark.parametrize("method", ["difference", "mog2"])
+def test_forwards_motion_and_skips_a_still_scene(method):
+    gate = MotionGate(threshold=1.0, heartbeat_seconds=1000, method=method)
+    still = scene()
+    assert gate.should_forward(still, 0.0)
+    # Let the background model settle on the still scene
+    assert not any(gate.should_forward(still, 0.1 * i) for i in range(1, 30))
+    assert gate.should_forward(scene(moving_box_at=100), 3.0)
+    assert gate.skipped == 29
+    assert gate.stats()["skip_ratio"] == pytest.approx(29 / 31)
+
+
+def test_heartbeat_forwards_a_still_scene():
+    gate = MotionGate(threshold=1.0, heartbeat_seconds=10)
+    still = scene()
+    forwarded = [gate.should_forward(still, float(t)) for t in range(0, 25)]
+    assert [t for t, passed in enumerate(forwarded) if passed] == [0, 10, 20]
+
+
+def test_rejects_unknown_method():
+    with pytest.raises(ValueError):
+        MotionGate(method="optical-flow")
+
+
+def test_bank_keeps_one_gate_per_camera():
+    bank = MotionGateBank()
+    assert bank.get("cam-1") is None
+    gate = bank.gate_for("cam-1")
+    assert bank.gate_for("cam-1") is gate
+    assert bank.get("cam-1") is gate
+    # Looking a camera up never creates its gate
+    assert bank.get("cam-2") is None
+    assert list(bank.stats()["cameras"]) == ["cam-1"]
+    bank.remove("cam-1")
+    assert bank.get("cam-1") is None
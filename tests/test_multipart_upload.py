@@ -0,0 +1,137 @@
+import base64
+import hashlib
+import json
+import os
+import pytest
+from modules import multipart_upload
+from modules.multipart_upload import ResumableUpload, resume_pending_uploads, pending_upload_sources
+from tests.stub_s3 import StubS3Client, StubS3Error
+
+part_size = 1024
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(multipart_upload, "retry_backoff_seconds", 0)
+
+
+@pytest.fixture
+def source_file(tmp_path):
+    path = tmp_path / "clip.mp4"
+    path.write_bytes(os.urandom(part_size * 4 + 100))
+    return str(path)
+
+
+def make_upload(client, source_file, tmp_path, **kwargs):
+    return ResumableUpload(
+        client, source_file, "bucket", "clips/clip.mp4", part_size,
+        max_concurrency=1, state_directory=str(tmp_path / "state"), **kwargs
+    )
+
+
+def test_resumes_after_partial_upload(source_file, tmp_path):
+    client = StubS3Client(fail_parts={3: 1})
+    with pytest.raises(StubS3Error):
+        make_upload(client, source_file, tmp_path, max_attempts=1).upload()
+    # Parts before the failure are recorded, and the source is reported as pending
+    assert pending_upload_sources(str(tmp_path / "state")) == {os.path.abspath(source_file)}
+
+    resumed = make_upload(client, source_file, tmp_path)
+    etag = resumed.upload()
+
+    # Parts after the failed one were already in flight and finished too
+    assert resumed.resumed_parts == 4
+    uploaded_parts = [number for call, number in client.calls if call == "upload_part"]
+    assert uploaded_parts == [1, 2, 3, 4, 5, 3]
+    with open(source_file, "rb") as source:
+        assert client.objects[("bucket", "clips/clip.mp4")] == source.read()
+    assert etag.endswith("-5")
+    assert os.listdir(tmp_path / "state") == []
+
+
+def test_retries_failed_parts_in_process(source_file, tmp_path):
+    client = StubS3Client(fail_parts={2: 1})
+    make_upload(client, source_file, tmp_path, max_attempts=2).upload()
+    assert ("bucket", "clips/clip.mp4") in client.objects
+    # The retry continues the same S3 upload instead of starting a new one
+    assert len(client.aborted) == 0 and not client.uploads
+
+
+def test_sends_content_md5_and_checks_final_etag(source_file, tmp_path, monkeypatch):
+    sent = []
+    client = StubS3Client()
+    upload_part = client.upload_part
+
+    def recording_upload_part(**kwargs):
+        sent.append((kwargs["Body"], kwargs["ContentMD5"]))
+        return upload_part(**kwargs)
+
+    monkeypatch.setattr(client, "upload_part", recording_upload_part)
+    etag = make_upload(client, source_file, tmp_path).upload()
+
+    for body, content_md5 in sent:
+        assert base64.b64decode(content_md5) == hashlib.md5(body).digest()
+    digests = b"".join(hashlib.md5(body).digest() for body, _ in sent)
+    assert etag == f"{hashlib.md5(digests).hexdigest()}-{len(sent)}"
+
+
+def test_corrupted_part_is_rejected(source_file, tmp_path, monkeypatch):
+    client = StubS3Client()
+    upload_part = client.upload_part
+
+    def corrupting_upload_part(**kwargs):
+        # Damage the body in transit, after its checksum was computed
+        return upload_part(**dict(kwargs, Body=kwargs["Body"][::-1]))
+
+    monkeypatch.setattr(client, "upload_part", corrupting_upload_part)
+    with pytest.raises(StubS3Error, match="BadDigest"):
+        make_upload(client, source_file, tmp_path, max_attempts=1).upload()
+    assert ("bucket", "clips/clip.mp4") not in client.objects
+
+
+def test_resume_skips_parts_missing_on_s3(source_file, tmp_path):
+    client = StubS3Client(fail_parts={4: 1})
+    with pytest.raises(StubS3Error):
+        make_upload(client, source_file, tmp_path, max_attempts=1).upload()
+    # S3 lost part 2; its recorded ETag must not be trusted
+    upload_id = next(iter(client.uploads))
+    del client.uploads[upload_id]["parts"][2]
+
+    resumed = make_upload(client, source_file, tmp_path)
+    resumed.upload()
+    assert resumed.resumed_parts == 3
+    with open(source_file, "rb") as source:
+        assert client.objects[("bucket", "clips/clip.mp4")] == source.read()
+
+
+def test_pending_uploads_are_retried_or_aborted(source_file, tmp_path):
+    state_directory = str(tmp_path / "state")
+    client = StubS3Client(fail_parts={1: 1})
+    with pytest.raises(StubS3Error):
+        make_upload(client, source_file, tmp_path, max_attempts=1).upload()
+    assert resume_pending_uploads(client, state_directory) == 1
+    assert ("bucket", "clips/clip.mp4") in client.objects
+
+    client = StubS3Client(fail_parts={1: 1})
+    with pytest.raises(StubS3Error):
+        make_upload(client, source_file, tmp_path, max_attempts=1).upload()
+    os.remove(source_file)
+    assert resume_pending_uploads(client, state_directory) == 0
+    assert client.aborted == ["upload-1"]
+    assert os.listdir(state_directory) == []
+
+
+def test_stale_pending_upload_is_aborted(source_file, tmp_path):
+    state_directory = str(tmp_path / "state")
+    client = StubS3Client(fail_parts={1: 1})
+    with pytest.raises(StubS3Error):
+        make_upload(client, source_file, tmp_path, max_attempts=1).upload()
+    state_path = os.path.join(state_directory, os.listdir(state_directory)[0])
+    with open(state_path) as state_file:
+        state = json.load(state_file)
+    state["created_at"] -= 2 * multipart_upload.pending_upload_max_age_seconds
+    with open(state_path, "w") as state_file:
+        json.dump(state, state_file)
+
+    assert resume_pending_uploads(client, state_directory) == 0
+    assert client.aborted == ["upload-1"]
@@ -0,0 +1,46 @@
+import pytest
+from modules.event_bus import EventBus, incident_topic
+from modules.incident_store import IncidentStore
+from modules.notifications import NotificationPipeline
+
+
+@pytest.fixture
+def bus():
+    return EventBus()
+
+
+@pytest.fixture
+def pipeline(bus):
+    pipeline = NotificationPipeline(bus, location_lookup=lambda latitude, longitude: "Exit 4")
+    yield pipeline
+    pipeline.stop()
+
+
+def test_notifies_new_and_escalated_incidents_with_store_ids(bus, pipeline):
+    store = IncidentStore(":memory:")
+    feed = bus.subscribe(incident_topic)
+    detections = [(1000.0 + i, 0.6, "moderate") for i in range(5)] + [(1010.0, 0.9, "severe"), (1011.0, 0.9, "severe")]
+    published = pipeline.process([
+        store.record_detection(
+            camera_id="cam-1", camera_area="Main St", latitude=40.7, longitude=-74.0,
+            detected_at=detected_at, accident_score=score, severity=severity,
+        )
+        for detected_at, score, severity in detections
+    ])
+
+    assert [incident["status"] for incident in published] == ["new", "escalated"]
+    assert {incident["incident_id"] for incident in published} == {store.latest(1)[0]["id"]}
+    assert published[0]["message"].startswith("A moderate accident has been detected at Main St, Exit 4")
+    assert published[1]["message"].startswith("Update: the accident at Main St, Exit 4 (Camera ID: cam-1) is now severe")
+    assert [event["incident_id"] for event in feed.poll()] == [incident["incident_id"] for incident in published]
+    stats = pipeline.stats()
+    assert (stats["detections"], stats["notifications"], stats["suppressed"]) == (7, 2, 5)
+
+
+def test_detections_without_a_status_are_notified(pipeline):
+    published = pipeline.process([{
+        "camera_id": "upload-1", "camera_area": "Uploaded footage", "latitude": None, "longitude": None,
+        "detected_at": 1000.0, "accident_score": 0.9, "severity": "severe",
+    }])
+    assert len(published) == 1
+    assert "Uploaded footage, Exit 4" in published[0]["message"]
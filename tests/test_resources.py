@@ -0,0 +1,30 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from modules import resources
+
+
+@pytest.fixture(autouse=True)
+def fresh_resources(monkeypatch):
+    # Clients are counted instead of built
+    monkeypatch.setattr(resources, "_traffic_apis", {})
+    monkeypatch.setattr(resources, "_s3_clients", {})
+    monkeypatch.setattr(resources, "creation_counts", Counter())
+    monkeypatch.setattr(resources, "lookup_counts", Counter())
+    monkeypatch.setattr(resources, "API", lambda api_key: object())
+    monkeypatch.setattr(resources.boto3, "client", lambda service, **kwargs: object())
+
+
+def test_s3_client_is_shared_across_threads():
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        clients = list(executor.map(lambda _: resources.get_s3_client(), range(50)))
+    assert len({id(client) for client in clients}) == 1
+    assert resources.resource_stats()["s3_client"] == {"created": 1, "requested": 50}
+    assert resources.get_s3_client("eu-west-1") is not clients[0]
+
+
+def test_traffic_api_is_shared_per_key():
+    first = resources.get_traffic_api("key-1")
+    assert resources.get_traffic_api("key-1") is first
+    assert resources.get_traffic_api("key-2") is not first
+    assert resources.resource_stats()["traffic_api"] == {"created": 2, "requested": 3}
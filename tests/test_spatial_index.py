@@ -0,0 +1,62 @@
+import random
+import pytest
+from modules.spatial_index import GridIndex, haversine_m
+
+
+@pytest.fixture
+def points():
+    rng = random.Random(7)
+    # Clustered like real cameras: most around a city, a few far away
+    points = [(40.7 + rng.uniform(-0.2, 0.2), -74.0 + rng.uniform(-0.2, 0.2)) for _ in range(300)]
+    points += [(rng.uniform(41.0, 45.0), rng.uniform(-79.0, -73.0)) for _ in range(30)]
+    return points
+
+
+@pytest.fixture
+def index(points):
+    index = GridIndex()
+    for position, (lat, lon) in enumerate(points):
+        index.insert(lat, lon, position)
+    return index
+
+
+def brute_force(points, lat, lon):
+    return sorted((haversine_m(lat, lon, item_lat, item_lon), position) for position, (item_lat, item_lon) in enumerate(points))
+
+
+@pytest.mark.parametrize("query", [(40.7, -74.0), (40.95, -73.7), (43.0, -76.0), (0.0, 0.0)])
+@pytest.mark.parametrize("k", [1, 5, 40])
+def test_nearest_matches_brute_force(index, points, query, k):
+    expected = brute_force(points, *query)[:k]
+    result = index.nearest(*query, k=k)
+    assert [item for _, item in result] == [position for _, position in expected]
+    assert [distance for distance, _ in result] == pytest.approx([distance for distance, _ in expected])
+
+
+def test_nearest_respects_max_distance(index, points):
+    expected = [position for distance, position in brute_force(points, 40.7, -74.0) if distance <= 2000][:10]
+    assert [item for _, item in index.nearest(40.7, -74.0, k=10, max_distance_m=2000)] == expected
+
+
+def test_within_radius_matches_brute_force(index, points):
+    result = index.within_radius(40.75, -73.95, 5000)
+    expected = [(distance, position) for distance, position in brute_force(points, 40.75, -73.95) if distance <= 5000]
+    assert [item for _, item in result] == [position for _, position in expected]
+
+
+def test_in_bbox_is_inclusive(index, points):
+    expected = {
+        position for position, (lat, lon) in enumerate(points)
+        if 40.6 <= lat <= 40.8 and -74.1 <= lon <= -73.9
+    }
+    assert set(index.in_bbox(40.6, -74.1, 40.8, -73.9)) == expected
+
+
+def test_ignores_items_without_coordinates():
+    index = GridIndex()
+    assert not index.insert(None, -74.0, "missing")
+    assert not index.insert("n/a", -74.0, "invalid")
+    assert index.insert("40.7", "-74.0", "valid")
+    assert len(index) == 1
+    assert index.nearest(0.0, 0.0) == [(pytest.approx(haversine_m(0.0, 0.0, 40.7, -74.0)), "valid")]
+    assert GridIndex().nearest(40.7, -74.0) == []
@@ -0,0 +1,78 @@
+import queue
+import threading
+import pytest
+from modules import upload_pipeline
+from modules.upload_pipeline import UploadPipeline
+from tests.stub_s3 import StubS3Client
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(upload_pipeline, "retry_base_delay", 0)
+
+
+class BlockingS3Client(StubS3Client):
+    """
+    Stub client whose put_object waits until release is set, to simulate a slow network.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+        self.started = threading.Event()
+
+    def put_object(self, **kwargs):
+        self.started.set()
+        self.release.wait(timeout=5)
+        return super().put_object(**kwargs)
+
+
+def test_puts_once_and_copies_to_extra_keys():
+    client = StubS3Client()
+    with UploadPipeline(client, "bucket", workers=2) as pipeline:
+        pipeline.submit(b"jpeg", "buffer/frame.jpg", copy_keys=["inference/frame.jpg", "archive/frame.jpg"])
+        pipeline.flush()
+        assert pipeline.stats() == {"uploaded": 1, "copied": 2, "retries": 0, "failed": 0, "pending": 0}
+
+    assert [call for call, _ in client.calls] == ["put_object", "copy_object", "copy_object"]
+    for key in ("buffer/frame.jpg", "inference/frame.jpg", "archive/frame.jpg"):
+        assert client.objects[("bucket", key)] == b"jpeg"
+
+
+def test_retries_failed_puts():
+    client = StubS3Client(fail_puts={"a.jpg": 2, "b.jpg": 10})
+    with UploadPipeline(client, "bucket", workers=1, max_retries=3) as pipeline:
+        pipeline.submit(b"a", "a.jpg")
+        pipeline.submit(b"b", "b.jpg", copy_keys=["copy-of-b.jpg"])
+        pipeline.flush()
+        stats = pipeline.stats()
+
+    assert client.objects[("bucket", "a.jpg")] == b"a"
+    # b.jpg kept failing: it is reported and its copy is never attempted
+    assert ("bucket", "b.jpg") not in client.objects
+    assert ("copy_object", "copy-of-b.jpg") not in client.calls
+    assert stats["uploaded"] == 1 and stats["failed"] == 1
+    assert stats["retries"] == 2 + 3
+    assert pipeline.failed[0][0] == "b.jpg"
+
+
+def test_submit_blocks_when_queue_is_full():
+    client = BlockingS3Client()
+    pipeline = UploadPipeline(client, "bucket", queue_size=2, workers=1)
+    try:
+        pipeline.submit(b"0", "0.jpg")
+        # The worker holds the first upload; two more fill the queue
+        assert client.started.wait(timeout=5)
+        pipeline.submit(b"1", "1.jpg")
+        pipeline.submit(b"2", "2.jpg")
+        with pytest.raises(queue.Full):
+            pipeline.submit(b"3", "3.jpg", timeout=0.1)
+        assert pipeline.stats()["pending"] == 2
+
+        client.release.set()
+        pipeline.submit(b"3", "3.jpg", timeout=5)
+        pipeline.flush()
+        assert pipeline.stats()["uploaded"] == 4
+    finally:
+        client.release.set()
+        pipeline.close()
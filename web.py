@@ -4,16 +4,21 @@ import pydeck as pdk
 from modules import model_module
 from modules import video_input_module
 from modules import accident_report_module
+from modules import health_module
+from modules.stream_health import start_metrics_server
 
 # Enable wide mode for full-screen layout
 st.set_page_config(layout="wide")
 
+# Prometheus endpoint for the stream health metrics; started once per process
+start_metrics_server()
+
 # Use the option menu for sidebar navigation with icons
 with st.sidebar:
     selected = option_menu(
         "",
-        ["Home", "About",  "API Keys", "Our Product", "Contact Us"],
-        icons=["house", "briefcase", "key", "rocket",  "envelope"],
+        ["Home", "About",  "API Keys", "Our Product", "Stream Health", "Contact Us"],
+        icons=["house", "briefcase", "key", "rocket", "activity", "envelope"],
         menu_icon="cast",
         default_index=0,
         styles={
@@ -133,6 +138,11 @@ elif selected == "API Keys":
         st.session_state['api_keys']['llm_api_key'] = llm_api_key
         st.success("API Keys have been stored for this session.")
 
+################## Stream Health Page Section ##################
+elif selected == "Stream Health":
+    st.title("Stream Health")
+    health_module.display_stream_health()
+
 ################## Contact Us Page Section ################## 
 elif selected == "Contact Us":
     st.title("Contact Us")
@@ -177,12 +187,9 @@ elif selected == "Our Product":
             </style>
         """, unsafe_allow_html=True)
         
-        # Ensure session state is initialized for analysis and notification flag
+        # Ensure session state is initialized for analysis
         if 'analysis_complete' not in st.session_state:
             st.session_state['analysis_complete'] = False
-        
-        if 'notification_ready' not in st.session_state:
-            st.session_state['notification_ready'] = False
 
         # Create a container for the entire UI
         with st.container(height=1010, border=True):